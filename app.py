@@ -3,34 +3,77 @@ HoneyGuard Backend - Main Application
 Member 1: Core Backend + Decision Engine
 """
 
-from fastapi import FastAPI, Header, HTTPException, Request
-from pydantic import BaseModel
+import os
+import secrets
+from contextlib import asynccontextmanager
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 import uvicorn
 
 # Import your modules
+import audit_log
+import data_handler
+import heuristics
+import honey_generator
+import metrics
+import ml_batcher
+import profiler
+import rate_limiter
+import reputation
+import streaming
+from encoding import FastJSONResponse, RecordResponse
+from honey_pool import pool as honey_pool
 from session_manager import (
-    create_session,
-    get_session,
-    record_request,
-    extract_behavioral_features
-)
-from risk_calculator import (
-    calculate_initial_risk,
-    calculate_final_risk,
-    determine_data_source
-)
-from ml_detector import get_ml_risk
-from data_handler import (
-    get_real_customer,
-    get_randomized_real_data,
-    get_real_transactions
+    get_session_stats,
+    create_session_async,
+    update_session_async,
+    start_session_sweeper,
+    stop_session_sweeper
 )
-from honey_generator import (
-    generate_honey_customer,
-    generate_honey_transactions
+from risk_calculator import calculate_initial_risk
+from data_handler import get_real_customer_async
+from honey_generator import MAX_TRANSACTIONS_LIMIT
+from decision_engine import (
+    Decision,
+    get_decision,
+    fetch_account,
+    fetch_transactions,
+    stream_transactions,
+    record_decision,
+    decision_cache
 )
 
-app = FastAPI(title="HoneyGuard Banking API", version="1.0")
+# Token for the /admin endpoints (sent as X-Admin-Token); unset
+# disables them
+ADMIN_TOKEN = os.environ.get('HONEYGUARD_ADMIN_TOKEN')
+
+
+@asynccontextmanager
+async def lifespan(app):
+    honey_generator.check_honey_secret()
+    # Expire idle/old sessions in the background
+    start_session_sweeper()
+    audit_log.start_audit_writer()
+    honey_pool.start()
+    profiler.start_profile_writer()
+    if ml_batcher.MICROBATCH_ENABLED:
+        ml_batcher.batcher.start()
+    yield
+    await ml_batcher.batcher.stop()
+    profiler.stop_profile_writer()
+    honey_pool.stop()
+    audit_log.stop_audit_writer()
+    stop_session_sweeper()
+
+
+app = FastAPI(title="HoneyGuard Banking API", version="1.0", lifespan=lifespan,
+              default_response_class=FastJSONResponse)
+app.add_middleware(metrics.LatencyMiddleware)
+app.add_middleware(profiler.ProfilerMiddleware)
 
 
 # Request/Response Models
@@ -51,7 +94,7 @@ class LoginResponse(BaseModel):
 # -------------------------------------------------------------------
 
 @app.post("/login", response_model=LoginResponse)
-def login(request: LoginRequest, http_request: Request):
+async def login(request: LoginRequest, http_request: Request):
     """
     Customer login endpoint
     Creates session and calculates initial risk
@@ -64,7 +107,7 @@ def login(request: LoginRequest, http_request: Request):
     # In production, verify password here
 
     # Get real customer data to extract name
-    customer_data = get_real_customer(request.customer_id)
+    customer_data = await get_real_customer_async(request.customer_id)
 
     user_data = {
         'email': request.email,
@@ -81,22 +124,22 @@ def login(request: LoginRequest, http_request: Request):
     initial_risk = calculate_initial_risk(user_data, request_metadata)
 
     # Create session
-    session_id = create_session(str(request.customer_id))
+    session_id = await create_session_async(str(request.customer_id))
 
     # Store initial risk in session
-    session = get_session(session_id)
-    session['initial_risk'] = initial_risk
-    session['customer_id'] = request.customer_id
-
-    print(f"\n{'='*60}")
-    print(f"✅ LOGIN SUCCESSFUL")
-    print(f"{'='*60}")
-    print(f"Customer: {customer_data.get('name')} (ID: {request.customer_id})")
-    print(f"Email: {request.email}")
-    print(f"User-Agent: {user_agent[:50]}...")
-    print(f"Initial Risk Score: {initial_risk}/100")
-    print(f"Session ID: {session_id}")
-    print(f"{'='*60}\n")
+    await update_session_async(session_id, initial_risk=initial_risk,
+                               customer_id=request.customer_id)
+
+    if audit_log.ENABLED:
+        audit_log.audit(
+            'login',
+            session_id=session_id,
+            customer_id=request.customer_id,
+            email=request.email,
+            user_agent=user_agent,
+            ip=request_metadata['ip'],
+            initial_risk=initial_risk
+        )
 
     return {
         'session_id': session_id,
@@ -105,181 +148,249 @@ def login(request: LoginRequest, http_request: Request):
     }
 
 
+# -------------------------------------------------------------------
+# Protected endpoints
+# Every route on this router goes through the decision stage
+# (session -> features -> ML risk -> final risk -> data source) exactly
+# once; routes receive the result as a Decision.
+# -------------------------------------------------------------------
+
+protected = APIRouter(dependencies=[Depends(get_decision)])
+
+
 # -------------------------------------------------------------------
 # ENDPOINT 2: Get Customer Account Data
 # -------------------------------------------------------------------
 
-@app.get("/account")
-def get_account(session_id: str = Header(..., alias="X-Session-ID")):
+@protected.get("/account")
+async def get_account(decision: Decision = Depends(get_decision)):
     """
     Get customer account information
     Routes to real/randomized/honey data based on risk
     """
+    account_data = await fetch_account(decision)
+    record_decision(decision)
 
-    # Validate session
-    session = get_session(session_id)
-    if not session:
-        raise HTTPException(status_code=401, detail="Invalid session ID")
-
-    # Record this request
-    record_request(session_id, '/account')
-
-    # Extract behavioral features
-    features = extract_behavioral_features(session_id)
-
-    # Get ML risk score (Member 2's function)
-    ml_risk = get_ml_risk(features)
-
-    # Calculate final risk
-    final_risk = calculate_final_risk(session_id, ml_risk)
-
-    # Determine data source
-    data_source = determine_data_source(final_risk)
-
-    # Route to appropriate data
-    customer_id = session.get('customer_id', 1001)
-
-    if data_source == 'real':
-        account_data = get_real_customer(customer_id)  # Member 3's function
-    elif data_source == 'randomized':
-        account_data = get_randomized_real_data(
-            customer_id)  # Member 3's function
-    else:  # honey
-        account_data = generate_honey_customer(
-            customer_id)  # Member 3's function
-
-    print(f"\n{'='*60}")
-    print(f"📊 ACCOUNT REQUEST")
-    print(f"{'='*60}")
-    print(f"Customer ID: {customer_id}")
-    print(f"Session ID: {session_id[:20]}...")
-    print(f"Behavioral Features:")
-    print(f"  - Requests/min: {features.get('requests_per_minute', 0)}")
-    print(f"  - Session age: {features.get('session_duration', 0):.1f} min")
-    print(f"  - Total requests: {features.get('total_requests', 0)}")
-    print(f"Risk Scores:")
-    print(f"  - Initial Risk: {session.get('initial_risk', 0)}/100")
-    print(f"  - ML Risk: {ml_risk}/100")
-    print(f"  - FINAL RISK: {final_risk}/100")
-    print(f"Data Source: {data_source.upper()}")
-    print(f"{'='*60}\n")
-
-    # Return data with risk info (for demo/dashboard)
-    return {
-        **account_data,
-        "_risk_score": final_risk,
-        "_data_source": data_source,
-        "_ml_risk": ml_risk,
-        "_initial_risk": session.get('initial_risk', 0)
-    }
+    # Return data with risk info (for demo/dashboard); the record's
+    # encoded body is cached, only these fields are encoded per request
+    return RecordResponse(account_data, {
+        **decision.envelope(),
+        "_ml_risk": decision.ml_risk,
+        "_initial_risk": decision.initial_risk
+    })
 
 
 # -------------------------------------------------------------------
 # ENDPOINT 3: Get Transaction History
 # -------------------------------------------------------------------
 
-@app.get("/transactions")
-def get_transactions(
-    session_id: str = Header(..., alias="X-Session-ID"),
-    limit: int = 10
+@protected.get("/transactions")
+async def get_transactions(
+    decision: Decision = Depends(get_decision),
+    limit: int = Query(10, ge=1),
+    cursor: int = Query(0, ge=0),
+    stream: Optional[str] = Query(None, pattern='^(ndjson|json)$')
 ):
     """
     Get customer transaction history
     Routes to real/honey data based on risk
-    """
 
-    # Validate session
-    session = get_session(session_id)
-    if not session:
-        raise HTTPException(status_code=401, detail="Invalid session ID")
+    `limit` is capped at MAX_TRANSACTIONS_LIMIT per page; pass the
+    returned `next_cursor` to get the following page.
 
-    # Record request
-    record_request(session_id, '/transactions')
+    With `?stream=ndjson` (one transaction per line, then a summary
+    line) or `?stream=json` (same document as the paged response) rows
+    are generated and written incrementally, and `limit` may go up to
+    streaming.MAX_STREAM_ROWS. Honey sessions stay capped at
+    MAX_TRANSACTIONS_LIMIT, streamed or not.
+    """
+    if stream:
+        # Honey gets no more per request by streaming than by paging
+        if decision.data_source == 'honey':
+            limit = min(limit, MAX_TRANSACTIONS_LIMIT)
+        else:
+            limit = min(limit, streaming.MAX_STREAM_ROWS)
+        rows = stream_transactions(decision, limit, cursor)
+        envelope = decision.envelope()
+
+        def trailer(count):
+            return {
+                'count': count,
+                'next_cursor': cursor + limit if count == limit else None,
+                **envelope
+            }
+
+        if stream == 'ndjson':
+            body = streaming.encode_ndjson(rows, trailer)
+        else:
+            body = streaming.encode_json(rows, 'transactions', trailer)
+        return StreamingResponse(body, media_type=streaming.STREAM_FORMATS[stream])
+
+    limit = min(limit, MAX_TRANSACTIONS_LIMIT)
+    transactions = await fetch_transactions(decision, limit, cursor)
+    record_decision(decision, rows=len(transactions))
+
+    return FastJSONResponse({
+        'transactions': list(transactions),
+        'count': len(transactions),
+        'next_cursor': cursor + limit if len(transactions) == limit else None,
+        **decision.envelope()
+    })
 
-    # Get features
-    features = extract_behavioral_features(session_id)
 
-    # Get ML risk
-    ml_risk = get_ml_risk(features)
+# -------------------------------------------------------------------
+# ENDPOINT 4: Get Balance (Quick Check)
+# -------------------------------------------------------------------
+
+@protected.get("/balance")
+async def get_balance(decision: Decision = Depends(get_decision)):
+    """
+    Quick balance check
+    """
+    account = await fetch_account(decision)
+    record_decision(decision)
 
-    # Calculate final risk
-    final_risk = calculate_final_risk(session_id, ml_risk)
+    return FastJSONResponse({
+        'balance': account.get('account_balance', 0),
+        'currency': 'USD',
+        **decision.envelope()
+    })
 
-    # Determine source
-    data_source = determine_data_source(final_risk)
 
-    # Route data
-    customer_id = session.get('customer_id', 1001)
+app.include_router(protected)
 
-    if data_source == 'honey':
-        transactions = generate_honey_transactions(customer_id, limit)
-    else:
-        transactions = get_real_transactions(customer_id, limit)
 
-    print(f"\n📋 TRANSACTIONS REQUEST")
-    print(f"Customer ID: {customer_id}")
-    print(f"Final Risk: {final_risk}/100")
-    print(f"Data Source: {data_source.upper()}")
-    print(f"Returning {len(transactions)} transactions\n")
+# -------------------------------------------------------------------
+# ENDPOINT 5: Metrics
+# Latency histograms and decision counters are updated as requests run;
+# the gauges below are read from each component's stats() per scrape.
+# -------------------------------------------------------------------
 
-    return {
-        'transactions': transactions,
-        'count': len(transactions),
-        '_risk_score': final_risk,
-        '_data_source': data_source
-    }
+def _gauge(name, help_text, value, **labels):
+    return name, 'gauge', help_text, [(labels, value)]
+
+
+def collect_state():
+    session_stats = get_session_stats()
+    yield _gauge('honeyguard_sessions', 'Live sessions', session_stats['sessions'])
+    yield _gauge('honeyguard_session_store_bytes', 'Approximate session store size',
+                 session_stats['approx_bytes'])
+    yield ('honeyguard_session_evictions_total', 'counter', 'Sessions removed by the store',
+           [({'reason': key[len('evicted_'):]}, value)
+            for key, value in session_stats.items() if key.startswith('evicted_')])
+
+    pool_stats = honey_pool.stats()
+    yield _gauge('honeyguard_honey_pool_pages', 'Pre-generated honey transaction pages',
+                 pool_stats['transaction_pages'])
+    yield ('honeyguard_honey_pool_requests_total', 'counter', 'Honey pool lookups',
+           [({'result': 'hit'}, pool_stats['hits']), ({'result': 'miss'}, pool_stats['misses'])])
+
+    cache_stats = decision_cache.stats()
+    yield _gauge('honeyguard_decision_cache_entries', 'Sessions with a cached score',
+                 cache_stats['entries'])
+    yield ('honeyguard_decision_cache_requests_total', 'counter', 'Decision cache lookups',
+           [({'result': 'hit'}, cache_stats['hits']), ({'result': 'miss'}, cache_stats['misses'])])
+
+    customer_cache = data_handler.store.cache.stats()
+    yield _gauge('honeyguard_customer_cache_entries', 'Customer records in the LRU',
+                 customer_cache['entries'])
+    yield ('honeyguard_customer_cache_requests_total', 'counter', 'Customer LRU lookups',
+           [({'result': 'hit'}, customer_cache['hits']),
+            ({'result': 'miss'}, customer_cache['misses'])])
+
+    limiter_stats = rate_limiter.limiter.stats()
+    yield ('honeyguard_throttled_total', 'counter', 'Requests over a rate limit, by action',
+           [({'action': action}, count) for action, count in limiter_stats['throttled'].items()])
+    yield ('honeyguard_rate_limit_buckets', 'gauge', 'Active token buckets',
+           [({'key': kind}, count) for kind, count in limiter_stats['buckets'].items()])
+
+    audit_stats = audit_log.stats()
+    yield _gauge('honeyguard_audit_queue', 'Audit records waiting to be written',
+                 audit_stats['queued'])
+    yield ('honeyguard_audit_dropped_total', 'counter', 'Audit records dropped on overflow',
+           [({}, audit_stats['dropped'])])
+
+    heuristics_stats = heuristics.engine.stats()
+    yield ('honeyguard_heuristics_entries', 'gauge', 'Blocklist entries loaded',
+           [({'list': name}, heuristics_stats[name])
+            for name in ('disposable_domains', 'suspicious_names', 'automated_agents',
+                         'ip_networks')])
+    yield ('honeyguard_heuristics_reloads_total', 'counter', 'Blocklist reloads',
+           [({'result': 'ok'}, heuristics_stats['reloads']),
+            ({'result': 'error'}, heuristics_stats['reload_errors'])])
+    yield _gauge('honeyguard_login_tracked_ips', 'IPs in the login rate tracker',
+                 reputation.login_rate.stats()['tracked_ips'])
+
+
+metrics.register_collector(collect_state)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Prometheus scrape endpoint (text format 0.0.4)
+    """
+    return PlainTextResponse(metrics.render(),
+                             media_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 # -------------------------------------------------------------------
-# ENDPOINT 4: Get Balance (Quick Check)
+# ENDPOINT 6: Admin - request profiling
 # -------------------------------------------------------------------
 
-@app.get("/balance")
-def get_balance(session_id: str = Header(..., alias="X-Session-ID")):
+def require_admin(token: Optional[str] = Header(None, alias="X-Admin-Token")):
     """
-    Quick balance check
+    FastAPI dependency: reject requests without the admin token
     """
+    if not ADMIN_TOKEN or token is None or not secrets.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+class ProfilerSettings(BaseModel):
+    enabled: bool
+    sample_rate: Optional[float] = Field(None, ge=0, le=1)
 
-    # Validate session
-    session = get_session(session_id)
-    if not session:
-        raise HTTPException(status_code=401, detail="Invalid session ID")
 
-    # Record request
-    record_request(session_id, '/balance')
+admin = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
 
-    # Get features
-    features = extract_behavioral_features(session_id)
 
-    # Get risks
-    ml_risk = get_ml_risk(features)
-    final_risk = calculate_final_risk(session_id, ml_risk)
-    data_source = determine_data_source(final_risk)
+@admin.get("/profiler")
+def get_profiler():
+    """
+    Profiling state
+    """
+    return profiler.stats()
 
-    # Route data
-    customer_id = session.get('customer_id', 1001)
 
-    if data_source == 'real':
-        account = get_real_customer(customer_id)
-    elif data_source == 'randomized':
-        account = get_randomized_real_data(customer_id)
+@admin.post("/profiler")
+def set_profiler(settings: ProfilerSettings):
+    """
+    Turn request sampling on/off and set the sampled fraction
+    """
+    if settings.enabled:
+        profiler.enable(settings.sample_rate)
     else:
-        account = generate_honey_customer(customer_id)
+        profiler.disable()
+    return profiler.stats()
 
-    return {
-        'balance': account.get('account_balance', 0),
-        'currency': 'USD',
-        '_risk_score': final_risk,
-        '_data_source': data_source
-    }
+
+@admin.post("/profiler/flush")
+def flush_profiler():
+    """
+    Write the collapsed stacks collected so far, now
+    """
+    return {'path': profiler.flush(), **profiler.stats()}
+
+
+app.include_router(admin)
 
 
 # -------------------------------------------------------------------
-# ENDPOINT 5: Health Check
+# ENDPOINT 7: Health Check
 # -------------------------------------------------------------------
 
 @app.get("/")
-def root():
+async def root():
     """
     Health check endpoint
     """
@@ -291,7 +402,8 @@ def root():
             'POST /login',
             'GET /account',
             'GET /transactions',
-            'GET /balance'
+            'GET /balance',
+            'GET /metrics'
         ]
     }
 
@@ -311,6 +423,7 @@ if __name__ == "__main__":
     print("  🟢 0-34: Real data (low risk)")
     print("  🟡 35-69: Randomized real data (medium risk)")
     print("  🔴 70-100: Honey data (high risk - attacker)")
+    print(f"\nAudit log ({audit_log.AUDIT_LEVEL}): {audit_log.audit_path()}")
     print("="*60 + "\n")
 
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,150 @@
+"""
+Audit Log
+Structured decision records, buffered in memory and written in batches
+to rotating JSON-lines files by a background thread
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+# off   - no records are built or queued (zero cost on the request path)
+# info  - decision records go to the audit file
+# debug - as info, and the writer also echoes each record to stdout
+AUDIT_LEVEL = os.environ.get('HONEYGUARD_AUDIT_LEVEL', 'info').lower()
+# '{pid}' is replaced with the process id: every uvicorn worker writes
+# and rotates its own file, since rotation renames files under the
+# other writers otherwise
+AUDIT_PATH = os.environ.get('HONEYGUARD_AUDIT_PATH', 'logs/decisions-{pid}.jsonl')
+AUDIT_MAX_BYTES = int(os.environ.get('HONEYGUARD_AUDIT_MAX_BYTES', 64 * 1024 * 1024))
+AUDIT_BACKUPS = int(os.environ.get('HONEYGUARD_AUDIT_BACKUPS', 5))
+
+FLUSH_INTERVAL = 0.5        # seconds between writer wake-ups
+BATCH_SIZE = 1024           # max records per write() call
+QUEUE_LIMIT = 100_000       # records beyond this are dropped, not blocked on
+
+# Checked by callers before building a record: `if audit_log.ENABLED:`
+ENABLED = AUDIT_LEVEL != 'off'
+
+_queue = deque()
+_dropped = 0
+_writer = None
+_stop = threading.Event()
+
+
+def audit(event, **fields):
+    """
+    Queue one audit record (cheap: no formatting on the request path)
+
+    Args:
+        event: str - record type, e.g. 'login' or 'decision'
+        **fields: JSON-serializable record fields
+    """
+    global _dropped
+    if not ENABLED:
+        return
+    if len(_queue) >= QUEUE_LIMIT:
+        _dropped += 1
+        return
+    fields['event'] = event
+    fields['ts'] = time.time()
+    _queue.append(fields)
+
+
+def stats():
+    """
+    Queue depth and dropped-record count
+
+    Returns:
+        dict
+    """
+    return {'queued': len(_queue), 'dropped': _dropped}
+
+
+def audit_path(pid=None):
+    """
+    This process's audit file (AUDIT_PATH with '{pid}' filled in)
+    """
+    return AUDIT_PATH.replace('{pid}', str(os.getpid() if pid is None else pid))
+
+
+class _RotatingWriter:
+    """Appends batches to the audit file, rotating by size like logging's
+    RotatingFileHandler (decisions-<pid>.jsonl -> .1 -> .2 ...)"""
+
+    def __init__(self, path, max_bytes, backups):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.stream = open(path, 'ab')
+
+    def write(self, data):
+        # Size on disk, in bytes, whatever else appended to the file
+        size = os.fstat(self.stream.fileno()).st_size
+        if size and size + len(data) > self.max_bytes:
+            self.rotate()
+        self.stream.write(data)
+        self.stream.flush()
+
+    def rotate(self):
+        self.stream.close()
+        for i in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        self.stream = open(self.path, 'wb')
+
+    def close(self):
+        self.stream.close()
+
+
+def _drain(writer):
+    while _queue:
+        lines = []
+        while _queue and len(lines) < BATCH_SIZE:
+            lines.append(json.dumps(_queue.popleft(), default=str))
+        text = '\n'.join(lines) + '\n'
+        writer.write(text.encode('utf-8'))
+        if AUDIT_LEVEL == 'debug':
+            sys.stdout.write(text)
+
+
+def start_audit_writer():
+    """
+    Start the background thread that flushes queued records
+    """
+    global _writer
+    if not ENABLED or (_writer is not None and _writer.is_alive()):
+        return
+    _stop.clear()
+    writer = _RotatingWriter(audit_path(), AUDIT_MAX_BYTES, AUDIT_BACKUPS)
+
+    def _run():
+        try:
+            while not _stop.wait(FLUSH_INTERVAL):
+                _drain(writer)
+            _drain(writer)
+        finally:
+            writer.close()
+
+    _writer = threading.Thread(target=_run, name='audit-writer', daemon=True)
+    _writer.start()
+
+
+def stop_audit_writer():
+    """
+    Flush everything still queued and stop the writer thread
+    """
+    global _writer
+    _stop.set()
+    if _writer is not None:
+        _writer.join(timeout=5.0)
+        _writer = None
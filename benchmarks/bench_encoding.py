@@ -0,0 +1,100 @@
+"""
+Response Encoding Benchmark
+Cost of serializing an /account response: FastAPI's default path
+(merge into a dict, jsonable_encoder, json.dumps) against
+encoding.encode_record with the orjson and standard-library encoders
+
+Usage:
+    python benchmarks/bench_encoding.py [--calls 20000]
+
+Prints one JSON object per (record tier, method).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+import encoding  # noqa: E402
+import honey_generator  # noqa: E402
+import record_views  # noqa: E402
+from data_handler import get_real_customer, perturbation_policy  # noqa: E402
+from record_views import FrozenRecord  # noqa: E402
+
+ENVELOPE = {'_risk_score': 54, '_data_source': 'randomized', '_ml_risk': 40, '_initial_risk': 70}
+
+
+def _time(fn, calls, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best / calls
+
+
+def before(record):
+    # What /account did: merged dict, jsonable_encoder, JSONResponse.render
+    return JSONResponse(None).render(jsonable_encoder({**record, **ENVELOPE}))
+
+
+def after(record):
+    return encoding.encode_record(record, ENVELOPE)
+
+
+def use_encoder(dumps):
+    # Swap the encoder everywhere it is bound and drop cached encodings
+    encoding.dumps = record_views.dumps = dumps
+    honey_generator._honey_identity.cache_clear()
+
+
+def records():
+    # Placeholder record (20 fields), its session-perturbed view and a decoy
+    real = FrozenRecord(get_real_customer(1001), version='bench')
+    return {
+        'real': lambda: real,
+        'randomized': lambda: perturbation_policy.apply(real, 7),
+        'honey': lambda: honey_generator.generate_honey_customer(1001)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Response encoding benchmark')
+    parser.add_argument('--calls', type=int, default=20_000)
+    args = parser.parse_args()
+
+    encoders = {'json': encoding._json_dumps}
+    if encoding.orjson is not None:
+        encoders['orjson'] = encoding.orjson.dumps
+    original = encoding.dumps
+
+    results = {}
+    try:
+        for tier, get_record in records().items():
+            results[tier, 'default'] = _time(lambda: before(get_record()), args.calls)
+        for name, dumps in encoders.items():
+            use_encoder(dumps)
+            for tier, get_record in records().items():
+                assert json.loads(after(get_record())) == json.loads(before(get_record()))
+                results[tier, name] = _time(lambda: after(get_record()), args.calls)
+    finally:
+        use_encoder(original)
+
+    for (tier, method), seconds in results.items():
+        print(json.dumps({
+            'tier': tier,
+            'method': method,
+            'us_per_response': round(seconds * 1e6, 2),
+            'speedup': round(results[tier, 'default'] / seconds, 1)
+        }))
+
+
+if __name__ == '__main__':
+    main()
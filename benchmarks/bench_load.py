@@ -0,0 +1,310 @@
+"""
+End-to-end Load Generator
+Drives the API with a mix of simulated clients and reports throughput,
+latency percentiles, status codes, data-source tiers and server RSS
+
+    human    logs in from a browser, then reads /account, /balance and
+             /transactions with think time between requests
+    scraper  logs in with a script user agent and pages through
+             /transactions (limit=100) as fast as it can
+    stuffer  credential stuffing: repeated logins from a few shared
+             IPs with throwaway emails, one /account after each
+
+Targets:
+    --target inprocess  the app in this process over an ASGI transport
+                        (default; client and server share one CPU, so
+                        use it for relative comparisons)
+    --target uvicorn    a uvicorn server started on --port
+    --url URL           an already running server (RSS not reported)
+
+Client IPs are simulated: per-client ASGI transports in-process,
+X-Forwarded-For against uvicorn (trusted from 127.0.0.1 by default).
+Needs httpx (also required by FastAPI's TestClient).
+
+Usage:
+    python benchmarks/bench_load.py [--users 50] [--duration 10]
+        [--mix human=0.7,scraper=0.2,stuffer=0.1] [--think 0.5]
+        [--target inprocess|uvicorn] [--no-rate-limit] [--output load.json]
+
+Prints one JSON object per client type, per endpoint and overall (see
+harness.py).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from harness import Report, latency_summary, rss_mb  # noqa: E402
+
+BROWSER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_1) AppleWebKit/605.1.15 '
+    '(KHTML, like Gecko) Version/17.1 Safari/605.1.15',
+]
+SCRIPT_AGENTS = ['python-requests/2.31.0', 'curl/8.4.0', 'Go-http-client/1.1']
+THROWAWAY_DOMAINS = ['tempmail.com', 'guerrillamail.com', '10minutemail.com']
+CUSTOMER_IDS = range(1001, 1006)
+
+# Stuffers rotate through this many shared source IPs
+STUFFER_IPS = 3
+
+
+class Recorder:
+    """
+    Latencies, status codes and data-source tiers per client type and
+    endpoint
+    """
+
+    def __init__(self):
+        self.latency = defaultdict(list)        # (persona, endpoint) -> [seconds]
+        self.statuses = defaultdict(Counter)    # (persona, endpoint) -> {status: n}
+        self.tiers = defaultdict(Counter)       # persona -> {data_source: n}
+        self.errors = Counter()                 # persona -> transport errors
+
+    async def call(self, client, persona, method, path, **kwargs):
+        endpoint = path.split('?', 1)[0]
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except httpx.HTTPError:
+            self.errors[persona] += 1
+            return None
+        self.latency[persona, endpoint].append(time.perf_counter() - start)
+        self.statuses[persona, endpoint][response.status_code] += 1
+        if response.status_code == 200 and endpoint != '/login':
+            self.tiers[persona][response.json().get('_data_source')] += 1
+        return response
+
+
+async def _login(recorder, client, persona, rng, email, user_agent):
+    response = await recorder.call(client, persona, 'POST', '/login', json={
+        'customer_id': rng.choice(CUSTOMER_IDS), 'email': email, 'password': 'x'
+    }, headers={'User-Agent': user_agent})
+    if response is None or response.status_code != 200:
+        return None
+    return {'X-Session-ID': response.json()['session_id'], 'User-Agent': user_agent}
+
+
+async def human(recorder, client, rng, deadline, think):
+    email = f'{rng.choice(["alex", "sam", "jordan", "casey"])}.{rng.randint(1, 99)}@example.com'
+    headers = await _login(recorder, client, 'human', rng, email, rng.choice(BROWSER_AGENTS))
+    while headers and time.monotonic() < deadline:
+        path = rng.choice(['/account', '/balance', '/transactions?limit=10'])
+        await recorder.call(client, 'human', 'GET', path, headers=headers)
+        if think:
+            await asyncio.sleep(rng.expovariate(1 / think))
+
+
+async def scraper(recorder, client, rng, deadline, think):
+    email = f'user{rng.randint(10000, 99999)}@example.com'
+    headers = await _login(recorder, client, 'scraper', rng, email, rng.choice(SCRIPT_AGENTS))
+    cursor = 0
+    while headers and time.monotonic() < deadline:
+        response = await recorder.call(client, 'scraper', 'GET',
+                                       f'/transactions?limit=100&cursor={cursor}',
+                                       headers=headers)
+        next_cursor = response.json().get('next_cursor') if response is not None \
+            and response.status_code == 200 else None
+        cursor = next_cursor or 0
+        await asyncio.sleep(0)
+
+
+async def stuffer(recorder, client, rng, deadline, think):
+    while time.monotonic() < deadline:
+        email = f'{rng.randint(100000, 999999)}@{rng.choice(THROWAWAY_DOMAINS)}'
+        headers = await _login(recorder, client, 'stuffer', rng, email,
+                               rng.choice(SCRIPT_AGENTS))
+        if headers:
+            await recorder.call(client, 'stuffer', 'GET', '/account', headers=headers)
+        await asyncio.sleep(0)
+
+
+PERSONAS = {'human': human, 'scraper': scraper, 'stuffer': stuffer}
+
+
+def parse_mix(text):
+    """
+    'human=0.7,scraper=0.2,stuffer=0.1' -> {'human': 0.7, ...}
+    """
+    mix = {}
+    for item in text.split(','):
+        name, weight = item.split('=')
+        if name not in PERSONAS:
+            raise ValueError(f'unknown client type {name!r}')
+        mix[name] = float(weight)
+    return mix
+
+
+def assign(users, mix):
+    """
+    Client type of each of `users` simulated clients, in proportion to
+    `mix` (every type with a weight gets at least one)
+    """
+    total = sum(mix.values())
+    counts = {name: max(1, round(users * weight / total))
+              for name, weight in mix.items() if weight > 0}
+    return [name for name, count in counts.items() for _ in range(count)]
+
+
+def _client_ip(persona, index, rng):
+    if persona == 'stuffer':
+        return f'203.0.113.{index % STUFFER_IPS + 1}'
+    return f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}'
+
+
+async def drive(make_client, users, mix, duration, think, seed):
+    """
+    Run the simulated clients for `duration` seconds
+
+    Args:
+        make_client: callable(ip) -> httpx.AsyncClient
+
+    Returns:
+        (Recorder, elapsed seconds)
+    """
+    rng = random.Random(seed)
+    recorder = Recorder()
+    deadline = time.monotonic() + duration
+    clients = []
+    tasks = []
+    for index, persona in enumerate(assign(users, mix)):
+        client = make_client(_client_ip(persona, index, rng))
+        clients.append(client)
+        tasks.append(PERSONAS[persona](recorder, client, random.Random(rng.random()),
+                                       deadline, think))
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for client in clients:
+            await client.aclose()
+    return recorder, time.perf_counter() - start
+
+
+def summarize(report, recorder, elapsed, server_rss):
+    by_persona = defaultdict(list)
+    by_endpoint = defaultdict(list)
+    statuses = defaultdict(Counter)
+    for (persona, endpoint), latencies in recorder.latency.items():
+        by_persona[persona].extend(latencies)
+        by_endpoint[endpoint].extend(latencies)
+        statuses[persona].update(recorder.statuses[persona, endpoint])
+        statuses[endpoint].update(recorder.statuses[persona, endpoint])
+
+    def result(name, latencies, **extra):
+        return {'name': f'load/{name}',
+                'requests_per_second': round(len(latencies) / elapsed, 1),
+                **latency_summary(latencies), **extra}
+
+    for persona, latencies in sorted(by_persona.items()):
+        report.add(result(f'persona={persona}', latencies,
+                          statuses={str(k): v for k, v in sorted(statuses[persona].items())},
+                          data_sources=dict(recorder.tiers[persona]),
+                          transport_errors=recorder.errors[persona]))
+    for endpoint, latencies in sorted(by_endpoint.items()):
+        report.add(result(f'endpoint={endpoint}', latencies,
+                          statuses={str(k): v for k, v in sorted(statuses[endpoint].items())}))
+    everything = [latency for latencies in by_persona.values() for latency in latencies]
+    report.add(result('all', everything, elapsed_s=round(elapsed, 2), **server_rss))
+
+
+async def run_inprocess(args, mix):
+    # Settings are read at import time
+    import app as honeyguard
+
+    def make_client(ip):
+        transport = httpx.ASGITransport(honeyguard.app, client=(ip, 40000))
+        return httpx.AsyncClient(transport=transport, base_url='http://honeyguard')
+
+    async with honeyguard.app.router.lifespan_context(honeyguard.app):
+        recorder, elapsed = await drive(make_client, args.users, mix, args.duration,
+                                        args.think, args.seed)
+        return recorder, elapsed, rss_mb()
+
+
+async def run_http(args, mix, url, pid=None):
+    limits = httpx.Limits(max_keepalive_connections=1)
+
+    def make_client(ip):
+        return httpx.AsyncClient(base_url=url, limits=limits, timeout=30,
+                                 headers={'X-Forwarded-For': ip})
+
+    recorder, elapsed = await drive(make_client, args.users, mix, args.duration,
+                                    args.think, args.seed)
+    return recorder, elapsed, rss_mb(pid) if pid else {'rss_mb': None, 'peak_rss_mb': None}
+
+
+@contextlib.contextmanager
+def uvicorn_server(port):
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app:app', '--port', str(port),
+         '--log-level', 'warning'],
+        cwd=ROOT, env=dict(os.environ), stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if httpx.get(f'http://127.0.0.1:{port}/', timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError('server did not start')
+                time.sleep(0.2)
+        yield server
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end load generator')
+    parser.add_argument('--users', type=int, default=50, help='simulated clients')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--mix', default='human=0.7,scraper=0.2,stuffer=0.1')
+    parser.add_argument('--think', type=float, default=0.5,
+                        help='mean human think time, seconds (0 for none)')
+    parser.add_argument('--target', choices=('inprocess', 'uvicorn'), default='inprocess')
+    parser.add_argument('--url', help='load an already running server instead')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--no-rate-limit', action='store_true',
+                        help='measure the pipeline without throttling (own servers only)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='also write all results to this JSON file')
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    if args.no_rate_limit:
+        os.environ['HONEYGUARD_RATE_LIMIT'] = '0'
+    target = 'url' if args.url else args.target
+    report = Report(suite='load', target=target, users=args.users, mix=mix,
+                    duration_s=args.duration, think_s=args.think,
+                    rate_limit=not args.no_rate_limit)
+
+    if args.url:
+        outcome = asyncio.run(run_http(args, mix, args.url.rstrip('/')))
+    elif args.target == 'uvicorn':
+        with uvicorn_server(args.port) as server:
+            outcome = asyncio.run(run_http(args, mix, f'http://127.0.0.1:{args.port}',
+                                           server.pid))
+    else:
+        outcome = asyncio.run(run_inprocess(args, mix))
+
+    summarize(report, *outcome)
+    if args.output:
+        report.write(args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""
+Microbenchmarks
+Per-call latency of the hot functions behind a request:
+
+    features      extract_behavioral_features at growing session lengths
+    initial_risk  calculate_initial_risk with large blocklists (50k
+                  domains, keywords and blocked CIDRs): compiling the
+                  lists, compiled matching (heuristics.py) against the
+                  linear any(... in ...) scans it replaced, and login
+                  latency while the lists are hot-reloaded
+    honey         generate_honey_transactions at growing limits (rows
+                  materialized, as a response would)
+
+Usage:
+    python benchmarks/bench_micro.py [--only features honey]
+        [--session-lengths 10 1000 100000] [--entries 50000]
+        [--honey-limits 100 10000 100000] [--output micro.json]
+
+Prints one JSON object per measurement (see harness.py; compare runs
+with `python benchmarks/harness.py compare`).
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('HONEYGUARD_SESSION_BACKEND', 'memory')
+
+import heuristics  # noqa: E402
+import session_manager  # noqa: E402
+from harness import Report, latency_summary, rss_mb  # noqa: E402
+from honey_generator import generate_honey_transactions  # noqa: E402
+from risk_calculator import calculate_initial_risk  # noqa: E402
+
+ENDPOINTS = ('/account', '/transactions', '/balance')
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 '
+    '(KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1',
+    'python-requests/2.31.0',
+    'curl/8.4.0'
+]
+
+
+def result(name, durations, elapsed, **params):
+    """
+    Harness result for timed calls
+
+    Args:
+        durations: list of float - seconds per call
+        elapsed: float - wall time of all calls
+    """
+    label = ','.join(f'{key}={value}' for key, value in params.items())
+    return {
+        'name': f'{name}/{label}' if label else name,
+        'bench': name,
+        **params,
+        'ops_per_second': round(len(durations) / elapsed, 1),
+        **latency_summary(durations),
+        **rss_mb()
+    }
+
+
+def measure(name, fn, calls, **params):
+    """
+    Call fn() `calls` times, timing each call
+
+    Returns:
+        dict - a harness result
+    """
+    durations = []
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    for _ in range(calls):
+        t0 = perf_counter()
+        fn()
+        durations.append(perf_counter() - t0)
+    return result(name, durations, perf_counter() - start, **params)
+
+
+def bench_features(report, lengths, calls):
+    for length in lengths:
+        session_id = session_manager.create_session('bench')
+        for i in range(length):
+            session_manager.record_request(session_id, ENDPOINTS[i % len(ENDPOINTS)])
+        report.add(measure(
+            'features',
+            lambda: session_manager.extract_behavioral_features(session_id),
+            calls, session_length=length
+        ))
+
+
+def _word(rng, low, high):
+    return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(low, high)))
+
+
+def write_lists(directory, entries, rng):
+    # Real-shaped lists padded with random entries up to `entries` each
+    for name, filename in heuristics.LIST_FILES.items():
+        shipped = heuristics.read_list(os.path.join(heuristics.HEURISTICS_DIR, filename))
+        with open(os.path.join(directory, filename), 'w') as f:
+            f.write('\n'.join(shipped) + '\n')
+            if name == 'ip_allowlist':
+                continue
+            for _ in range(entries - len(shipped)):
+                if name == 'ip_blocklist':
+                    f.write(f'{rng.randrange(1, 224)}.{rng.randrange(256)}.'
+                            f'{rng.randrange(256)}.0/{rng.choice((16, 20, 24))}\n')
+                elif name == 'disposable_domains':
+                    f.write(f'{_word(rng, 5, 12)}.{rng.choice(("com", "net", "io", "xyz"))}\n')
+                else:
+                    f.write(_word(rng, 6, 12) + '\n')
+
+
+def logins(n, domains, rng):
+    batch = []
+    for i in range(n):
+        domain = rng.choice(domains) if i % 10 == 0 else 'example.com'
+        ip = f'{rng.randrange(1, 224)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}'
+        batch.append((
+            {'email': f'{_word(rng, 5, 10)}{rng.randint(0, 99)}@{domain}',
+             'name': f'{_word(rng, 4, 8)} {_word(rng, 5, 10)}'},
+            {'user_agent': rng.choice(USER_AGENTS), 'ip': ip}
+        ))
+    return batch
+
+
+def linear_initial_risk(user_data, request_metadata, lists):
+    # The pre-heuristics.py matching: one substring scan per entry
+    email = user_data['email'].lower()
+    name = user_data['name'].lower()
+    user_agent = request_metadata['user_agent'].lower()
+    risk = 0
+    if any(domain in email for domain in lists['disposable_domains']):
+        risk += 30
+    if any(word in name for word in lists['suspicious_names']):
+        risk += 15
+    if any(tool in user_agent for tool in lists['automated_agents']):
+        risk += 25
+    return risk
+
+
+def bench_initial_risk(report, entries, calls, rng):
+    with tempfile.TemporaryDirectory() as directory:
+        write_lists(directory, entries, rng)
+        lists = {name: heuristics.read_list(os.path.join(directory, filename))
+                 for name, filename in heuristics.LIST_FILES.items()}
+        previous = heuristics.engine
+        engines = []
+        report.add(measure(
+            'heuristics_compile',
+            lambda: engines.append(heuristics.HeuristicsEngine(directory, check_interval=0.01)),
+            1, entries_per_list=entries
+        ))
+        heuristics.engine = engines[0]
+        try:
+            batch = logins(calls, lists['disposable_domains'], rng)
+            logins_iter = iter(batch)
+            report.add(measure(
+                'initial_risk',
+                lambda: calculate_initial_risk(*next(logins_iter)),
+                calls, entries_per_list=entries
+            ))
+            # The linear scans are ~1000x slower; a sample is enough
+            linear_iter = iter(batch)
+            report.add(measure(
+                'initial_risk_linear',
+                lambda: linear_initial_risk(*next(linear_iter), lists),
+                max(1, calls // 100), entries_per_list=entries
+            ))
+            report.add(_reload_logins(directory, batch, entries))
+        finally:
+            heuristics.engine = previous
+
+
+def _reload_logins(directory, batch, entries):
+    # Touch a list, then keep logging in until the reload lands
+    path = os.path.join(directory, heuristics.LIST_FILES['suspicious_names'])
+    with open(path, 'a') as f:
+        f.write('reloaded\n')
+    engine = heuristics.engine
+    reloads = engine.reloads
+    durations = []
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    deadline = time.monotonic() + 60
+    while engine.reloads == reloads and time.monotonic() < deadline:
+        t0 = perf_counter()
+        calculate_initial_risk(*batch[len(durations) % len(batch)])
+        durations.append(perf_counter() - t0)
+    timed = result('initial_risk_reload', durations, perf_counter() - start,
+                   entries_per_list=entries)
+    timed['reloaded'] = engine.reloads > reloads
+    return timed
+
+
+def bench_honey(report, limits, row_budget):
+    for limit in limits:
+        calls = max(5, row_budget // limit)
+        result = measure('honey', lambda: list(generate_honey_transactions(1001, limit)),
+                         calls, limit=limit)
+        result['rows_per_second'] = round(result['ops_per_second'] * limit)
+        report.add(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hot-path microbenchmarks')
+    parser.add_argument('--only', nargs='+', choices=('features', 'initial_risk', 'honey'),
+                        default=('features', 'initial_risk', 'honey'))
+    parser.add_argument('--session-lengths', type=int, nargs='+',
+                        default=[10, 100, 1000, 10_000, 100_000])
+    parser.add_argument('--feature-calls', type=int, default=20_000)
+    parser.add_argument('--entries', type=int, default=50_000,
+                        help='entries per blocklist for initial_risk')
+    parser.add_argument('--logins', type=int, default=20_000)
+    parser.add_argument('--honey-limits', type=int, nargs='+',
+                        default=[10, 100, 1000, 10_000, 100_000])
+    parser.add_argument('--honey-rows', type=int, default=1_000_000,
+                        help='rows generated per honey limit')
+    parser.add_argument('--output', help='also write all results to this JSON file')
+    args = parser.parse_args()
+
+    report = Report(suite='micro')
+    if 'features' in args.only:
+        bench_features(report, args.session_lengths, args.feature_calls)
+    if 'initial_risk' in args.only:
+        bench_initial_risk(report, args.entries, args.logins, random.Random(7))
+    if 'honey' in args.only:
+        bench_honey(report, args.honey_limits, args.honey_rows)
+    if args.output:
+        report.write(args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+ML Scoring Benchmark
+Compares the rule-based scorer with the Isolation Forest, per call and
+in batches
+
+Usage:
+    python benchmarks/bench_ml.py [--rows 100000] [--trees 100]
+
+Prints one JSON object per scorer.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ml_detector  # noqa: E402
+from isolation_forest import IsolationForest  # noqa: E402
+
+
+def synthetic_sessions(n, rng):
+    """
+    Mostly human-paced sessions with a slice of fast scrapers
+
+    Returns:
+        np.ndarray, shape (n, 5), columns in ml_detector.FEATURE_NAMES order
+    """
+    duration = rng.uniform(0.5, 30, n)
+    rpm = rng.poisson(2, n).astype(np.float64)
+    gap = rng.exponential(20, n)
+    endpoints = rng.integers(1, 4, n).astype(np.float64)
+    total = np.maximum(1, rpm * duration)
+
+    scrapers = rng.random(n) < 0.05
+    rpm[scrapers] = rng.uniform(20, 120, scrapers.sum())
+    gap[scrapers] = rng.uniform(0.05, 1.0, scrapers.sum())
+    total[scrapers] = rpm[scrapers] * duration[scrapers]
+    return np.column_stack([rpm, gap, duration, endpoints, total])
+
+
+def _time(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench(name, rows, single_rows):
+    batch_s = _time(lambda: ml_detector.get_ml_risk_batch(rows))
+    dicts = [dict(zip(ml_detector.FEATURE_NAMES, row)) for row in single_rows]
+    single_s = _time(lambda: [ml_detector.get_ml_risk(d) for d in dicts])
+    return {
+        'scorer': name,
+        'batch_rows': len(rows),
+        'batch_rows_per_second': round(len(rows) / batch_s),
+        'single_call_us': round(single_s / len(dicts) * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ML scoring benchmark')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--trees', type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    train = synthetic_sessions(20_000, rng)
+    rows = synthetic_sessions(args.rows, rng)
+    single_rows = rows[:2000]
+
+    ml_detector.unload_model()
+    print(json.dumps(bench('rules', rows, single_rows)))
+
+    start = time.perf_counter()
+    model = IsolationForest.fit(train, n_trees=args.trees, seed=1)
+    fit_s = time.perf_counter() - start
+    ml_detector._model = model
+    result = bench('isolation_forest', rows, single_rows)
+    result['fit_seconds'] = round(fit_s, 2)
+    result['nodes'] = len(model.feature)
+    print(json.dumps(result))
+    ml_detector.unload_model()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Model Loading Benchmark
+Cold-start time and per-worker memory for .npz vs memory-mapped models
+
+Starts N worker processes that each load the same model and score a
+batch (touching every page), then reports load time, RSS and PSS per
+worker. PSS splits shared pages between the processes mapping them, so
+it shows the saving from sharing one page-cache copy.
+
+Usage:
+    python benchmarks/bench_model_load.py [--workers 4] [--trees 300] [--sample-size 2048]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _memory_kb():
+    rss = pss = 0
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                rss = int(line.split()[1])
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    pss = int(line.split()[1])
+    except OSError:
+        pass
+    return rss, pss
+
+
+def _worker(path, ready, measure, results):
+    import numpy as np
+    import ml_detector
+
+    rows = np.random.default_rng(0).normal(0, 1, (2048, len(ml_detector.FEATURE_NAMES)))
+    before_rss, before_pss = _memory_kb()
+    start = time.perf_counter()
+    ml_detector.load_model(path)
+    load_s = time.perf_counter() - start
+    ml_detector.get_ml_risk_batch(rows)
+    first_score_s = time.perf_counter() - start
+
+    ready.wait()        # every worker has the model loaded...
+    rss, pss = _memory_kb()
+    measure.wait()      # ...before anyone exits
+    results.put({
+        'load_ms': load_s * 1000,
+        'first_score_ms': first_score_s * 1000,
+        'model_rss_kb': rss - before_rss,
+        'model_pss_kb': pss - before_pss,
+    })
+
+
+def run(path, workers):
+    ctx = multiprocessing.get_context('spawn')
+    ready = ctx.Barrier(workers)
+    measure = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(path, ready, measure, results))
+             for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    rows = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    return {key: round(sum(r[key] for r in rows) / len(rows), 1) for key in rows[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Model loading benchmark')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--trees', type=int, default=300)
+    parser.add_argument('--sample-size', type=int, default=2048)
+    args = parser.parse_args()
+
+    import numpy as np
+    from isolation_forest import IsolationForest
+
+    train = np.random.default_rng(1).normal(0, 1, (20_000, 5))
+    model = IsolationForest.fit(train, args.trees, args.sample_size, seed=1)
+    workdir = tempfile.mkdtemp(prefix='honeyguard-model-')
+    npz_path = os.path.join(workdir, 'model.npz')
+    mapped_path = os.path.join(workdir, 'model.ifm')
+    model.save(npz_path)
+    model.save_mapped(mapped_path)
+
+    for name, path in (('npz', npz_path), ('mapped', mapped_path)):
+        result = {'format': name, 'workers': args.workers,
+                  'nodes': len(model.feature),
+                  'file_kb': os.path.getsize(path) // 1024}
+        result.update(run(path, args.workers))
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Replay Benchmark
+Writes synthetic labelled session traces (humans, scrapers, credential
+stuffers) and times replay.py over them
+
+Usage:
+    python benchmarks/bench_replay.py [--sessions 1000000] [--shards 8]
+        [--workers 1 4] [--dir /tmp/traces]
+
+Prints one JSON object per worker count (throughput, plus the false
+positive and detection rates of the current weights).
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import replay  # noqa: E402
+from session_traces import write_trace  # noqa: E402
+
+ENDPOINTS = ['/account', '/transactions', '/balance']
+USER_AGENTS = ['', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)', 'python-requests/2.31.0']
+
+# kind: share of sessions, label, requests (low, high), mean gap seconds,
+# initial risk (low, high), user agent index
+KINDS = {
+    'human': (0.85, 0, (3, 40), 20.0, (0, 30), 1),
+    'scraper': (0.10, 1, (50, 400), 0.4, (20, 60), 2),
+    'stuffer': (0.05, 1, (0, 2), 1.0, (55, 85), 2),
+}
+
+
+def synthetic_columns(n_sessions, rng):
+    """
+    Trace columns for `n_sessions` sessions drawn from KINDS
+
+    Returns:
+        dict - columns for session_traces.write_trace
+    """
+    names = list(KINDS)
+    kind = rng.choice(len(names), n_sessions, p=[KINDS[name][0] for name in names])
+    counts = np.zeros(n_sessions, dtype=np.int64)
+    gaps = np.zeros(n_sessions)
+    columns = {
+        'created_at': 1.7e9 + np.sort(rng.uniform(0, 86400, n_sessions)),
+        'customer_id': rng.integers(1001, 1006, n_sessions),
+        'initial_risk': np.zeros(n_sessions, dtype=np.uint8),
+        'user_agent': np.zeros(n_sessions, dtype=np.uint32),
+        'recorded_tier': np.full(n_sessions, -1, dtype=np.int8),
+        'label': np.zeros(n_sessions, dtype=np.int8),
+    }
+    for code, name in enumerate(names):
+        _, label, (low, high), gap, (risk_low, risk_high), user_agent = KINDS[name]
+        mask = kind == code
+        size = int(mask.sum())
+        counts[mask] = rng.integers(low, high + 1, size)
+        gaps[mask] = gap
+        columns['initial_risk'][mask] = rng.integers(risk_low, risk_high + 1, size)
+        columns['user_agent'][mask] = user_agent
+        columns['label'][mask] = label
+
+    session = np.repeat(np.arange(n_sessions), counts)
+    # Exponential gaps between requests, the first a few seconds after login
+    steps = rng.exponential(1.0, len(session)) * gaps[session]
+    offsets = np.cumsum(steps)
+    starts = np.concatenate(([0], np.cumsum(counts)))
+    offsets -= np.concatenate(([0.0], offsets))[starts[:-1]][session]
+    columns['request_start'] = starts
+    columns['offset'] = offsets + 2.0
+    columns['endpoint'] = rng.integers(0, len(ENDPOINTS), len(session))
+    return columns
+
+
+def write_shards(directory, sessions, shards, rng):
+    paths = []
+    for shard in range(shards):
+        path = os.path.join(directory, f'shard-{shard:04d}.hgt')
+        write_trace(path, synthetic_columns(sessions // shards, rng), ENDPOINTS, USER_AGENTS)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay benchmark')
+    parser.add_argument('--sessions', type=int, default=1_000_000)
+    parser.add_argument('--shards', type=int, default=8)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--dir', help='keep the traces here (default: a temp dir)')
+    args = parser.parse_args()
+    rng = np.random.default_rng(3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.dir or tmp
+        os.makedirs(directory, exist_ok=True)
+        start = time.perf_counter()
+        paths = write_shards(directory, args.sessions, args.shards, rng)
+        size = sum(os.path.getsize(path) for path in paths)
+        print(json.dumps({'measure': 'write', 'sessions': args.sessions,
+                          'seconds': round(time.perf_counter() - start, 2),
+                          'bytes': size}))
+
+        configs = [replay.ReplayConfig()]
+        for workers in sorted(set(args.workers)):
+            start = time.perf_counter()
+            totals = replay.replay(paths, configs, workers)
+            elapsed = time.perf_counter() - start
+            result = replay.report(configs, totals)[0]
+            print(json.dumps({
+                'measure': 'replay', 'workers': workers,
+                'sessions': args.sessions,
+                'requests': int(totals[0]['requests'].sum()),
+                'seconds': round(elapsed, 2),
+                'sessions_per_second': round(args.sessions / elapsed),
+                'false_positive_rate': result['false_positives']['rate'],
+                'detection_rate': result['detection']['rate'],
+            }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Worker Scaling Benchmark
+Measures request throughput of N uvicorn worker processes sharing the
+SQLite session backend
+
+Each worker is its own single-process uvicorn on consecutive ports
+(equivalent to `--workers N`, but every client logs in on the first
+worker and then spreads its requests across all of them, so every
+request after the first exercises a cross-process session lookup).
+
+Usage:
+    python benchmarks/bench_workers.py --workers 1 2 4 --duration 10
+
+Prints one JSON object per worker count.
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _client(ports, duration, result_queue):
+    # Keep-alive connection per worker: log in on the first, then
+    # round-robin /balance over all of them
+    conns = [http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+             for port in ports]
+    body = json.dumps({'customer_id': 1001, 'email': 'bench@example.com',
+                       'password': 'x'})
+    conns[0].request('POST', '/login', body, {'Content-Type': 'application/json',
+                                              'User-Agent': 'Mozilla/5.0 bench'})
+    session_id = json.loads(conns[0].getresponse().read())['session_id']
+
+    done = errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        conn = conns[(done + errors) % len(conns)]
+        conn.request('GET', '/balance', headers={'X-Session-ID': session_id})
+        response = conn.getresponse()
+        response.read()
+        if response.status == 200:
+            done += 1
+        else:
+            errors += 1
+    result_queue.put((done, errors))
+
+
+def _wait_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def run(workers, clients, duration, port):
+    """
+    Start `workers` uvicorn processes and drive them with `clients`
+
+    Returns:
+        dict - throughput summary
+    """
+    db_dir = tempfile.mkdtemp(prefix='honeyguard-bench-')
+    # Rate limiting off: this measures pipeline throughput, not the tarpit
+    env = dict(os.environ,
+               HONEYGUARD_RATE_LIMIT='0',
+               HONEYGUARD_SESSION_BACKEND='sqlite',
+               HONEYGUARD_SESSION_DB=os.path.join(db_dir, 'sessions.db'))
+    ports = [port + i for i in range(workers)]
+    servers = [
+        subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'app:app', '--port', str(p),
+             '--log-level', 'warning'],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+        for p in ports
+    ]
+    try:
+        for p in ports:
+            _wait_ready(p)
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=_client, args=(ports, duration, results))
+                 for _ in range(clients)]
+        for proc in procs:
+            proc.start()
+        totals = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+    finally:
+        for server in servers:
+            server.terminate()
+        for server in servers:
+            server.wait()
+
+    done = sum(t[0] for t in totals)
+    errors = sum(t[1] for t in totals)
+    return {
+        'workers': workers,
+        'clients': clients,
+        'duration_s': duration,
+        'requests': done,
+        'errors': errors,
+        'requests_per_second': round(done / duration, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=None,
+                        help='client processes (default: 2 per worker)')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        clients = args.clients or 2 * workers
+        print(json.dumps(run(workers, clients, args.duration, args.port)), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmark Harness
+Shared helpers for bench_micro.py and bench_load.py: latency
+percentiles, RSS, JSON result files, and regression comparison
+
+Every result is a flat dict whose 'name' identifies the measurement
+(e.g. 'features/session_length=1000'); results are printed one JSON
+object per line and, with --output, written as one document:
+
+    {"meta": {...}, "results": [{...}, ...]}
+
+Compare two such files:
+    python benchmarks/harness.py compare BASELINE.json CURRENT.json [--tolerance 0.1]
+
+Exits 1 if any measurement lost more than `tolerance` of its
+throughput or gained more than `tolerance` on its p50/p99 latency.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+# Higher is better for these keys, lower for the latency ones
+THROUGHPUT_KEYS = ('ops_per_second', 'requests_per_second')
+LATENCY_KEYS = ('p50_ms', 'p99_ms')
+
+
+def percentile(sorted_values, q):
+    """
+    Nearest-rank percentile of an already sorted list (None if empty)
+    """
+    if not sorted_values:
+        return None
+    rank = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def latency_summary(seconds):
+    """
+    Count and p50/p99/max of a list of durations
+
+    Args:
+        seconds: list of float
+
+    Returns:
+        dict - times in milliseconds
+    """
+    values = sorted(seconds)
+    summary = {'count': len(values)}
+    for key, q in (('p50_ms', 50), ('p99_ms', 99), ('max_ms', 100)):
+        value = percentile(values, q)
+        summary[key] = None if value is None else round(value * 1000, 6)
+    return summary
+
+
+def rss_mb(pid=None):
+    """
+    Resident and peak resident memory of a process
+
+    Args:
+        pid: int - defaults to this process; other processes need
+            /proc (Linux)
+
+    Returns:
+        dict - {'rss_mb', 'peak_rss_mb'}, values None when unknown
+    """
+    try:
+        with open(f'/proc/{pid or "self"}/status') as f:
+            fields = dict(line.split(':', 1) for line in f)
+        return {'rss_mb': round(int(fields['VmRSS'].split()[0]) / 1024, 1),
+                'peak_rss_mb': round(int(fields['VmHWM'].split()[0]) / 1024, 1)}
+    except (OSError, KeyError, ValueError):
+        pass
+    if pid is not None:
+        return {'rss_mb': None, 'peak_rss_mb': None}
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    peak /= 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return {'rss_mb': None, 'peak_rss_mb': round(peak, 1)}
+
+
+def meta(**extra):
+    """
+    Where and how a result file was produced
+    """
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        **extra
+    }
+
+
+class Report:
+    """
+    Collects results, printing each as it arrives
+    """
+
+    def __init__(self, **meta_fields):
+        self.meta = meta(**meta_fields)
+        self.results = []
+
+    def add(self, result):
+        self.results.append(result)
+        print(json.dumps(result), flush=True)
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump({'meta': self.meta, 'results': self.results}, f, indent=2)
+            f.write('\n')
+
+
+def compare(baseline, current, tolerance=0.1):
+    """
+    Regressions of `current` against `baseline` (result documents)
+
+    Returns:
+        list of dict - one per measurement and key that got worse by
+        more than `tolerance` (a fraction)
+    """
+    before = {result['name']: result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        old = before.get(result['name'])
+        if old is None:
+            continue
+        for key in THROUGHPUT_KEYS + LATENCY_KEYS:
+            if not old.get(key) or result.get(key) is None:
+                continue
+            change = result[key] / old[key] - 1
+            worse = -change if key in THROUGHPUT_KEYS else change
+            if worse > tolerance:
+                regressions.append({'name': result['name'], 'metric': key,
+                                    'baseline': old[key], 'current': result[key],
+                                    'change': round(change, 3)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark result tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+    diff = commands.add_parser('compare', help='flag regressions between two result files')
+    diff.add_argument('baseline')
+    diff.add_argument('current')
+    diff.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.tolerance)
+    for regression in regressions:
+        print(json.dumps(regression))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
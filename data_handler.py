@@ -1,8 +1,33 @@
 """
 Data Handler - Placeholder
 Member 3 will implement real customer data functions here
+
+Once a data store has been loaded (`python data_store.py ...`, see
+README) real customers and transactions are read from it; until then
+the placeholder literals below are served.
 """
 
+import os
+
+from data_store import DataStore
+from executors import run_io
+from honey_generator import honey_seed
+from record_views import FrozenRecord, PerturbationPolicy
+
+# Real data store (SQLite) and its customer LRU cache
+DATA_DB_PATH = os.environ.get('HONEYGUARD_DATA_DB', 'honeyguard_data.db')
+CUSTOMER_CACHE_SIZE = int(os.environ.get('HONEYGUARD_CUSTOMER_CACHE_SIZE', 1024))
+
+# Fields randomized for medium-risk sessions, as JSON:
+# {"field": {"noise": "absolute"|"relative", "scale": x, "digits": n}, ...}
+PERTURBATION = os.environ.get(
+    'HONEYGUARD_PERTURBATION',
+    '{"account_balance": {"noise": "absolute", "scale": 100, "digits": 2}}'
+)
+
+store = DataStore(DATA_DB_PATH, cache_size=CUSTOMER_CACHE_SIZE)
+perturbation_policy = PerturbationPolicy.from_json(PERTURBATION)
+
 
 def get_real_customer(customer_id):
     """
@@ -12,12 +37,16 @@ def get_real_customer(customer_id):
         customer_id: int - Customer ID (1001-1005)
 
     Returns:
-        dict - Real customer data
+        FrozenRecord - Real customer data, read-only (empty if the
+        store has no such customer)
     """
+    if store.exists():
+        return store.get_customer(customer_id)
+
     # TEMPORARY: Dummy data
     # Member 3 will replace with actual 5 real customers
 
-    return {
+    return FrozenRecord({
         "id": customer_id,
         "name": "John Smith",
         "email": "john.smith@techcorp.com",
@@ -38,32 +67,29 @@ def get_real_customer(customer_id):
         "contact_preference": "email",
         "timezone": "America/Los_Angeles",
         "two_factor_enabled": True
-    }
+    })
 
 
-def get_randomized_real_data(customer_id):
+def get_randomized_real_data(customer_id, session_id=None):
     """
-    Placeholder - Member 3 will implement
     Returns real data with slight modifications (for medium-risk users)
 
+    The real record is not copied: the result is a view over it with
+    the fields named by perturbation_policy replaced.
+
     Args:
         customer_id: int
+        session_id: str - seeds the noise, so a session sees the same
+            values on every request (fresh noise per call if None)
 
     Returns:
-        dict - Real customer data with randomization
+        PerturbedView - Real customer data with randomization
     """
-    import random
-
-    real_data = get_real_customer(customer_id)
-
-    # Add slight randomization to balance
-    real_data['account_balance'] += random.uniform(-100, 100)
-    real_data['account_balance'] = round(real_data['account_balance'], 2)
+    seed = honey_seed('perturb', customer_id, session_id) if session_id else None
+    return perturbation_policy.apply(get_real_customer(customer_id), seed)
 
-    return real_data
 
-
-def get_real_transactions(customer_id, limit=10):
+def get_real_transactions(customer_id, limit=10, offset=0):
     """
     Placeholder - Member 3 will implement
     Returns real transaction history
@@ -71,14 +97,18 @@ def get_real_transactions(customer_id, limit=10):
     Args:
         customer_id: int
         limit: int - Number of transactions to return
+        offset: int - Number of (newest) transactions to skip
 
     Returns:
         list of transaction dicts
     """
+    if store.exists():
+        return store.get_transactions(customer_id, limit, offset)
+
     # TEMPORARY: Dummy transactions
     # Member 3 will replace with real transaction data
 
-    return [
+    transactions = [
         {
             "transaction_id": "TXN-20250203-001",
             "customer_id": customer_id,
@@ -104,3 +134,45 @@ def get_real_transactions(customer_id, limit=10):
             "category": "Income"
         }
     ]
+
+    return transactions[offset:offset + limit]
+
+
+def iter_real_transactions(customer_id, limit, offset=0):
+    """
+    Stream real transaction history, newest first
+
+    Yields:
+        dict - transaction
+    """
+    if store.exists():
+        yield from store.iter_transactions(customer_id, limit, offset)
+    else:
+        yield from get_real_transactions(customer_id, limit, offset)
+
+
+# -------------------------------------------------------------------
+# Async API - cache hits and placeholders run inline, store reads on
+# the I/O executor
+# -------------------------------------------------------------------
+
+def _customer_is_inline(customer_id):
+    return not store.exists() or store.is_cached(customer_id)
+
+
+async def get_real_customer_async(customer_id):
+    if _customer_is_inline(customer_id):
+        return get_real_customer(customer_id)
+    return await run_io(get_real_customer, customer_id)
+
+
+async def get_randomized_real_data_async(customer_id, session_id=None):
+    if _customer_is_inline(customer_id):
+        return get_randomized_real_data(customer_id, session_id)
+    return await run_io(get_randomized_real_data, customer_id, session_id)
+
+
+async def get_real_transactions_async(customer_id, limit=10, offset=0):
+    if not store.exists():
+        return get_real_transactions(customer_id, limit, offset)
+    return await run_io(get_real_transactions, customer_id, limit, offset)
@@ -0,0 +1,394 @@
+"""
+Data Store
+SQLite storage for real customer records and transaction history, with
+a bulk loader for CSV/JSONL fixtures
+
+The API only ever reads: each worker thread opens its own read-only
+connection to the shared file, and get_customer() sits behind an LRU
+cache. Writes go through load_customers() / load_transactions() (or
+`python data_store.py`), normally run offline. Cached customers are
+keyed on the file's identity, re-checked every DATA_CHECK_INTERVAL
+seconds, so a reload by another process reaches every worker.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from record_views import FrozenRecord
+
+
+# Rows per executemany() call when bulk loading
+LOAD_BATCH_SIZE = 5000
+
+# Seconds between checks of the file for loads by other processes
+DATA_CHECK_INTERVAL = float(os.environ.get('HONEYGUARD_DATA_CHECK_INTERVAL', 5.0))
+
+# CSV cells that are a number's own spelling (no leading zeros, signs
+# or exponents), so converting them loses nothing
+_NUMBER = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?')
+
+# Transaction columns, in table order
+TRANSACTION_COLUMNS = (
+    'transaction_id', 'customer_id', 'date', 'time', 'type',
+    'description', 'amount', 'balance_after', 'merchant', 'category'
+)
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS customers (
+        customer_id INTEGER PRIMARY KEY,
+        data        TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS transactions (
+        transaction_id TEXT PRIMARY KEY,
+        customer_id    INTEGER NOT NULL,
+        date           TEXT NOT NULL,
+        time           TEXT NOT NULL DEFAULT '',
+        type           TEXT,
+        description    TEXT,
+        amount         REAL,
+        balance_after  REAL,
+        merchant       TEXT,
+        category       TEXT
+    );
+    -- Newest-first history per customer is a range scan of this index
+    CREATE INDEX IF NOT EXISTS transactions_customer_date
+        ON transactions (customer_id, date, time, transaction_id);
+"""
+
+_HISTORY_ORDER = 'ORDER BY date DESC, time DESC, transaction_id DESC'
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU mapping
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class DataStore:
+    """
+    Customers and transactions in a SQLite file
+
+    Reads use one read-only connection per thread (the API's I/O
+    executor threads each get their own, reused across requests).
+    Customer records are cached in an LRU of `cache_size` entries;
+    a miss reads through to SQLite. Missing customers are cached too,
+    so unknown ids don't hit the database on every request.
+
+    Cache keys include the store version (identity of the database and
+    its WAL file): when another process loads data the version changes
+    within `check_interval` seconds and the old entries are no longer
+    served.
+    """
+
+    def __init__(self, path, cache_size=1024, check_interval=DATA_CHECK_INTERVAL):
+        self.path = path
+        self.cache = LRUCache(cache_size)
+        self.check_interval = check_interval
+        self._local = threading.local()
+        self._version = _file_identity(path)
+        self._next_check = time.monotonic() + check_interval
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def version(self):
+        """
+        Identity of the data on disk, re-read at most every
+        check_interval seconds (old cache entries are dropped on change)
+        """
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            version = _file_identity(self.path)
+            if version != self._version:
+                self._version = version
+                self.cache.clear()
+        return self._version
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True,
+                                   timeout=10.0, isolation_level=None)
+            conn.execute('PRAGMA query_only=ON')
+            self._local.conn = conn
+        return conn
+
+    def _writer(self):
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA cache_size=-65536')    # 64 MiB for index builds
+        conn.executescript(SCHEMA)
+        return conn
+
+    # ---------------------------------------------------------------
+    # Reads
+    # ---------------------------------------------------------------
+
+    def is_cached(self, customer_id):
+        """
+        True if get_customer() would be answered without touching SQLite
+        """
+        return (self.version(), customer_id) in self.cache
+
+    def get_customer(self, customer_id):
+        """
+        Customer record (read-through the LRU cache)
+
+        Returns:
+            FrozenRecord - shared by all callers (empty when the
+                customer does not exist)
+        """
+        key = (self.version(), customer_id)
+        record = self.cache.get(key)
+        if record is None:
+            row = self._reader().execute(
+                'SELECT data FROM customers WHERE customer_id = ?',
+                (customer_id,)).fetchone()
+            if row is None:
+                record = FrozenRecord({})
+            else:
+                version = hashlib.blake2b(row[0].encode('utf-8'), digest_size=8).hexdigest()
+                record = FrozenRecord(json.loads(row[0]), version)
+            self.cache.put(key, record)
+        return record
+
+    def get_transactions(self, customer_id, limit=10, offset=0):
+        """
+        Transactions for a customer, newest first
+
+        Returns:
+            list of transaction dicts
+        """
+        cursor = self._reader().execute(
+            f'SELECT * FROM transactions WHERE customer_id = ? {_HISTORY_ORDER} '
+            'LIMIT ? OFFSET ?', (customer_id, limit, offset))
+        return [dict(zip(TRANSACTION_COLUMNS, row)) for row in cursor]
+
+    def iter_transactions(self, customer_id, limit, offset=0, chunk_rows=1000):
+        """
+        Stream transactions for a customer, newest first
+
+        Reads `chunk_rows` at a time with keyset pagination, each chunk a
+        separate query on the calling thread's connection, so the
+        generator may be resumed from any thread and memory stays flat.
+
+        Yields:
+            dict - transaction
+        """
+        first = self.get_transactions(customer_id, min(chunk_rows, limit), offset)
+        yield from first
+        remaining = limit - len(first)
+        if len(first) < chunk_rows or remaining <= 0:
+            return
+
+        last = first[-1]
+        key = (last['date'], last['time'], last['transaction_id'])
+        while remaining > 0:
+            rows = self._reader().execute(
+                'SELECT * FROM transactions WHERE customer_id = ? '
+                'AND (date, time, transaction_id) < (?, ?, ?) '
+                f'{_HISTORY_ORDER} LIMIT ?',
+                (customer_id, *key, min(chunk_rows, remaining))).fetchall()
+            for row in rows:
+                yield dict(zip(TRANSACTION_COLUMNS, row))
+            if len(rows) < chunk_rows:
+                return
+            remaining -= len(rows)
+            key = (rows[-1][2], rows[-1][3], rows[-1][0])
+
+    # ---------------------------------------------------------------
+    # Bulk loading
+    # ---------------------------------------------------------------
+
+    def load_customers(self, records, batch_size=LOAD_BATCH_SIZE):
+        """
+        Insert or replace customer records
+
+        Args:
+            records: iterable of dicts, each with 'customer_id' or 'id'
+
+        Returns:
+            int - number of records written
+        """
+        rows = ((int(record.get('customer_id', record.get('id'))),
+                 json.dumps(record)) for record in records)
+        count = self._load('INSERT OR REPLACE INTO customers VALUES (?, ?)', rows, batch_size)
+        self._version = _file_identity(self.path)
+        self.cache.clear()
+        return count
+
+    def load_transactions(self, records, batch_size=LOAD_BATCH_SIZE):
+        """
+        Insert or replace transactions
+
+        Args:
+            records: iterable of dicts keyed by TRANSACTION_COLUMNS
+
+        Returns:
+            int - number of rows written
+        """
+        rows = (_transaction_row(record) for record in records)
+        placeholders = ', '.join('?' * len(TRANSACTION_COLUMNS))
+        return self._load(f'INSERT OR REPLACE INTO transactions VALUES ({placeholders})',
+                          rows, batch_size)
+
+    def _load(self, sql, rows, batch_size):
+        # One transaction for the whole load, executemany per batch
+        conn = self._writer()
+        count = 0
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    conn.executemany(sql, batch)
+                    count += len(batch)
+                    batch.clear()
+            if batch:
+                conn.executemany(sql, batch)
+                count += len(batch)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return count
+
+    def stats(self):
+        return {'path': self.path, 'customer_cache': self.cache.stats()}
+
+
+# -------------------------------------------------------------------
+# Fixture files
+# -------------------------------------------------------------------
+
+def _file_identity(path):
+    # The WAL file changes on every commit, the database on checkpoints.
+    # Readers create an empty WAL on open, so empty counts as missing.
+    identity = []
+    for name in (path, f'{path}-wal'):
+        try:
+            stat = os.stat(name)
+        except OSError:
+            stat = None
+        if stat is None or (name != path and not stat.st_size):
+            identity.append(None)
+        else:
+            identity.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+    return tuple(identity)
+
+
+def _transaction_row(record):
+    row = [record.get(column) for column in TRANSACTION_COLUMNS]
+    row[3] = row[3] or ''     # time is optional
+    return row
+
+
+def _coerce(value):
+    # CSV cells arrive as strings; restore numbers and booleans. Values
+    # that would not round-trip ('0101', '+1', '1e5', 'nan') stay strings.
+    if value in ('True', 'true'):
+        return True
+    if value in ('False', 'false'):
+        return False
+    if value and _NUMBER.fullmatch(value):
+        return float(value) if '.' in value else int(value)
+    return value
+
+
+def read_records(path, coerce=True):
+    """
+    Stream records from a .jsonl (one object per line) or .csv file
+
+    Args:
+        path: str
+        coerce: bool - Convert numeric/boolean CSV cells. Not needed for
+            transactions, whose typed columns convert on insert.
+
+    Yields:
+        dict
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif path.endswith('.csv'):
+            reader = csv.DictReader(f)
+            if not coerce:
+                yield from reader
+                return
+            for record in reader:
+                yield {key: _coerce(value) for key, value in record.items()}
+        else:
+            raise ValueError(f"Unsupported fixture format: {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-load customer/transaction fixtures")
+    parser.add_argument('db', help="SQLite file to create or update")
+    parser.add_argument('--customers', nargs='*', default=[], help=".csv/.jsonl files")
+    parser.add_argument('--transactions', nargs='*', default=[], help=".csv/.jsonl files")
+    parser.add_argument('--batch-size', type=int, default=LOAD_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    store = DataStore(args.db)
+    for path in args.customers:
+        count = store.load_customers(read_records(path), args.batch_size)
+        print(f"{path}: {count} customers")
+    for path in args.transactions:
+        count = store.load_transactions(read_records(path, coerce=False), args.batch_size)
+        print(f"{path}: {count} transactions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,418 @@
+"""
+Decision Engine
+Runs the risk pipeline once per request and hands every protected
+route a typed Decision
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from fastapi import Header, HTTPException, Request
+
+import audit_log
+import metrics
+import ml_batcher
+import rate_limiter
+from data_store import LRUCache
+from honey_pool import pool as honey_pool
+from session_manager import (
+    get_session_async,
+    update_session_async,
+    record_request_async,
+    features_from_session
+)
+from risk_calculator import combine_risk, determine_data_source
+from data_handler import (
+    get_real_customer_async,
+    get_randomized_real_data_async,
+    get_real_transactions_async,
+    iter_real_transactions
+)
+from honey_generator import generate_honey_customer_async, iter_honey_transactions
+
+# A cached score is reused until a feature moves at least this much
+# since it was computed, or it is older than DECISION_MAX_AGE seconds
+RESCORE_THRESHOLDS = {
+    'requests_per_minute': 2,
+    'avg_time_gap': 0.25,        # seconds
+    'session_duration': 0.5,     # minutes
+    'unique_endpoints': 1,
+    'total_requests': 5,
+}
+DECISION_MAX_AGE = float(os.environ.get('HONEYGUARD_DECISION_MAX_AGE', 5.0))
+DECISION_CACHE_SIZE = int(os.environ.get('HONEYGUARD_DECISION_CACHE_SIZE', 100_000))
+
+# Once a session is served honey it keeps getting honey: no re-scoring,
+# and no flipping back to real data that would expose the decoy
+STICKY_HONEY = os.environ.get('HONEYGUARD_STICKY_HONEY', '1') != '0'
+
+# Honey transaction pages kept for replay to rate-limited sessions
+HONEY_REPLAY_SIZE = int(os.environ.get('HONEYGUARD_HONEY_REPLAY_SIZE', 10_000))
+
+DECISIONS = metrics.counter(
+    'honeyguard_decisions', 'Protected requests by data source tier', ('data_source',))
+
+
+@dataclass
+class Decision:
+    """
+    Outcome of the risk pipeline for one request
+    """
+    session_id: str
+    endpoint: str
+    session: dict
+    customer_id: int
+    features: dict
+    initial_risk: int
+    ml_risk: int
+    final_risk: int
+    data_source: str                            # 'real', 'randomized' or 'honey'
+    timings: dict = field(default_factory=dict)  # stage -> milliseconds
+    rescored: bool = True                        # False if served from cache
+    throttle: str = None                         # rate limit action, if any
+
+    def envelope(self):
+        """
+        Risk fields appended to every protected response
+        """
+        return {'_risk_score': self.final_risk, '_data_source': self.data_source}
+
+
+class _StageTimer:
+    """Records consecutive stage durations into a timings dict"""
+
+    __slots__ = ('timings', '_last')
+
+    def __init__(self, timings):
+        self.timings = timings
+        self._last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.timings[stage] = (now - self._last) * 1000
+        self._last = now
+
+
+class _CachedScore:
+    __slots__ = ('features', 'ml_risk', 'final_risk', 'data_source', 'scored_at')
+
+    def __init__(self, features, ml_risk, final_risk, data_source, scored_at):
+        self.features = features
+        self.ml_risk = ml_risk
+        self.final_risk = final_risk
+        self.data_source = data_source
+        self.scored_at = scored_at
+
+
+class DecisionCache:
+    """
+    Per-session last score, bounded LRU (process-local)
+    """
+
+    def __init__(self, max_size=DECISION_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, session_id, features, now):
+        """
+        Cached score if still valid for these features, else None
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and now - entry.scored_at < DECISION_MAX_AGE:
+                if not _features_moved(entry.features, features):
+                    self._entries.move_to_end(session_id)
+                    self.hits += 1
+                    return entry
+            self.misses += 1
+            return None
+
+    def peek(self, session_id):
+        """
+        Last score for the session, however stale (None if unknown)
+        """
+        with self._lock:
+            return self._entries.get(session_id)
+
+    def store(self, session_id, entry):
+        with self._lock:
+            self._entries[session_id] = entry
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+def _features_moved(old, new):
+    for name, threshold in RESCORE_THRESHOLDS.items():
+        if abs(new.get(name, 0) - old.get(name, 0)) >= threshold:
+            return True
+    return False
+
+
+decision_cache = DecisionCache()
+honey_replay = LRUCache(HONEY_REPLAY_SIZE)
+
+
+def _current_tier(session_id, session):
+    # Tier the session was last served, without scoring it again
+    if STICKY_HONEY and session.get('sticky_honey'):
+        return 'honey'
+    cached = decision_cache.peek(session_id)
+    if cached is not None:
+        return cached.data_source
+    return determine_data_source(session.get('initial_risk', 0))
+
+
+async def decide(session_id, endpoint, ip=None):
+    """
+    Run the full risk chain once, with a single session lookup:
+    session -> rate limit -> record request -> features -> ML risk ->
+    final risk -> source
+
+    ML/final risk come from the decision cache while the features stay
+    close to the last scored ones; sticky-honey sessions skip scoring.
+    Over-limit requests are delayed, rejected or (honey) answered from
+    cache without scoring, per rate_limiter.TIER_ACTIONS.
+
+    Args:
+        session_id: str
+        endpoint: str - Which endpoint is being accessed
+        ip: str - Client address, for the per-IP rate limit
+
+    Returns:
+        Decision, or None if the session is invalid
+
+    Raises:
+        HTTPException(429) when the request is rejected by the limiter
+    """
+    timings = {}
+    timer = _StageTimer(timings)
+
+    session = await get_session_async(session_id)
+    timer.mark('session_lookup')
+    if session is None:
+        return None
+
+    throttle = None
+    if rate_limiter.RATE_LIMIT_ENABLED:
+        throttle, wait = rate_limiter.limiter.check(
+            {'session': session_id, 'ip': ip, 'customer': session.get('customer_id')},
+            _current_tier(session_id, session))
+        if throttle == 'reject':
+            if audit_log.ENABLED:
+                audit_log.audit('throttled', session_id=session_id, endpoint=endpoint,
+                                ip=ip, retry_after=wait)
+            raise HTTPException(status_code=429, detail="Too many requests",
+                                headers={'Retry-After': str(math.ceil(wait))})
+        if throttle == 'tarpit':
+            await asyncio.sleep(wait)
+        timer.mark('rate_limit')
+
+    await record_request_async(session_id, endpoint, session)
+    timer.mark('record_request')
+
+    now = time.time()
+    features = features_from_session(session, now)
+    timer.mark('feature_extraction')
+
+    initial_risk = session.get('initial_risk', 0)
+    rescored = False
+
+    if STICKY_HONEY and session.get('sticky_honey'):
+        ml_risk = session.get('honey_ml_risk', 0)
+        final_risk = session.get('honey_risk', 0)
+        data_source = 'honey'
+    else:
+        cached = decision_cache.lookup(session_id, features, now)
+        if cached is None and throttle == 'cached':
+            # Throttled honey session: reuse its last score, however stale
+            cached = decision_cache.peek(session_id)
+        if cached is not None:
+            ml_risk = cached.ml_risk
+            final_risk = cached.final_risk
+            data_source = cached.data_source
+        else:
+            timer.mark('decision_cache')
+            ml_risk = await ml_batcher.score(features)
+            timer.mark('ml_scoring')
+
+            final_risk = combine_risk(initial_risk, ml_risk)
+            data_source = determine_data_source(final_risk)
+            decision_cache.store(session_id, _CachedScore(
+                features, ml_risk, final_risk, data_source, now))
+            rescored = True
+
+            if STICKY_HONEY and data_source == 'honey':
+                # Persisted on the session so every worker keeps it honey
+                await update_session_async(
+                    session_id, sticky_honey=True,
+                    honey_risk=final_risk, honey_ml_risk=ml_risk)
+    timer.mark('risk_combination' if rescored else 'decision_cache')
+
+    return Decision(
+        session_id=session_id,
+        endpoint=endpoint,
+        session=session,
+        customer_id=session.get('customer_id', 1001),
+        features=features,
+        initial_risk=initial_risk,
+        ml_risk=ml_risk,
+        final_risk=final_risk,
+        data_source=data_source,
+        timings=timings,
+        rescored=rescored,
+        throttle=throttle
+    )
+
+
+async def get_decision(
+    request: Request,
+    session_id: str = Header(..., alias="X-Session-ID")
+):
+    """
+    FastAPI dependency: validate the session and compute the Decision
+
+    FastAPI caches dependencies per request, so routers that list this
+    as a dependency and routes that take it as a parameter share one run.
+    """
+    ip = request.client.host if request.client else None
+    decision = await decide(session_id, request.url.path, ip)
+    if decision is None:
+        raise HTTPException(status_code=401, detail="Invalid session ID")
+    request.state.decision = decision
+    return decision
+
+
+# -------------------------------------------------------------------
+# Data routing
+# -------------------------------------------------------------------
+
+async def fetch_account(decision):
+    """
+    Account record for the decision's tier (real/randomized/honey)
+
+    Returns:
+        FrozenRecord or PerturbedView - read-only customer data
+    """
+    start = time.perf_counter()
+    customer_id = decision.customer_id
+
+    if decision.data_source == 'real':
+        account = await get_real_customer_async(customer_id)
+    elif decision.data_source == 'randomized':
+        account = await get_randomized_real_data_async(customer_id, decision.session_id)
+    else:  # honey
+        account = await generate_honey_customer_async(customer_id, decision.session_id)
+
+    decision.timings['data_fetch'] = (time.perf_counter() - start) * 1000
+    return account
+
+
+async def fetch_transactions(decision, limit, offset=0):
+    """
+    Transaction history for the decision's tier (honey or real)
+
+    Args:
+        decision: Decision
+        limit: int - Rows to return (callers enforce the page cap)
+        offset: int - Rows to skip
+
+    Returns:
+        sequence of transaction dicts
+    """
+    start = time.perf_counter()
+
+    if decision.data_source == 'honey' and decision.throttle == 'cached':
+        transactions = _replayed_transactions(decision, limit, offset)
+    elif decision.data_source == 'honey':
+        transactions = honey_pool.take_transactions(decision.customer_id, limit, offset)
+    else:
+        transactions = await get_real_transactions_async(decision.customer_id, limit, offset)
+
+    decision.timings['data_fetch'] = (time.perf_counter() - start) * 1000
+    return transactions
+
+
+def _replayed_transactions(decision, limit, offset):
+    # Rate-limited honey session: replay pages it has already been sent
+    # instead of making more. Keyed by page, so paging still moves on.
+    key = (decision.session_id, offset, limit)
+    transactions = honey_replay.get(key)
+    if transactions is None:
+        transactions = honey_pool.take_transactions(decision.customer_id, limit, offset)
+        honey_replay.put(key, transactions)
+    return transactions
+
+
+def stream_transactions(decision, limit, offset=0):
+    """
+    Lazily yield transaction history for the decision's tier
+
+    The decision is audited once the stream finishes (or the client
+    goes away) with the number of rows actually sent. Rate-limited honey
+    sessions get their replayed page, as with fetch_transactions.
+
+    Args:
+        decision: Decision
+        limit: int - Rows to yield at most (callers enforce the cap)
+        offset: int - Rows to skip
+
+    Yields:
+        dict - transaction
+    """
+    start = time.perf_counter()
+    if decision.data_source == 'honey' and decision.throttle == 'cached':
+        rows = iter(_replayed_transactions(decision, limit, offset))
+    elif decision.data_source == 'honey':
+        rows = iter_honey_transactions(decision.customer_id, limit, offset)
+    else:
+        rows = iter_real_transactions(decision.customer_id, limit, offset)
+
+    sent = 0
+    try:
+        for row in rows:
+            yield row
+            sent += 1
+    finally:
+        decision.timings['data_fetch'] = (time.perf_counter() - start) * 1000
+        record_decision(decision, rows=sent, streamed=True)
+
+
+def record_decision(decision, **extra):
+    """
+    Count the decision and its stage timings in the metrics, and queue
+    its audit record (when auditing is on)
+    """
+    DECISIONS.labels(decision.data_source).inc()
+    stage_seconds = metrics.STAGE_SECONDS.labels
+    for stage, ms in decision.timings.items():
+        stage_seconds(stage).observe(ms / 1000)
+
+    if not audit_log.ENABLED:
+        return
+    audit_log.audit(
+        'decision',
+        endpoint=decision.endpoint,
+        session_id=decision.session_id,
+        customer_id=decision.customer_id,
+        features=decision.features,
+        initial_risk=decision.initial_risk,
+        ml_risk=decision.ml_risk,
+        final_risk=decision.final_risk,
+        data_source=decision.data_source,
+        timings_ms=decision.timings,
+        rescored=decision.rescored,
+        throttle=decision.throttle,
+        **extra
+    )
@@ -0,0 +1,117 @@
+"""
+Response Encoding
+JSON encoding for API responses, bypassing FastAPI's jsonable_encoder
+
+Uses orjson when it is installed (several times faster than the
+standard library) and falls back to a compact json.JSONEncoder. Set
+HONEYGUARD_JSON_ENCODER=json to force the fallback.
+
+Customer records carry their own pre-encoded body (see
+record_views.FrozenRecord.json_body); encode_record() only encodes the
+small per-request envelope and splices it in.
+"""
+
+import json
+import os
+import time
+
+from fastapi.responses import JSONResponse
+
+import metrics
+import profiler
+
+try:
+    import orjson
+except ImportError:     # optional speedup
+    orjson = None
+
+
+JSON_ENCODER = os.environ.get('HONEYGUARD_JSON_ENCODER', 'orjson' if orjson else 'json')
+
+_json_encode = json.JSONEncoder(separators=(',', ':')).encode
+
+
+def _json_dumps(obj):
+    return _json_encode(obj).encode('utf-8')
+
+
+if JSON_ENCODER == 'orjson' and orjson is not None:
+    dumps = orjson.dumps
+else:
+    JSON_ENCODER = 'json'
+    dumps = _json_dumps
+
+_SERIALIZATION_SECONDS = metrics.STAGE_SECONDS.labels('serialization')
+
+
+def _observe(seconds):
+    _SERIALIZATION_SECONDS.observe(seconds)
+    if profiler.ENABLED:
+        profiler.add(('serialization',), seconds)
+
+
+def splice(body, extra):
+    """
+    Join a pre-encoded object body (the bytes between the braces) with
+    extra fields into one JSON object
+
+    Args:
+        body: bytes - e.g. b'"id":1,"name":"x"' (may be empty)
+        extra: dict - fields appended after the body's; must not
+            repeat its keys
+
+    Returns:
+        bytes
+    """
+    if not extra:
+        return b'{' + body + b'}'
+    tail = dumps(extra)[1:-1]
+    if not body:
+        return b'{' + tail + b'}'
+    return b'{' + body + b',' + tail + b'}'
+
+
+def encode_record(record, extra=None):
+    """
+    Encode a customer record with per-request fields (risk envelope)
+
+    FrozenRecord / PerturbedView reuse their cached body; any other
+    mapping is merged and encoded in full.
+
+    Returns:
+        bytes
+    """
+    json_body = getattr(record, 'json_body', None)
+    if json_body is None:
+        return dumps({**record, **(extra or {})})
+    return splice(json_body(), extra)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with dumps() (orjson when available)
+
+    Returning an instance from a route also skips FastAPI's
+    jsonable_encoder pass, so content must already be plain JSON types.
+    """
+
+    def render(self, content):
+        start = time.perf_counter()
+        body = dumps(content)
+        _observe(time.perf_counter() - start)
+        return body
+
+
+class RecordResponse(JSONResponse):
+    """
+    Customer record plus per-request fields, see encode_record()
+    """
+
+    def __init__(self, record, extra=None, **kwargs):
+        super().__init__((record, extra), **kwargs)
+
+    def render(self, content):
+        start = time.perf_counter()
+        body = encode_record(*content)
+        _observe(time.perf_counter() - start)
+        return body
@@ -0,0 +1,69 @@
+"""
+Executors
+Bounded thread pools for work that must stay off the event loop
+"""
+
+import asyncio
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+# Blocking I/O (SQLite session/data lookups) and CPU-heavy scoring get
+# separate pools so a slow disk never starves the model and vice versa
+IO_WORKERS = int(os.environ.get('HONEYGUARD_IO_WORKERS', 16))
+CPU_WORKERS = int(os.environ.get('HONEYGUARD_CPU_WORKERS', os.cpu_count() or 1))
+
+# Max jobs queued or running per pool; further callers wait (cheaply,
+# as suspended coroutines) instead of piling work into the pool queue
+MAX_PENDING = int(os.environ.get('HONEYGUARD_EXECUTOR_MAX_PENDING', 256))
+
+_io_pool = ThreadPoolExecutor(IO_WORKERS, thread_name_prefix='honeyguard-io')
+_cpu_pool = ThreadPoolExecutor(CPU_WORKERS, thread_name_prefix='honeyguard-cpu')
+
+# One semaphore per (event loop, pool)
+_limits = weakref.WeakKeyDictionary()
+
+
+def _limit(loop, pool):
+    per_loop = _limits.get(loop)
+    if per_loop is None:
+        per_loop = _limits[loop] = {}
+    semaphore = per_loop.get(pool)
+    if semaphore is None:
+        semaphore = per_loop[pool] = asyncio.Semaphore(MAX_PENDING)
+    return semaphore
+
+
+async def _run(pool, fn, *args):
+    loop = asyncio.get_running_loop()
+    async with _limit(loop, pool):
+        return await loop.run_in_executor(pool, fn, *args)
+
+
+async def run_io(fn, *args):
+    """
+    Run a blocking I/O call on the bounded I/O pool
+
+    Args:
+        fn: callable
+        *args: positional arguments for fn
+
+    Returns:
+        whatever fn returns
+    """
+    return await _run(_io_pool, fn, *args)
+
+
+async def run_cpu(fn, *args):
+    """
+    Run CPU-heavy work (model scoring, bulk generation) on the bounded
+    CPU pool
+
+    Args:
+        fn: callable
+        *args: positional arguments for fn
+
+    Returns:
+        whatever fn returns
+    """
+    return await _run(_cpu_pool, fn, *args)
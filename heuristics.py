@@ -0,0 +1,276 @@
+"""
+Heuristics
+Blocklists behind calculate_initial_risk, loaded from files and
+compiled once
+
+    disposable_domains.txt  email domains (a listed domain also covers
+                            its subdomains)
+    suspicious_names.txt    substrings that flag a customer name
+    automated_agents.txt    substrings that flag a user agent
+    ip_blocklist.txt        CIDRs (or single IPs) to treat as hostile
+    ip_allowlist.txt        CIDRs exempt from IP penalties; the most
+                            specific entry across both lists wins
+
+One entry per line, case-insensitive; blank lines and '#' comments are
+ignored. The files are re-checked every HEURISTICS_CHECK_INTERVAL
+seconds; a changed set is compiled on a background thread and swapped
+in atomically, so logins keep using the previous rules until the new
+ones are ready.
+"""
+
+import os
+import re
+import string
+import threading
+import time
+from functools import lru_cache
+
+from reputation import CidrIndex
+
+HEURISTICS_DIR = os.environ.get(
+    'HONEYGUARD_HEURISTICS_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'heuristics')
+)
+HEURISTICS_CHECK_INTERVAL = float(os.environ.get('HONEYGUARD_HEURISTICS_CHECK_INTERVAL', 5.0))
+# Distinct user agents whose verdict is memoized (per rules version)
+UA_CACHE_SIZE = int(os.environ.get('HONEYGUARD_UA_CACHE_SIZE', 4096))
+
+# Keywords compiled into each regular expression. Sharding keeps each
+# compile short, so a background reload never holds the GIL for long.
+KEYWORDS_PER_PATTERN = 10000
+
+LIST_FILES = {
+    'disposable_domains': 'disposable_domains.txt',
+    'suspicious_names': 'suspicious_names.txt',
+    'automated_agents': 'automated_agents.txt',
+    'ip_blocklist': 'ip_blocklist.txt',
+    'ip_allowlist': 'ip_allowlist.txt'
+}
+
+
+def read_list(path):
+    """
+    Entries of a blocklist file, lower-cased
+
+    Returns:
+        list of str
+    """
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            entry = line.split('#', 1)[0].strip().lower()
+            if entry:
+                entries.append(entry)
+    return entries
+
+
+class DomainSet:
+    """
+    Hashed set of domains matched on label boundaries
+
+    'mail.tempmail.com' matches a listed 'tempmail.com'; 'nottempmail.com'
+    does not. A lookup is one set probe per label of the domain.
+    """
+
+    def __init__(self, domains):
+        self.domains = frozenset(domain.strip('.') for domain in domains)
+
+    def __len__(self):
+        return len(self.domains)
+
+    def matches(self, domain):
+        domains = self.domains
+        while domain:
+            if domain in domains:
+                return True
+            _, _, domain = domain.partition('.')
+        return False
+
+
+class KeywordMatcher:
+    """
+    Substring search for many keywords at once
+
+    The keywords are merged into a trie and emitted as a regular
+    expression (shared prefixes factored out), so a search is a pass of
+    the C regex engine rather than one scan per keyword. Long lists are
+    split into shards of KEYWORDS_PER_PATTERN sorted keywords, one
+    expression each.
+    """
+
+    def __init__(self, keywords):
+        keywords = sorted(set(keywords))
+        self.size = len(keywords)
+        self._regexes = tuple(
+            re.compile(_trie_pattern(keywords[i:i + KEYWORDS_PER_PATTERN]))
+            for i in range(0, len(keywords), KEYWORDS_PER_PATTERN)
+        )
+
+    def __len__(self):
+        return self.size
+
+    def search(self, text):
+        """
+        Returns:
+            str - a keyword found in `text`, or None
+        """
+        for regex in self._regexes:
+            match = regex.search(text)
+            if match:
+                return match.group()
+        return None
+
+
+def _escape(ch, _plain=frozenset(string.ascii_lowercase + string.digits)):
+    return ch if ch in _plain else re.escape(ch)
+
+
+def _trie_pattern(keywords):
+    # `keywords` sorted, so every trie node's children are in order
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[''] = None
+
+    def emit(node):
+        # Regex for the suffixes below `node`. Where a keyword ends, any
+        # longer keyword through it is redundant (search() only needs
+        # to know that some keyword occurs), so that is a leaf: ''.
+        if '' in node:
+            return ''
+        branches = []
+        single = []
+        for ch, child in node.items():
+            sub = emit(child)
+            if sub:
+                branches.append(_escape(ch) + sub)
+            else:
+                single.append(_escape(ch))
+        if len(single) == 1:
+            branches.append(single[0])
+        elif single:
+            branches.append('[' + ''.join(single) + ']')
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')'
+
+    return emit(trie)
+
+
+class Rules:
+    """
+    One compiled, immutable set of blocklists
+    """
+
+    __slots__ = ('disposable_domains', 'suspicious_names', 'automated_agents',
+                 'ip_reputation', 'identity', 'user_agent_risk')
+
+    def __init__(self, disposable_domains=(), suspicious_names=(), automated_agents=(),
+                 ip_blocklist=(), ip_allowlist=(), identity=None):
+        self.disposable_domains = DomainSet(disposable_domains)
+        self.suspicious_names = KeywordMatcher(suspicious_names)
+        self.automated_agents = KeywordMatcher(automated_agents)
+        self.ip_reputation = CidrIndex.from_lists(block=ip_blocklist, allow=ip_allowlist)
+        self.identity = identity
+        # The cache belongs to these rules, so a reload starts it afresh
+        self.user_agent_risk = lru_cache(maxsize=UA_CACHE_SIZE)(self._user_agent_risk)
+
+    def _user_agent_risk(self, user_agent):
+        """
+        Risk points for a raw User-Agent header (0-25)
+        """
+        user_agent = user_agent.lower()
+        if self.automated_agents.search(user_agent):
+            return 25
+        if len(user_agent) < 10:
+            return 20
+        return 0
+
+    @classmethod
+    def from_dir(cls, directory):
+        identity = _dir_identity(directory)
+        lists = {name: read_list(os.path.join(directory, filename))
+                 for name, filename in LIST_FILES.items()}
+        return cls(identity=identity, **lists)
+
+    def stats(self):
+        return {
+            'disposable_domains': len(self.disposable_domains),
+            'suspicious_names': len(self.suspicious_names),
+            'automated_agents': len(self.automated_agents),
+            'ip_networks': len(self.ip_reputation),
+            'user_agent_cache': self.user_agent_risk.cache_info()._asdict()
+        }
+
+
+def _dir_identity(directory):
+    identity = []
+    for filename in LIST_FILES.values():
+        stat = os.stat(os.path.join(directory, filename))
+        identity.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+    return tuple(identity)
+
+
+class HeuristicsEngine:
+    """
+    Serves the current Rules and reloads them when the files change
+    """
+
+    def __init__(self, directory, check_interval=HEURISTICS_CHECK_INTERVAL):
+        self.directory = directory
+        self.check_interval = check_interval
+        self.rules = Rules.from_dir(directory)
+        self.reloads = 0
+        self.reload_errors = 0
+        self._next_check = time.monotonic() + check_interval
+        self._reloading = threading.Lock()
+
+    def current(self):
+        """
+        The rules to use for this request (never blocks on a reload)
+        """
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self._check()
+        return self.rules
+
+    def _check(self):
+        try:
+            changed = _dir_identity(self.directory) != self.rules.identity
+        except OSError:
+            return  # keep serving the rules we have
+        if changed and self._reloading.acquire(blocking=False):
+            threading.Thread(target=self._reload_locked, name='heuristics-reload',
+                             daemon=True).start()
+
+    def reload(self):
+        """
+        Recompile the rules now, in the calling thread
+        """
+        with self._reloading:
+            self._load()
+
+    def _reload_locked(self):
+        try:
+            self._load()
+        finally:
+            self._reloading.release()
+
+    def _load(self):
+        try:
+            rules = Rules.from_dir(self.directory)
+        except (OSError, ValueError, re.error):
+            self.reload_errors += 1
+            return
+        self.rules = rules
+        self.reloads += 1
+
+    def stats(self):
+        return {**self.rules.stats(), 'reloads': self.reloads,
+                'reload_errors': self.reload_errors}
+
+
+engine = HeuristicsEngine(HEURISTICS_DIR)
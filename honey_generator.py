@@ -3,23 +3,120 @@ Honey Data Generator - Placeholder
 Member 3 will implement AI-generated fake data here
 """
 
+import hashlib
+import logging
+import os
 import random
-from datetime import datetime, timedelta
+import time
+from collections.abc import Sequence
+from datetime import date, datetime
+from datetime import time as dt_time
+from functools import lru_cache
 
+import numpy as np
 
-def generate_honey_customer(customer_id):
+import metrics
+import profiler
+from record_views import FrozenRecord
+
+# Server-side cap on rows per /transactions page (use the cursor for more)
+MAX_TRANSACTIONS_LIMIT = 100
+
+FAKE_MERCHANTS = (
+    "Netflix Subscription",
+    "Starbucks Coffee",
+    "Shell Gas Station",
+    "Walmart Supercenter",
+    "Target Store",
+    "McDonald's",
+    "Best Buy Electronics"
+)
+FAKE_CATEGORIES = ("Shopping", "Food", "Gas", "Entertainment", "Bills")
+TRANSACTION_TYPES = ("debit", "credit")
+
+_np_rng = np.random.default_rng()
+
+# Key for deriving decoy identities. Set the same value on every worker
+# (and keep it secret) so all workers agree on each decoy.
+DEV_HONEY_SECRET = 'honeyguard-dev-secret'
+HONEY_SECRET = os.environ.get('HONEYGUARD_HONEY_SECRET', DEV_HONEY_SECRET).encode('utf-8')[:64]
+# 'customer': one decoy per customer id; 'session': one per session
+HONEY_IDENTITY_SCOPE = os.environ.get('HONEYGUARD_HONEY_IDENTITY_SCOPE', 'customer')
+HONEY_CACHE_SIZE = int(os.environ.get('HONEYGUARD_HONEY_CACHE_SIZE', 4096))
+
+logger = logging.getLogger(__name__)
+
+# Decoy synthesis time (identity cache misses and transaction blocks)
+_GENERATION_SECONDS = metrics.STAGE_SECONDS.labels('honey_generation')
+
+
+def _observe_generation(seconds):
+    _GENERATION_SECONDS.observe(seconds)
+    if profiler.ENABLED:
+        profiler.add(('data_fetch', 'honey', 'honey_generation'), seconds)
+
+
+def check_honey_secret():
     """
-    Placeholder - Member 3 will implement with AI generation
+    Warn when decoys are keyed with the public development secret: with
+    it, anyone who has this source can recompute every decoy and tell
+    honey records from real ones
+
+    Returns:
+        bool - True if HONEYGUARD_HONEY_SECRET is set
+    """
+    if HONEY_SECRET != DEV_HONEY_SECRET.encode('utf-8'):
+        return True
+    logger.warning(
+        'HONEYGUARD_HONEY_SECRET is not set: honey data is keyed with the public '
+        'development secret and can be told apart from real data. Set it to the '
+        'same random value on every worker before serving real traffic.')
+    return False
+
+
+def honey_seed(*parts):
+    """
+    64-bit seed from a keyed hash of `parts` and HONEY_SECRET
+
+    Same inputs give the same seed on every worker; without the secret
+    an attacker cannot predict or correlate seeds.
+
+    Returns:
+        int
+    """
+    message = '|'.join(str(part) for part in parts).encode('utf-8')
+    digest = hashlib.blake2b(message, key=HONEY_SECRET, digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def generate_honey_customer(customer_id, session_id=None):
+    """
+    Decoy customer record, stable for a given customer (or session)
+
+    The identity is derived from a keyed hash, so repeat requests - on
+    any worker, before or after cache eviction - see the same decoy.
+    Results are memoized; the returned record is read-only.
 
     Args:
         customer_id: int
+        session_id: str - only used when HONEY_IDENTITY_SCOPE is 'session'
 
     Returns:
-        dict - Fake but realistic customer data
+        FrozenRecord - Fake but realistic customer data
     """
+    scope_key = session_id if HONEY_IDENTITY_SCOPE == 'session' and session_id else ''
+    # The day is part of the key so last_login moves forward daily
+    return _honey_identity(customer_id, scope_key, date.today().toordinal())
+
+
+@lru_cache(maxsize=HONEY_CACHE_SIZE)
+def _honey_identity(customer_id, scope_key, day):
     # TEMPORARY: Simple fake data
     # Member 3 will replace with AI-generated realistic fake data
 
+    start = time.perf_counter()
+    rng = random.Random(honey_seed('customer', customer_id, scope_key))
+
     fake_names = ["Robert Johnson", "Michael Williams",
                   "David Brown", "James Davis"]
     fake_emails = [
@@ -28,70 +125,185 @@ def generate_honey_customer(customer_id):
         "random4567@10minutemail.com"
     ]
 
-    return {
+    # Seeded time of day on the previous day, so it is never in the future
+    last_login = datetime.combine(
+        date.fromordinal(day - 1),
+        dt_time(rng.randint(6, 22), rng.randint(0, 59), rng.randint(0, 59))
+    )
+
+    identity = FrozenRecord({
         "id": customer_id,
-        "name": random.choice(fake_names),
-        "email": random.choice(fake_emails),
-        "phone": f"+1-555-{random.randint(1000, 9999)}",
-        "ssn": f"{random.randint(100, 999)}-{random.randint(10, 99)}-{random.randint(1000, 9999)}",
-        "account_balance": round(random.uniform(10000, 150000), 2),
-        "credit_score": random.randint(600, 800),
-        "address": f"{random.randint(100, 9999)} Fake St, Decoy City, XX {random.randint(10000, 99999)}",
-        "date_of_birth": f"{random.randint(1970, 1995)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
-        "account_created": f"{random.randint(2015, 2023)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
-        "last_login": datetime.now().isoformat() + "Z",
-        "account_type": random.choice(["Premium Business", "Standard", "Basic"]),
+        "name": rng.choice(fake_names),
+        "email": rng.choice(fake_emails),
+        "phone": f"+1-555-{rng.randint(1000, 9999)}",
+        "ssn": f"{rng.randint(100, 999)}-{rng.randint(10, 99)}-{rng.randint(1000, 9999)}",
+        "account_balance": round(rng.uniform(10000, 150000), 2),
+        "credit_score": rng.randint(600, 800),
+        "address": f"{rng.randint(100, 9999)} Fake St, Decoy City, XX {rng.randint(10000, 99999)}",
+        "date_of_birth": f"{rng.randint(1970, 1995)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "account_created": f"{rng.randint(2015, 2023)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "last_login": last_login.isoformat() + "Z",
+        "account_type": rng.choice(["Premium Business", "Standard", "Basic"]),
         "status": "Active",
-        "transaction_count": random.randint(500, 3000),
-        "avg_monthly_spend": round(random.uniform(5000, 15000), 2),
+        "transaction_count": rng.randint(500, 3000),
+        "avg_monthly_spend": round(rng.uniform(5000, 15000), 2),
         "kyc_verified": True,
         "risk_category": "Low",
         "contact_preference": "email",
-        "timezone": random.choice(["America/New_York", "America/Los_Angeles", "America/Chicago"]),
-        "two_factor_enabled": random.choice([True, False])
-    }
+        "timezone": rng.choice(["America/New_York", "America/Los_Angeles", "America/Chicago"]),
+        "two_factor_enabled": rng.choice([True, False])
+    })
+    _observe_generation(time.perf_counter() - start)
+    return identity
+
 
+class HoneyTransactions(Sequence):
+    """
+    A block of decoy transactions stored column-wise
 
-def generate_honey_transactions(customer_id, limit=10):
+    All random values are drawn at once with NumPy; a row dict is only
+    built when that row is read, so slicing, concatenating and counting
+    cost nothing per row.
     """
-    Placeholder - Member 3 will implement with AI generation
+
+    __slots__ = ('customer_id', 'offset', 'ids', 'seconds', 'types',
+                 'descriptions', 'amounts', 'balances', 'merchants', 'categories',
+                 '_lists')
+
+    # Column attributes, in constructor order
+    COLUMNS = ('ids', 'seconds', 'types', 'descriptions', 'amounts',
+               'balances', 'merchants', 'categories')
+
+    def __init__(self, customer_id, offset, ids, seconds, types, descriptions,
+                 amounts, balances, merchants, categories):
+        self.customer_id = customer_id
+        self.offset = offset            # row i is dated `offset + i` days ago
+        self.ids = ids
+        self.seconds = seconds          # time of day, seconds since midnight
+        self.types = types              # indices into TRANSACTION_TYPES
+        self.descriptions = descriptions  # indices into FAKE_MERCHANTS
+        self.amounts = amounts
+        self.balances = balances
+        self.merchants = merchants      # indices into FAKE_MERCHANTS
+        self.categories = categories    # indices into FAKE_CATEGORIES
+        self._lists = None              # columns as Python lists, on first read
+
+    @classmethod
+    def generate(cls, customer_id, count, offset=0, rng=None):
+        """
+        Draw `count` rows in one vectorized pass
+
+        Returns:
+            HoneyTransactions
+        """
+        start = time.perf_counter()
+        rng = _np_rng if rng is None else rng
+        block = cls(
+            customer_id, offset,
+            ids=rng.integers(10000, 100000, count),
+            seconds=rng.integers(0, 86400, count),
+            types=rng.integers(0, len(TRANSACTION_TYPES), count),
+            descriptions=rng.integers(0, len(FAKE_MERCHANTS), count),
+            amounts=np.round(rng.uniform(-500, 1000, count), 2),
+            balances=np.round(rng.uniform(10000, 150000, count), 2),
+            merchants=rng.integers(0, len(FAKE_MERCHANTS), count),
+            categories=rng.integers(0, len(FAKE_CATEGORIES), count)
+        )
+        _observe_generation(time.perf_counter() - start)
+        return block
+
+    @classmethod
+    def concat(cls, blocks, customer_id, offset=0):
+        """
+        Join blocks into one, re-addressed to customer_id/offset
+        """
+        columns = [np.concatenate([getattr(b, name) for b in blocks])
+                   for name in cls.COLUMNS]
+        return cls(customer_id, offset, *columns)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            columns = [getattr(self, name)[start:stop] for name in self.COLUMNS]
+            return HoneyTransactions(self.customer_id, self.offset + start, *columns)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+
+        return self._row(index, self._columns_as_lists(), date.today().toordinal())
+
+    def __iter__(self):
+        lists = self._columns_as_lists()
+        today = date.today().toordinal()
+        return (self._row(i, lists, today) for i in range(len(self)))
+
+    def _columns_as_lists(self):
+        # One tolist() per column beats per-row NumPy scalar access
+        if self._lists is None:
+            self._lists = tuple(getattr(self, name).tolist() for name in self.COLUMNS)
+        return self._lists
+
+    def _row(self, index, lists, today):
+        ids, seconds, types, descriptions, amounts, balances, merchants, categories = lists
+        second = seconds[index]
+        return {
+            "transaction_id": f"TXN-FAKE-{ids[index]}",
+            "customer_id": self.customer_id,
+            "date": _date_string(today - self.offset - index),
+            "time": f"{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}",
+            "type": TRANSACTION_TYPES[types[index]],
+            "description": FAKE_MERCHANTS[descriptions[index]],
+            "amount": amounts[index],
+            "balance_after": balances[index],
+            "merchant": FAKE_MERCHANTS[merchants[index]],
+            "category": FAKE_CATEGORIES[categories[index]]
+        }
+
+
+@lru_cache(maxsize=1024)
+def _date_string(ordinal):
+    return date.fromordinal(ordinal).isoformat()
+
+
+def generate_honey_transactions(customer_id, limit=10, offset=0):
+    """
+    Decoy transaction history, newest first, one transaction per day
 
     Args:
         customer_id: int
         limit: int - Number of fake transactions
+        offset: int - Rows to skip (row i is dated offset + i days ago)
 
     Returns:
-        list of fake transaction dicts
+        HoneyTransactions - sequence of fake transaction dicts, built
+        lazily from columns
     """
     # TEMPORARY: Simple fake transactions
     # Member 3 will replace with AI-generated realistic fake transactions
+    return HoneyTransactions.generate(customer_id, limit, offset)
+
+
+def iter_honey_transactions(customer_id, limit, offset=0, chunk_rows=1000):
+    """
+    Stream decoy transactions, generating `chunk_rows` at a time
+
+    Yields the same rows as generate_honey_transactions(customer_id,
+    limit, offset) but only one chunk of columns is alive at once, so
+    memory stays flat however large `limit` is.
+
+    Yields:
+        dict - fake transaction
+    """
+    end = offset + limit
+    for start in range(offset, end, chunk_rows):
+        yield from HoneyTransactions.generate(customer_id, min(chunk_rows, end - start), start)
 
-    fake_merchants = [
-        "Netflix Subscription",
-        "Starbucks Coffee",
-        "Shell Gas Station",
-        "Walmart Supercenter",
-        "Target Store",
-        "McDonald's",
-        "Best Buy Electronics"
-    ]
 
-    fake_transactions = []
-
-    for i in range(limit):
-        transaction_date = datetime.now() - timedelta(days=i)
-
-        fake_transactions.append({
-            "transaction_id": f"TXN-FAKE-{random.randint(10000, 99999)}",
-            "customer_id": customer_id,
-            "date": transaction_date.strftime("%Y-%m-%d"),
-            "time": f"{random.randint(0, 23):02d}:{random.randint(0, 59):02d}:{random.randint(0, 59):02d}",
-            "type": random.choice(["debit", "credit"]),
-            "description": random.choice(fake_merchants),
-            "amount": round(random.uniform(-500, 1000), 2),
-            "balance_after": round(random.uniform(10000, 150000), 2),
-            "merchant": random.choice(fake_merchants),
-            "category": random.choice(["Shopping", "Food", "Gas", "Entertainment", "Bills"])
-        })
-
-    return fake_transactions
+async def generate_honey_customer_async(customer_id, session_id=None):
+    return generate_honey_customer(customer_id, session_id)
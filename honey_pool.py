@@ -0,0 +1,136 @@
+"""
+Honey Pool
+Pre-generated decoy transaction pages, topped up by a background thread
+so serving honey on the request path is a dequeue
+
+(Decoy customers don't need a pool: they are deterministic and memoized
+in honey_generator.generate_honey_customer.)
+"""
+
+import os
+import threading
+from collections import deque
+
+from honey_generator import (
+    MAX_TRANSACTIONS_LIMIT,
+    HoneyTransactions,
+    generate_honey_transactions
+)
+
+POOL_PAGES = int(os.environ.get('HONEYGUARD_HONEY_POOL_PAGES', 256))
+PAGE_SIZE = 10          # transactions per pre-built page (the default limit)
+LOW_WATER = 0.5         # refill once the ring drops below this fraction
+REFILL_INTERVAL = 1.0   # seconds between idle refill checks
+
+# Requests for more rows than this skip the pool (they would drain it)
+MAX_POOLED_ROWS = MAX_TRANSACTIONS_LIMIT
+
+
+class HoneyPool:
+    """
+    Ring of ready-made decoy transaction pages
+
+    deque append/popleft are atomic, so the request path never takes a
+    lock: it pops pages and joins their columns under the caller's
+    customer id and offset. A miss (empty ring) falls back to
+    generating inline.
+    """
+
+    def __init__(self, pages=POOL_PAGES, page_size=PAGE_SIZE, low_water=LOW_WATER):
+        self.page_capacity = pages
+        self.page_size = page_size
+        self.low_water = low_water
+
+        self._pages = deque()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.hits = 0
+        self.misses = 0
+
+    # ---------------------------------------------------------------
+    # Request path
+    # ---------------------------------------------------------------
+
+    def take_transactions(self, customer_id, limit, offset=0):
+        """
+        `limit` decoy transactions, newest first, one per day
+
+        Args:
+            customer_id: int
+            limit: int
+            offset: int - Rows to skip (see generate_honey_transactions)
+
+        Returns:
+            HoneyTransactions
+        """
+        if limit > MAX_POOLED_ROWS:
+            return generate_honey_transactions(customer_id, limit, offset)
+
+        blocks = []
+        rows = 0
+        while rows < limit:
+            try:
+                block = self._pages.popleft()
+                self.hits += 1
+            except IndexError:
+                self.misses += 1
+                block = generate_honey_transactions(customer_id, limit - rows)
+            blocks.append(block)
+            rows += len(block)
+        if len(self._pages) < self.page_capacity * self.low_water:
+            self._wake.set()
+
+        return HoneyTransactions.concat(blocks, customer_id, offset)[:limit]
+
+    # ---------------------------------------------------------------
+    # Refill
+    # ---------------------------------------------------------------
+
+    def refill(self):
+        """
+        Top the ring up to capacity
+        """
+        while len(self._pages) < self.page_capacity:
+            self._pages.append(generate_honey_transactions(0, self.page_size))
+
+    def start(self):
+        """
+        Fill the pool and keep it topped up on a daemon thread
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def _run():
+            while not self._stop.is_set():
+                self.refill()
+                self._wake.wait(REFILL_INTERVAL)
+                self._wake.clear()
+
+        self._thread = threading.Thread(target=_run, name='honey-pool', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def stats(self):
+        """
+        Pool depth and hit/miss counters
+
+        Returns:
+            dict
+        """
+        return {
+            'transaction_pages': len(self._pages),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+pool = HoneyPool()
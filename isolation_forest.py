@@ -0,0 +1,380 @@
+"""
+Isolation Forest
+Small NumPy-only Isolation Forest for the 5 behavioral features
+
+Every tree lives in the same flat arrays (no node objects):
+    feature[i]     split feature, -1 for leaves
+    threshold[i]   go left when x[feature] < threshold
+    left[i]        index of left child (global)
+    right[i]       index of right child (global)
+    value[i]       leaves only: depth + c(leaf size), the expected path length
+Tree t starts at roots[t]. Scoring walks every tree for a whole batch at
+once, one level per NumPy step; for that walk leaves are turned into
+self-loops so no per-step masking is needed.
+
+Models are saved either as .npz or in a flat, 64-byte-aligned binary
+format (save_mapped/load_mapped) that workers open read-only with
+np.memmap, so every process shares one page-cache copy.
+"""
+
+import argparse
+import math
+import os
+import struct
+
+import numpy as np
+
+EULER_GAMMA = 0.5772156649015329
+
+# Mapped format: header, then each array at a 64-byte aligned offset
+MAPPED_MAGIC = b'HGIF'
+MAPPED_VERSION = 1
+MAPPED_ALIGN = 64
+# magic, version, n_nodes, n_trees, sample_size, max_depth, risk_offset
+_MAPPED_HEADER = struct.Struct('<4sIQQQQd')
+# (name, dtype, length key) in file order; walk tables are stored too so
+# loading computes nothing per worker
+_MAPPED_ARRAYS = (
+    ('feature', np.int8, 'nodes'),
+    ('threshold', np.float64, 'nodes'),
+    ('left', np.int32, 'nodes'),
+    ('right', np.int32, 'nodes'),
+    ('value', np.float64, 'nodes'),
+    ('roots', np.int32, 'trees'),
+    ('walk_feature', np.int64, 'nodes'),
+    ('walk_threshold', np.float64, 'nodes'),
+    ('walk_children', np.int64, 'children'),
+)
+SCORE_CHUNK_ROWS = 4096      # rows per scoring step (bounds the n x trees index matrix)
+
+
+def average_path_length(n):
+    """
+    c(n): average unsuccessful-search path length in a BST of n items,
+    used to normalize path lengths (Liu et al., 2008)
+
+    Args:
+        n: int or array of ints
+
+    Returns:
+        float or array
+    """
+    n = np.asarray(n, dtype=np.float64)
+    result = np.zeros_like(n)
+    result = np.where(n == 2, 1.0, result)
+    big = n > 2
+    m = np.where(big, n - 1, 1)
+    result = np.where(big, 2 * (np.log(m) + EULER_GAMMA) - 2 * m / np.where(big, n, 1), result)
+    return result if result.ndim else float(result)
+
+
+class IsolationForest:
+    """
+    Array-backed Isolation Forest
+
+    Build one with IsolationForest.fit(X) or IsolationForest.load(path).
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots,
+                 sample_size, max_depth, risk_offset=0.5, walk=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.sample_size = int(sample_size)
+        self.max_depth = int(max_depth)
+        self.risk_offset = float(risk_offset)
+        self._c = average_path_length(self.sample_size)
+
+        if walk is None:
+            walk = _walk_tables(feature, threshold, left, right)
+        self._walk_feature, self._walk_threshold, self._walk_children = walk
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    # ---------------------------------------------------------------
+    # Training
+    # ---------------------------------------------------------------
+
+    @classmethod
+    def fit(cls, X, n_trees=100, sample_size=256, seed=None):
+        """
+        Train on a feature matrix of (mostly) normal sessions
+
+        Args:
+            X: array-like, shape (N, n_features)
+            n_trees: int
+            sample_size: int - rows sampled per tree (psi)
+            seed: int or None
+
+        Returns:
+            IsolationForest
+        """
+        X = np.asarray(X, dtype=np.float64)
+        rng = np.random.default_rng(seed)
+        sample_size = min(sample_size, len(X))
+        max_depth = max(1, math.ceil(math.log2(max(sample_size, 2))))
+
+        feature, threshold, left, right, value, roots = [], [], [], [], [], []
+        for _ in range(n_trees):
+            sample = X[rng.choice(len(X), sample_size, replace=False)]
+            roots.append(len(feature))
+            # Depth-first build; children are appended, parents patched
+            stack = [(sample, 0, len(feature))]
+            _add_node(feature, threshold, left, right, value)
+            while stack:
+                rows, depth, node = stack.pop()
+                split = _choose_split(rows, rng) if depth < max_depth and len(rows) > 1 else None
+                if split is None:
+                    value[node] = depth + average_path_length(len(rows))
+                    continue
+                column, cut = split
+                mask = rows[:, column] < cut
+                feature[node] = column
+                threshold[node] = cut
+                left[node] = _add_node(feature, threshold, left, right, value)
+                right[node] = _add_node(feature, threshold, left, right, value)
+                stack.append((rows[mask], depth + 1, left[node]))
+                stack.append((rows[~mask], depth + 1, right[node]))
+
+        model = cls(
+            feature=np.array(feature, dtype=np.int8),
+            threshold=np.array(threshold, dtype=np.float64),
+            left=np.array(left, dtype=np.int32),
+            right=np.array(right, dtype=np.int32),
+            value=np.array(value, dtype=np.float64),
+            roots=np.array(roots, dtype=np.int32),
+            sample_size=sample_size,
+            max_depth=max_depth
+        )
+        # Typical training session -> risk 0; fully isolated -> 100
+        model.risk_offset = float(np.median(model.score(X)))
+        return model
+
+    # ---------------------------------------------------------------
+    # Scoring
+    # ---------------------------------------------------------------
+
+    def path_lengths(self, X):
+        """
+        Mean path length over all trees for each row
+
+        Args:
+            X: array-like, shape (N, n_features)
+
+        Returns:
+            np.ndarray of float64, shape (N,)
+        """
+        X = np.asarray(X, dtype=np.float64)
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), SCORE_CHUNK_ROWS):
+            chunk = X[start:start + SCORE_CHUNK_ROWS]
+            rows = np.arange(len(chunk))[:, None]
+            nodes = np.broadcast_to(self.roots.astype(np.int64), (len(chunk), self.n_trees))
+            for _ in range(self.max_depth):
+                values = chunk[rows, self._walk_feature[nodes]]
+                go_right = values >= self._walk_threshold[nodes]
+                nodes = self._walk_children[2 * nodes + go_right]
+            out[start:start + len(chunk)] = self.value[nodes].mean(axis=1)
+        return out
+
+    def score(self, X):
+        """
+        Anomaly score s = 2^(-E[h(x)] / c(psi)); close to 1 = anomalous
+
+        Returns:
+            np.ndarray of float64, shape (N,)
+        """
+        return np.power(2.0, -self.path_lengths(X) / self._c)
+
+    def risk(self, X):
+        """
+        Anomaly scores mapped to 0-100 risk (risk_offset -> 0, 1.0 -> 100)
+
+        Returns:
+            np.ndarray of int64, shape (N,)
+        """
+        scaled = (self.score(X) - self.risk_offset) / (1.0 - self.risk_offset) * 100
+        return np.clip(np.rint(scaled), 0, 100).astype(np.int64)
+
+    # ---------------------------------------------------------------
+    # Persistence
+    # ---------------------------------------------------------------
+
+    def save(self, path):
+        """
+        Write the model as a single .npz file
+        """
+        np.savez(
+            path,
+            feature=self.feature, threshold=self.threshold,
+            left=self.left, right=self.right, value=self.value, roots=self.roots,
+            meta=np.array([self.sample_size, self.max_depth, self.risk_offset])
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a model written by save()
+
+        Returns:
+            IsolationForest
+        """
+        with np.load(path) as data:
+            sample_size, max_depth, risk_offset = data['meta']
+            return cls(
+                feature=data['feature'], threshold=data['threshold'],
+                left=data['left'], right=data['right'], value=data['value'],
+                roots=data['roots'], sample_size=sample_size,
+                max_depth=max_depth, risk_offset=risk_offset
+            )
+
+    def save_mapped(self, path):
+        """
+        Write the model in the flat mmap-able format, atomically
+
+        The file is written next to `path` and renamed over it, so
+        workers never see a partial model and can pick up the new file
+        by noticing the changed inode.
+        """
+        arrays = {
+            'feature': self.feature, 'threshold': self.threshold,
+            'left': self.left, 'right': self.right, 'value': self.value,
+            'roots': self.roots, 'walk_feature': self._walk_feature,
+            'walk_threshold': self._walk_threshold,
+            'walk_children': self._walk_children,
+        }
+        header = _MAPPED_HEADER.pack(
+            MAPPED_MAGIC, MAPPED_VERSION, len(self.feature), self.n_trees,
+            self.sample_size, self.max_depth, self.risk_offset)
+
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            for name, dtype, _ in _MAPPED_ARRAYS:
+                f.write(b'\0' * (-f.tell() % MAPPED_ALIGN))
+                f.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_mapped(cls, path):
+        """
+        Open a model written by save_mapped() without copying it
+
+        All arrays are read-only views of one np.memmap, so the pages
+        are shared between every process that maps the same file.
+
+        Returns:
+            IsolationForest
+        """
+        buf = np.memmap(path, dtype=np.uint8, mode='r')
+        magic, version, n_nodes, n_trees, sample_size, max_depth, risk_offset = \
+            _MAPPED_HEADER.unpack_from(buf)
+        if magic != MAPPED_MAGIC or version != MAPPED_VERSION:
+            raise ValueError(f"{path} is not a version {MAPPED_VERSION} model file")
+
+        lengths = {'nodes': n_nodes, 'trees': n_trees, 'children': 2 * n_nodes}
+        arrays = {}
+        offset = _MAPPED_HEADER.size
+        for name, dtype, length in _MAPPED_ARRAYS:
+            offset += -offset % MAPPED_ALIGN
+            nbytes = lengths[length] * np.dtype(dtype).itemsize
+            arrays[name] = buf[offset:offset + nbytes].view(dtype)
+            offset += nbytes
+
+        return cls(
+            feature=arrays['feature'], threshold=arrays['threshold'],
+            left=arrays['left'], right=arrays['right'], value=arrays['value'],
+            roots=arrays['roots'], sample_size=sample_size,
+            max_depth=max_depth, risk_offset=risk_offset,
+            walk=(arrays['walk_feature'], arrays['walk_threshold'],
+                  arrays['walk_children'])
+        )
+
+
+def load_model_file(path):
+    """
+    Load a model in either format (.npz, otherwise the mapped format)
+
+    Returns:
+        IsolationForest
+    """
+    if path.endswith('.npz'):
+        return IsolationForest.load(path)
+    return IsolationForest.load_mapped(path)
+
+
+def _walk_tables(feature, threshold, left, right):
+    # Leaves split on column 0 at +inf and point to themselves, so extra
+    # steps past a leaf are no-ops
+    leaf = feature < 0
+    walk_feature = np.where(leaf, 0, feature).astype(np.int64)
+    walk_threshold = np.where(leaf, np.inf, threshold)
+    nodes = np.arange(len(feature), dtype=np.int64)
+    walk_children = np.stack([
+        np.where(leaf, nodes, left),
+        np.where(leaf, nodes, right)
+    ], axis=1).astype(np.int64).ravel()
+    return walk_feature, walk_threshold, walk_children
+
+
+def _add_node(feature, threshold, left, right, value):
+    feature.append(-1)
+    threshold.append(0.0)
+    left.append(-1)
+    right.append(-1)
+    value.append(0.0)
+    return len(feature) - 1
+
+
+def _choose_split(rows, rng):
+    lows = rows.min(axis=0)
+    highs = rows.max(axis=0)
+    candidates = np.flatnonzero(highs > lows)
+    if len(candidates) == 0:
+        return None  # all rows identical
+    column = int(rng.choice(candidates))
+    cut = rng.uniform(lows[column], highs[column])
+    if cut <= lows[column]:
+        cut = np.nextafter(lows[column], highs[column])
+    return column, cut
+
+
+def load_feature_matrix(path):
+    """
+    Feature matrix from .npy, or from .csv with a header row of
+    ml_detector.FEATURE_NAMES
+    """
+    if path.endswith('.npy'):
+        return np.load(path)
+    return np.loadtxt(path, delimiter=',', skiprows=1, ndmin=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train an Isolation Forest model')
+    parser.add_argument('features', help='.npy or .csv feature matrix of normal sessions')
+    parser.add_argument('output', help='model file to write (.npz, or any other '
+                                       'extension for the mmap-able format)')
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--sample-size', type=int, default=256)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    X = load_feature_matrix(args.features)
+    model = IsolationForest.fit(X, args.trees, args.sample_size, args.seed)
+    if args.output.endswith('.npz'):
+        model.save(args.output)
+    else:
+        model.save_mapped(args.output)
+    print(f"Trained {model.n_trees} trees ({len(model.feature)} nodes) on "
+          f"{len(X)} rows -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+"""
+Metrics
+Low-overhead counters and fixed-bucket histograms for hot paths, and
+their Prometheus text exposition
+
+Every metric keeps one shard per thread. An update only touches the
+calling thread's shard - no lock, no contention, a few hundred
+nanoseconds - and a scrape sums the shards. Values that are already
+tracked elsewhere (store sizes, pool depth, ...) are read at scrape
+time by collectors instead of being updated per event.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+# Request / stage latencies, seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_INF = float('inf')
+
+
+class _Sharded:
+    """
+    Base for metrics stored as one list of numbers per thread
+    """
+
+    __slots__ = ('_local', '_shards', '_lock', '_width')
+
+    def __init__(self, width):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        self._width = width
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = [0] * self._width
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _totals(self):
+        # Shards of exited threads are kept, so counts never go backwards
+        totals = [0] * self._width
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+
+class Counter(_Sharded):
+    """
+    Monotonic counter
+    """
+
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount=1):
+        try:
+            self._local.shard[0] += amount
+        except AttributeError:
+            self._shard()[0] += amount
+
+    @property
+    def value(self):
+        return self._totals()[0]
+
+
+class Histogram(_Sharded):
+    """
+    Fixed-bucket histogram (Prometheus `le` semantics)
+
+    observe() is a bisect plus three additions on the thread's own
+    shard, cheap enough for the request path.
+    """
+
+    __slots__ = ('buckets',)
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # Shard layout: one count per bucket, +Inf count, sum, count
+        super().__init__(len(self.buckets) + 3)
+
+    def observe(self, value):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-2] += value
+        shard[-1] += 1
+
+    @property
+    def count(self):
+        return self._totals()[-1]
+
+    def snapshot(self):
+        """
+        Cumulative bucket counts keyed by upper bound
+
+        Returns:
+            dict with 'buckets' ({le: count}), 'sum' and 'count'
+        """
+        totals = self._totals()
+        cumulative = 0
+        buckets = {}
+        for bound, n in zip(self.buckets + (_INF,), totals):
+            cumulative += n
+            buckets['+Inf' if bound == _INF else bound] = cumulative
+        return {'buckets': buckets, 'sum': totals[-2], 'count': totals[-1]}
+
+
+class Family:
+    """
+    A named metric with labels; each label combination is a child
+    Counter/Histogram. Resolve children once (labels()) and keep them
+    for hot paths.
+    """
+
+    def __init__(self, name, help_text, kind, label_names=(), **options):
+        self.name = name
+        self.help = help_text
+        self.kind = kind            # 'counter' or 'histogram'
+        self.label_names = tuple(label_names)
+        self.options = options
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = Counter() if self.kind == 'counter' else Histogram(**self.options)
+                    self._children[values] = child
+        return child
+
+    def render(self, lines):
+        lines.append(f'# HELP {self.name} {self.help}')
+        lines.append(f'# TYPE {self.name} {self.kind}')
+        for values, child in sorted(self._children.items()):
+            labels = _labels(zip(self.label_names, values))
+            if self.kind == 'counter':
+                lines.append(f'{self.name}_total{{{labels}}} {_num(child.value)}'
+                             if labels else f'{self.name}_total {_num(child.value)}')
+                continue
+            snapshot = child.snapshot()
+            for bound, count in snapshot['buckets'].items():
+                le = _labels([*zip(self.label_names, values), ('le', _num(bound))])
+                lines.append(f'{self.name}_bucket{{{le}}} {count}')
+            suffix = f'{{{labels}}}' if labels else ''
+            lines.append(f'{self.name}_sum{suffix} {_num(snapshot["sum"])}')
+            lines.append(f'{self.name}_count{suffix} {snapshot["count"]}')
+
+
+def _labels(pairs):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _num(value):
+    return value if isinstance(value, str) else repr(value)
+
+
+# -------------------------------------------------------------------
+# Registry
+# -------------------------------------------------------------------
+
+_families = []
+_collectors = []
+
+
+def counter(name, help_text, label_names=()):
+    family = Family(name, help_text, 'counter', label_names)
+    _families.append(family)
+    return family
+
+
+def histogram(name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+    family = Family(name, help_text, 'histogram', label_names, buckets=buckets)
+    _families.append(family)
+    return family
+
+
+def register_collector(collect):
+    """
+    Add a scrape-time source of samples
+
+    Args:
+        collect: callable() -> iterable of (name, kind, help, samples),
+            kind 'gauge' or 'counter', samples a list of
+            (labels dict, value)
+    """
+    _collectors.append(collect)
+
+
+def render():
+    """
+    Everything registered, in the Prometheus text format (0.0.4)
+
+    Returns:
+        str
+    """
+    lines = []
+    for family in _families:
+        family.render(lines)
+    for collect in _collectors:
+        for name, kind, help_text, samples in collect():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                labels = _labels(labels.items())
+                lines.append(f'{name}{{{labels}}} {_num(value)}' if labels
+                             else f'{name} {_num(value)}')
+    lines.append('')
+    return '\n'.join(lines)
+
+
+# -------------------------------------------------------------------
+# Shared families
+# -------------------------------------------------------------------
+
+REQUEST_SECONDS = histogram(
+    'honeyguard_request_duration_seconds',
+    'HTTP request latency by route, including streamed bodies',
+    ('method', 'route'))
+
+STAGE_SECONDS = histogram(
+    'honeyguard_stage_duration_seconds',
+    'Latency of request pipeline stages',
+    ('stage',))
+
+
+class LatencyMiddleware:
+    """
+    ASGI middleware observing REQUEST_SECONDS per matched route
+
+    Labels use the route template (e.g. '/transactions'), never the raw
+    path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get('route')
+            REQUEST_SECONDS.labels(
+                scope['method'], route.path if route is not None else 'unmatched'
+            ).observe(time.perf_counter() - start)
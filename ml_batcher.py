@@ -0,0 +1,162 @@
+"""
+ML Micro-Batcher
+Coalesces concurrent scoring requests into one get_ml_risk_batch call
+"""
+
+import asyncio
+import os
+
+import numpy as np
+
+import ml_detector
+import metrics
+from executors import run_cpu
+
+# Off by default: the rule-based scorer is cheaper than the wait.
+# Turn on with a real model, where per-call overhead dominates.
+MICROBATCH_ENABLED = os.environ.get('HONEYGUARD_ML_MICROBATCH', '0') == '1'
+MAX_BATCH_SIZE = int(os.environ.get('HONEYGUARD_ML_MAX_BATCH', 64))
+MAX_WAIT_MS = float(os.environ.get('HONEYGUARD_ML_MAX_WAIT_MS', 2.0))
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_WAIT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+BATCH_SIZE = metrics.histogram(
+    'honeyguard_ml_batch_size', 'Feature vectors scored per ML batch',
+    buckets=BATCH_SIZE_BUCKETS)
+QUEUE_WAIT_SECONDS = metrics.histogram(
+    'honeyguard_ml_queue_wait_seconds', 'Time a scoring request waited for its batch',
+    buckets=QUEUE_WAIT_BUCKETS)
+
+
+class MicroBatcher:
+    """
+    Collects feature vectors from in-flight requests for up to
+    `max_wait_ms` or `max_batch_size` items, scores them as one batch and
+    resolves each caller's future
+    """
+
+    def __init__(self, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batch_sizes = BATCH_SIZE.labels()
+        self.queue_wait = QUEUE_WAIT_SECONDS.labels()
+        self._queue = None
+        self._task = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """
+        Start the batching loop on the running event loop
+        """
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # Anyone still waiting gets scored directly
+        while not self._queue.empty():
+            row, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_result(int(ml_detector.get_ml_risk_batch(row)[0]))
+
+    async def score(self, features):
+        """
+        Risk for one feature dict, scored together with concurrent callers
+
+        Args:
+            features: dict from extract_behavioral_features() or None
+
+        Returns:
+            int - risk score 0-100
+        """
+        if features is None:
+            return ml_detector.DEFAULT_RISK
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        row = ml_detector.features_to_matrix([features])
+        self._queue.put_nowait((row, future, loop.time()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            now = loop.time()
+            self.batch_sizes.observe(len(batch))
+            for _, _, enqueued in batch:
+                self.queue_wait.observe(now - enqueued)
+
+            matrix = np.vstack([row for row, _, _ in batch])
+            try:
+                if ml_detector.OFFLOAD_SCORING:
+                    risks = await run_cpu(ml_detector.get_ml_risk_batch, matrix)
+                else:
+                    risks = ml_detector.get_ml_risk_batch(matrix)
+            except Exception as exc:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            for (_, future, _), risk in zip(batch, risks):
+                if not future.done():
+                    future.set_result(int(risk))
+
+    def stats(self):
+        """
+        Batch-size and queue-wait histograms
+
+        Returns:
+            dict
+        """
+        return {
+            'batch_size': self.batch_sizes.snapshot(),
+            'queue_wait_seconds': self.queue_wait.snapshot(),
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+batcher = MicroBatcher()
+
+
+async def score(features):
+    """
+    ML risk for one request: micro-batched when the batcher is running,
+    otherwise scored directly
+
+    Args:
+        features: dict from extract_behavioral_features() or None
+
+    Returns:
+        int - risk score 0-100
+    """
+    if batcher.running:
+        return await batcher.score(features)
+    return await ml_detector.get_ml_risk_async(features)
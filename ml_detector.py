@@ -1,13 +1,170 @@
 """
-ML Detector - Placeholder
-Member 2 will implement the actual Isolation Forest here
+ML Detector
+Isolation Forest scoring of behavioral features, with the original
+rule-based scorer as a fallback when no model is loaded
 """
 
+import os
+import time
+
+import numpy as np
+
+from executors import run_cpu
+from isolation_forest import load_model_file
+
+# Trained model from `python isolation_forest.py`; empty = rules only.
+# Prefer the mapped format (e.g. model.ifm): workers share one copy and
+# a model swapped in with a rename is picked up without a restart.
+MODEL_PATH = os.environ.get('HONEYGUARD_MODEL', '')
+MODEL_CHECK_INTERVAL = float(os.environ.get('HONEYGUARD_MODEL_CHECK_INTERVAL', 5.0))
+
+# True while a model is loaded: scoring then runs on the bounded CPU
+# pool instead of the event loop
+OFFLOAD_SCORING = False
+
+_model = None
+_model_path = None
+_model_stat = None
+_next_check = 0.0
+
+# Column order of feature matrices (keys of extract_behavioral_features)
+FEATURE_NAMES = (
+    'requests_per_minute',
+    'avg_time_gap',
+    'session_duration',
+    'unique_endpoints',
+    'total_requests'
+)
+# Value used when a key is missing from a features dict
+FEATURE_DEFAULTS = (0.0, 10.0, 0.0, 0.0, 0.0)
+
+RPM = FEATURE_NAMES.index('requests_per_minute')
+AVG_GAP = FEATURE_NAMES.index('avg_time_gap')
+DURATION = FEATURE_NAMES.index('session_duration')
+TOTAL = FEATURE_NAMES.index('total_requests')
+
+DEFAULT_RISK = 20   # risk when no features are available
+
+
+def features_to_matrix(features_list):
+    """
+    Stack feature dicts into an N x 5 matrix (columns = FEATURE_NAMES)
+
+    Args:
+        features_list: iterable of dicts from extract_behavioral_features()
+
+    Returns:
+        np.ndarray of float64, shape (N, 5)
+    """
+    rows = [
+        [features.get(name, default)
+         for name, default in zip(FEATURE_NAMES, FEATURE_DEFAULTS)]
+        for features in features_list
+    ]
+    return np.array(rows, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+
+
+def load_model(path):
+    """
+    Load an Isolation Forest model and use it for all scoring
+
+    The file is watched: when it is replaced (new inode/mtime) the new
+    model is loaded on the next scoring call after MODEL_CHECK_INTERVAL.
+
+    Args:
+        path: str - .npz from IsolationForest.save() or a mapped model
+            from IsolationForest.save_mapped()
+    """
+    global _model, _model_path, _model_stat, OFFLOAD_SCORING
+    stat = _file_identity(path)
+    _model = load_model_file(path)
+    _model_path = path
+    _model_stat = stat
+    OFFLOAD_SCORING = True
+
+
+def unload_model():
+    """
+    Go back to the rule-based scorer
+    """
+    global _model, _model_path, _model_stat, OFFLOAD_SCORING
+    _model = None
+    _model_path = None
+    _model_stat = None
+    OFFLOAD_SCORING = False
+
+
+def _file_identity(path):
+    stat = os.stat(path)
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _maybe_reload():
+    global _next_check
+    now = time.monotonic()
+    if _model_path is None or now < _next_check:
+        return
+    _next_check = now + MODEL_CHECK_INTERVAL
+    try:
+        if _file_identity(_model_path) != _model_stat:
+            load_model(_model_path)
+    except (OSError, ValueError):
+        pass  # keep serving the model we have
+
+
+def get_ml_risk_batch(feature_matrix):
+    """
+    Score many sessions at once
+
+    Args:
+        feature_matrix: array-like, shape (N, 5), columns in FEATURE_NAMES
+            order (see features_to_matrix)
+
+    Returns:
+        np.ndarray of int64 - risk scores 0-100, shape (N,)
+    """
+    X = np.asarray(feature_matrix, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+    _maybe_reload()
+    model = _model
+    if model is not None:
+        return model.risk(X)
+    return rule_based_risk_batch(X)
+
+
+def rule_based_risk_batch(X):
+    """
+    Fallback scorer: fixed thresholds on request rate and timing
+
+    Args:
+        X: np.ndarray, shape (N, 5), columns in FEATURE_NAMES order
+
+    Returns:
+        np.ndarray of int64 - risk scores 0-100, shape (N,)
+    """
+    requests_per_min = X[:, RPM]
+    session_duration = X[:, DURATION]
+    total_requests = X[:, TOTAL]
+    avg_gap = X[:, AVG_GAP]
+
+    # High request frequency = suspicious
+    risk = np.select(
+        [requests_per_min > 20, requests_per_min > 10, requests_per_min > 5],
+        [40, 25, 10],
+        default=0
+    )
+
+    # Very new session making lots of requests = suspicious
+    risk += np.where((session_duration < 2) & (total_requests > 10), 30, 0)
+
+    # Too many requests too fast (less than 1 second between requests)
+    risk += np.where(avg_gap < 1, 30, 0)
+
+    return np.minimum(risk, 100).astype(np.int64)
+
 
 def get_ml_risk(behavioral_features):
     """
-    Placeholder function
-    Member 2 will replace this with actual ML model
+    Score a single session (thin wrapper over get_ml_risk_batch)
 
     Args:
         behavioral_features: dict from extract_behavioral_features()
@@ -22,40 +179,23 @@ def get_ml_risk(behavioral_features):
     Returns:
         int - risk score 0-100
     """
-    # TEMPORARY: Simple rule-based risk until Member 2 provides ML model
-
     if behavioral_features is None:
-        return 20  # Default low risk
+        return DEFAULT_RISK  # Default low risk
 
-    requests_per_min = behavioral_features.get('requests_per_minute', 0)
-    session_duration = behavioral_features.get('session_duration', 0)
-    total_requests = behavioral_features.get('total_requests', 0)
+    return int(get_ml_risk_batch(features_to_matrix([behavioral_features]))[0])
 
-    risk = 0
 
-    # High request frequency = suspicious
-    if requests_per_min > 20:
-        risk += 40
-    elif requests_per_min > 10:
-        risk += 25
-    elif requests_per_min > 5:
-        risk += 10
+async def get_ml_risk_async(behavioral_features):
+    """
+    Awaitable get_ml_risk
 
-    # Very new session making lots of requests = suspicious
-    if session_duration < 2 and total_requests > 10:
-        risk += 30
-
-    # Too many requests too fast
-    avg_gap = behavioral_features.get('avg_time_gap', 10)
-    if avg_gap < 1:  # Less than 1 second between requests
-        risk += 30
-
-    return min(risk, 100)
-
-    # TODO for Member 2:
-    # Replace above logic with:
-    # 1. Load trained Isolation Forest model
-    # 2. Transform behavioral_features into feature vector
-    # 3. Get anomaly score from model
-    # 4. Convert anomaly score to 0-100 risk score
-    # 5. Return risk score
+    The rule-based scorer is cheap enough to run inline; model scoring
+    (OFFLOAD_SCORING) goes to the bounded CPU executor.
+    """
+    if OFFLOAD_SCORING:
+        return await run_cpu(get_ml_risk, behavioral_features)
+    return get_ml_risk(behavioral_features)
+
+
+if MODEL_PATH:
+    load_model(MODEL_PATH)
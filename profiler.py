@@ -0,0 +1,231 @@
+"""
+Profiler
+Opt-in, sampled timing of the request decision path, written as
+collapsed stacks for flame graphs
+
+A sampled request's time is split along its decision chain, e.g.
+
+    GET /account;decide;session_lookup 41
+    GET /account;decide;ml_scoring 230
+    GET /account;data_fetch;honey;honey_generation 95
+    GET /account;serialization 12
+    GET /account 60
+
+Each line is a stack and its self time in microseconds, summed over
+the sampled requests; the bare route is time outside every stage
+(routing, validation, sending). Files go to PROFILE_DIR every
+PROFILE_FLUSH_INTERVAL seconds and load directly into flamegraph.pl or
+speedscope.
+
+The stages come from the timings the decision engine records anyway
+(Decision.timings); nothing is traced at interpreter level, so
+unsampled requests running alongside a sampled one are not slowed.
+
+Turn on with HONEYGUARD_PROFILE=1 or at runtime (POST /admin/profiler).
+Callers check `if profiler.ENABLED:` before doing any profiling work,
+so when off each hook costs one branch.
+"""
+
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+PROFILE_SAMPLE_RATE = float(os.environ.get('HONEYGUARD_PROFILE_SAMPLE_RATE', 0.01))
+PROFILE_DIR = os.environ.get('HONEYGUARD_PROFILE_DIR', 'profiles')
+PROFILE_FLUSH_INTERVAL = float(os.environ.get('HONEYGUARD_PROFILE_FLUSH_INTERVAL', 60.0))
+
+# Checked by callers before any profiling work: `if profiler.ENABLED:`
+ENABLED = os.environ.get('HONEYGUARD_PROFILE', '0') == '1'
+SAMPLE_RATE = PROFILE_SAMPLE_RATE
+
+_current = ContextVar('honeyguard_profile_trace', default=None)
+_stacks = {}                # 'frame;frame;...' -> seconds, since the last flush
+_lock = threading.Lock()
+_samples = 0                # sampled requests since the last flush
+_files = 0
+_writer = None
+_stop = threading.Event()
+
+
+class Trace:
+    """
+    Stage timings of one sampled request, keyed by frame path
+    """
+
+    __slots__ = ('frames',)
+
+    def __init__(self):
+        self.frames = {}    # tuple of frame names -> inclusive seconds
+
+    def add(self, path, seconds):
+        self.frames[path] = self.frames.get(path, 0.0) + seconds
+
+    def add_decision(self, decision):
+        for stage, ms in decision.timings.items():
+            if stage == 'data_fetch':
+                self.add(('data_fetch', decision.data_source), ms / 1000)
+            else:
+                self.add(('decide', stage), ms / 1000)
+
+    def collapse(self, root, total):
+        """
+        Self time per stack, the root getting whatever no frame covers
+
+        Returns:
+            dict - 'root;frame;...' -> seconds
+        """
+        own = dict(self.frames)
+        for path, seconds in self.frames.items():
+            parent = path[:-1]
+            if parent in own:
+                own[parent] -= seconds
+        stacks = {';'.join((root,) + path): max(0.0, seconds) for path, seconds in own.items()}
+        stacks[root] = max(0.0, total - sum(stacks.values()))
+        return stacks
+
+
+def enable(sample_rate=None):
+    """
+    Start sampling requests (and the writer thread)
+
+    Args:
+        sample_rate: float - fraction of requests to profile, 0-1;
+            keeps the current rate when None
+    """
+    global ENABLED, SAMPLE_RATE
+    if sample_rate is not None:
+        SAMPLE_RATE = sample_rate
+    ENABLED = True
+    start_profile_writer()
+
+
+def disable():
+    """
+    Stop sampling; what was collected is still written on the next flush
+    """
+    global ENABLED
+    ENABLED = False
+
+
+def add(path, seconds):
+    """
+    Attribute `seconds` to a frame path of the request being profiled
+    (no-op outside a sampled request)
+
+    Args:
+        path: tuple of str - frames below the route, e.g. ('serialization',)
+    """
+    trace = _current.get()
+    if trace is not None:
+        trace.add(path, seconds)
+
+
+def _merge(stacks):
+    global _samples
+    with _lock:
+        for stack, seconds in stacks.items():
+            _stacks[stack] = _stacks.get(stack, 0.0) + seconds
+        _samples += 1
+
+
+def flush():
+    """
+    Write the stacks collected since the last flush to a new file
+
+    Returns:
+        str - path of the file written, or None if nothing was sampled
+    """
+    global _stacks, _samples, _files
+    with _lock:
+        stacks, samples = _stacks, _samples
+        _stacks, _samples = {}, 0
+    if not samples:
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(
+        PROFILE_DIR, f"honeyguard-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}-{_files}.folded")
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, seconds in sorted(stacks.items()):
+            micros = round(seconds * 1e6)
+            if micros:
+                f.write(f'{stack} {micros}\n')
+    _files += 1
+    return path
+
+
+def stats():
+    """
+    Profiling state and samples waiting to be written
+
+    Returns:
+        dict
+    """
+    return {'enabled': ENABLED, 'sample_rate': SAMPLE_RATE, 'pending_samples': _samples,
+            'files_written': _files, 'directory': PROFILE_DIR}
+
+
+def start_profile_writer():
+    """
+    Start the background thread that flushes collected stacks
+    """
+    global _writer
+    if not ENABLED or (_writer is not None and _writer.is_alive()):
+        return
+    _stop.clear()
+
+    def _run():
+        while not _stop.wait(PROFILE_FLUSH_INTERVAL):
+            flush()
+        flush()
+
+    _writer = threading.Thread(target=_run, name='profile-writer', daemon=True)
+    _writer.start()
+
+
+def stop_profile_writer():
+    """
+    Write what is left and stop the writer thread
+    """
+    global _writer
+    _stop.set()
+    if _writer is not None:
+        _writer.join(timeout=5.0)
+        _writer = None
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware choosing which requests to profile
+
+    A sampled request gets a Trace for its duration (hooks reach it via
+    add()); when it completes - including a streamed body - its
+    decision timings are folded in and the stacks merged.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not ENABLED or scope['type'] != 'http' or random.random() >= SAMPLE_RATE:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace()
+        # Request.state lives in scope['state']; create it here so the
+        # route's request.state.decision lands where this can see it
+        state = scope.setdefault('state', {})
+        token = _current.set(trace)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            total = time.perf_counter() - start
+            _current.reset(token)
+            decision = state.get('decision')
+            if decision is not None:
+                trace.add_decision(decision)
+            route = scope.get('route')
+            root = f"{scope['method']} {route.path if route is not None else 'unmatched'}"
+            _merge(trace.collapse(root, total))
@@ -0,0 +1,170 @@
+"""
+Rate Limiter
+Token buckets per session, IP and customer, and the action to take
+when a request is over the limit
+
+Each bucket is stored as a single float - the time at which it will be
+full again (GCRA, the "virtual scheduling" form of a token bucket) - so
+refill is arithmetic on read, with no timers and nothing to update
+while idle. Buckets live in plain dicts and are updated without locks:
+under the GIL each read/write is atomic, and a lost update between two
+racing requests only lets one extra request through.
+
+What happens to a limited request depends on its risk tier
+(risk_calculator.determine_data_source): by default low/medium-risk
+clients are slowed down (tarpit) and honey sessions are answered from
+cache. Anything whose wait would exceed MAX_TARPIT is rejected.
+
+IP and customer buckets are kept per tier, so traffic that has been
+moved to randomized/honey data cannot use up the allowance of a real
+(low-risk) client on the same account or address.
+"""
+
+import os
+import time
+
+RATE_LIMIT_ENABLED = os.environ.get('HONEYGUARD_RATE_LIMIT', '1') != '0'
+
+
+def _rate(name, default):
+    # 'rate/burst': sustained requests per second / bucket size
+    rate, burst = os.environ.get(name, default).split('/')
+    return float(rate), float(burst)
+
+
+RATE_LIMITS = {
+    'session': _rate('HONEYGUARD_RATE_SESSION', '5/20'),
+    'ip': _rate('HONEYGUARD_RATE_IP', '20/60'),
+    'customer': _rate('HONEYGUARD_RATE_CUSTOMER', '10/30'),
+}
+
+# Action per risk tier for a request over its limit:
+# 'tarpit' (delay, then serve), 'cached' (serve honey from cache,
+# skip scoring) or 'reject' (429)
+ACTIONS = ('tarpit', 'cached', 'reject')
+DEFAULT_TIER_ACTIONS = {'real': 'tarpit', 'randomized': 'tarpit', 'honey': 'cached'}
+
+
+def parse_tier_actions(text):
+    """
+    'honey=reject,real=tarpit' -> DEFAULT_TIER_ACTIONS with those tiers
+    overridden
+
+    Raises:
+        ValueError - malformed item, unknown tier or unknown action
+    """
+    actions = dict(DEFAULT_TIER_ACTIONS)
+    for item in filter(None, (item.strip() for item in text.split(','))):
+        tier, sep, action = item.partition('=')
+        tier, action = tier.strip(), action.strip()
+        if not sep or tier not in DEFAULT_TIER_ACTIONS or action not in ACTIONS:
+            raise ValueError(
+                f"HONEYGUARD_THROTTLE_ACTIONS: bad item {item!r}, expected <tier>=<action> "
+                f"with tier in {sorted(DEFAULT_TIER_ACTIONS)} and action in {list(ACTIONS)}")
+        actions[tier] = action
+    return actions
+
+
+TIER_ACTIONS = parse_tier_actions(os.environ.get('HONEYGUARD_THROTTLE_ACTIONS', ''))
+
+# Longest tarpit delay (seconds); a longer wait is rejected instead
+MAX_TARPIT = float(os.environ.get('HONEYGUARD_MAX_TARPIT', 2.0))
+
+# Buckets tracked per key type before full (idle) ones are pruned
+MAX_BUCKETS = int(os.environ.get('HONEYGUARD_MAX_BUCKETS', 100_000))
+
+
+class BucketSet:
+    """
+    Token buckets of one key type, all with the same rate and burst
+    """
+
+    def __init__(self, rate, burst, max_buckets=MAX_BUCKETS):
+        self.interval = 1.0 / rate               # seconds per token
+        self.tolerance = burst * self.interval    # how far ahead a bucket may run
+        self.max_buckets = max_buckets
+        self._full_at = {}                        # key -> time the bucket is full again
+        self._prune_at = max_buckets
+
+    def __len__(self):
+        return len(self._full_at)
+
+    def wait(self, key, now):
+        """
+        Seconds until `key` has a token (0.0 if it has one now)
+        """
+        full_at = self._full_at.get(key, now)
+        return max(0.0, full_at - self.tolerance + self.interval - now)
+
+    def take(self, key, now):
+        """
+        Spend one token (the bucket may go into debt)
+        """
+        full_at = self._full_at.get(key, now)
+        self._full_at[key] = max(full_at, now) + self.interval
+        if len(self._full_at) > self._prune_at:
+            self.prune(now)
+
+    def prune(self, now):
+        """
+        Forget buckets that have refilled completely (same as absent)
+        """
+        self._full_at = {key: full_at for key, full_at in self._full_at.items() if full_at > now}
+        # Prune again once the table has doubled from what is left
+        self._prune_at = max(self.max_buckets, 2 * len(self._full_at))
+
+
+class RateLimiter:
+    """
+    Session, IP and customer buckets checked together
+    """
+
+    def __init__(self, limits=RATE_LIMITS, actions=TIER_ACTIONS, max_tarpit=MAX_TARPIT):
+        self.buckets = {kind: BucketSet(rate, burst) for kind, (rate, burst) in limits.items()}
+        self.actions = actions
+        self.max_tarpit = max_tarpit
+        self.counts = {'tarpit': 0, 'cached': 0, 'reject': 0}
+
+    def check(self, keys, tier, now=None):
+        """
+        Charge a request to its buckets and pick the throttle action
+
+        Args:
+            keys: dict - {'session': ..., 'ip': ..., 'customer': ...};
+                None values are skipped
+            tier: str - risk tier of the caller ('real', 'randomized',
+                'honey'); shared keys (everything but the session) are
+                charged to that tier's buckets only
+
+        Returns:
+            (action, wait): action None when within limits, otherwise
+            'tarpit', 'cached' or 'reject'; wait in seconds (the tarpit
+            delay, or the Retry-After for a rejection)
+        """
+        now = time.monotonic() if now is None else now
+        keys = [(self.buckets[kind], key if kind == 'session' else (tier, key))
+                for kind, key in keys.items() if key is not None]
+        wait = 0.0
+        for buckets, key in keys:
+            wait = max(wait, buckets.wait(key, now))
+
+        action = None
+        if wait > 0:
+            action = self.actions.get(tier, 'tarpit')
+            if action == 'tarpit' and wait > self.max_tarpit:
+                action = 'reject'
+            self.counts[action] += 1
+        if action != 'reject':
+            # Rejected requests cost nothing, so they don't deepen the debt
+            for buckets, key in keys:
+                buckets.take(key, now)
+        return action, wait
+
+    def stats(self):
+        return {
+            'buckets': {kind: len(buckets) for kind, buckets in self.buckets.items()},
+            'throttled': dict(self.counts)
+        }
+
+
+limiter = RateLimiter()
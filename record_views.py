@@ -0,0 +1,151 @@
+"""
+Record Views
+Immutable customer records and copy-on-write perturbed views of them
+
+Cached records are shared by every request, so nothing may mutate
+them. A randomized response is a PerturbedView: the shared record plus
+a small dict of replacement values. Both provide json_body(), the
+encoded fields without the braces, which a FrozenRecord computes once
+per version and keeps (see encoding.encode_record).
+"""
+
+import json
+import random
+from collections.abc import Mapping
+
+from encoding import dumps
+
+
+def _fragment(key, value):
+    return dumps(key) + b':' + dumps(value)
+
+
+class FrozenRecord(Mapping):
+    """
+    Read-only record; its JSON encoding is computed once and reused
+
+    `version` identifies the record's content (the data store uses a
+    digest of the stored row): a changed record is a new FrozenRecord
+    with a new version, never an in-place update, so the cached bytes
+    can't go stale.
+    """
+
+    __slots__ = ('_data', '_fragments', '_body', 'version')
+
+    def __init__(self, data, version=None):
+        self._data = dict(data)
+        self._fragments = None
+        self._body = None
+        self.version = version
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f'FrozenRecord({self._data!r})'
+
+    def json_body(self):
+        """
+        Returns:
+            bytes - the record's JSON object without its braces
+        """
+        if self._body is None:
+            self._body = dumps(self._data)[1:-1]
+        return self._body
+
+    def fragments(self):
+        """
+        Returns:
+            dict - key -> b'"key":value' JSON fragment, in field order
+        """
+        if self._fragments is None:
+            self._fragments = {key: _fragment(key, value) for key, value in self._data.items()}
+        return self._fragments
+
+
+class PerturbedView(Mapping):
+    """
+    A FrozenRecord with some fields replaced, without copying it
+    """
+
+    __slots__ = ('base', 'overrides')
+
+    def __init__(self, base, overrides):
+        self.base = base
+        self.overrides = overrides
+
+    def __getitem__(self, key):
+        if key in self.overrides:
+            return self.overrides[key]
+        return self.base[key]
+
+    def __iter__(self):
+        return iter(self.base)
+
+    def __len__(self):
+        return len(self.base)
+
+    def __repr__(self):
+        return f'PerturbedView({self.base!r}, {self.overrides!r})'
+
+    def json_body(self):
+        overrides = self.overrides
+        if not overrides:
+            return self.base.json_body()
+        return b','.join(_fragment(key, overrides[key]) if key in overrides else fragment
+                         for key, fragment in self.base.fragments().items())
+
+
+class PerturbationPolicy:
+    """
+    Which numeric fields a randomized response perturbs, and by how much
+
+    `rules` maps a field name to a dict with:
+        noise:  'absolute' (value +/- scale) or 'relative' (value * (1 +/- scale))
+        scale:  float
+        digits: int - rounding applied to the result (default 2)
+
+    Fields missing from a record, or not numeric, are left alone.
+    """
+
+    def __init__(self, rules):
+        self.rules = []
+        for field, rule in rules.items():
+            noise = rule.get('noise', 'absolute')
+            if noise not in ('absolute', 'relative'):
+                raise ValueError(f"Unknown noise type for {field!r}: {noise!r}")
+            self.rules.append((field, noise, float(rule['scale']), int(rule.get('digits', 2))))
+
+    @classmethod
+    def from_json(cls, text):
+        return cls(json.loads(text))
+
+    def apply(self, record, seed=None):
+        """
+        Perturbed view of `record`
+
+        Args:
+            record: FrozenRecord
+            seed: int - same seed, same noise (e.g. derived from the
+                session, so a session sees consistent values); None
+                draws fresh noise
+
+        Returns:
+            PerturbedView
+        """
+        rng = random.Random(seed)
+        overrides = {}
+        for field, noise, scale, digits in self.rules:
+            value = record.get(field)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            delta = rng.uniform(-scale, scale)
+            value = value + delta if noise == 'absolute' else value * (1 + delta)
+            overrides[field] = round(value, digits) if digits else int(round(value))
+        return PerturbedView(record, overrides)
@@ -0,0 +1,341 @@
+"""
+Replay
+Rescore recorded session traces (session_traces.py) offline, to tune
+the risk weights and tier thresholds without touching live traffic
+
+Every request of every session is scored as the decision engine would
+at that point of the session: behavioral features
+(extract_behavioral_features), ML risk (ml_detector.get_ml_risk_batch,
+the rules or a model file), final risk (combine_risk) and tier
+(determine_data_source), with sticky honey. All of it runs as NumPy
+over chunks of a memory-mapped trace, features and ML once per chunk
+and the cheap combination once per candidate config. Trace files are
+split into tasks and spread over a process pool.
+
+Differences from live scoring: every request is rescored (live, the
+decision cache reuses a score while features barely move), and
+features use the request's own timestamp.
+
+Usage:
+    python replay.py traces/*.hgt --workers 4 \\
+        --config current \\
+        --config strict:initial_weight=0.5,ml_weight=0.5,honey_at=60 \\
+        [--model model.ifm] [--output report.json]
+
+Reports, per config: tier distribution over requests and sessions
+(the highest tier each session reached), false positives (benign
+sessions shown randomized or honey data) and detection (attacker
+sessions caught) where traces carry labels, and how each session's
+final tier moved from the tier recorded live.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, fields
+
+import numpy as np
+
+import ml_detector
+from session_telemetry import (
+    MAX_TRACKED_ENDPOINTS,
+    REQUEST_WINDOW_SECONDS,
+    TELEMETRY_RING_SIZE
+)
+from session_traces import TIERS, TraceFile
+
+# Request rows scored per NumPy pass (bounds memory per worker)
+REPLAY_CHUNK_REQUESTS = int(os.environ.get('HONEYGUARD_REPLAY_CHUNK_REQUESTS', 1_000_000))
+# Sessions per pool task; large shards are split so all workers stay busy
+REPLAY_TASK_SESSIONS = int(os.environ.get('HONEYGUARD_REPLAY_TASK_SESSIONS', 250_000))
+
+# Rows of the label and recorded-tier tables: -1 (unknown) comes first
+LABEL_NAMES = ('unknown', 'benign', 'attacker')
+RECORDED_NAMES = ('unknown',) + TIERS
+
+
+@dataclass(frozen=True)
+class ReplayConfig:
+    """
+    Weights and thresholds to replay with; the defaults are the live
+    values (combine_risk, determine_data_source)
+    """
+    name: str = 'current'
+    initial_weight: float = 0.6
+    ml_weight: float = 0.4
+    randomized_at: int = 35
+    honey_at: int = 70
+    sticky_honey: bool = True
+
+    @classmethod
+    def parse(cls, text):
+        """
+        'name' or 'name:key=value,...', e.g. 'strict:honey_at=60'
+        """
+        name, _, options = text.partition(':')
+        types = {f.name: f.type for f in fields(cls)}
+        values = {}
+        for item in filter(None, options.split(',')):
+            key, value = item.split('=')
+            if key not in types or key == 'name':
+                raise ValueError(f'unknown replay option {key!r}')
+            if types[key] is bool:
+                values[key] = value.lower() in ('1', 'true', 'yes')
+            else:
+                values[key] = types[key](value)
+        return cls(name=name, **values)
+
+
+# -------------------------------------------------------------------
+# Vectorized scoring
+# -------------------------------------------------------------------
+
+def chunk_features(chunk):
+    """
+    Behavioral features at every request of a chunk, as the session
+    telemetry would report them right after recording that request
+
+    Returns:
+        (X, session): X shape (n_requests, 5) in ml_detector.FEATURE_NAMES
+        order; session - each row's session index within the chunk
+    """
+    starts = chunk.request_start
+    counts = np.diff(starts)
+    n = int(starts[-1])
+    session = np.repeat(np.arange(len(chunk)), counts)
+    position = np.arange(n) - starts[:-1][session]         # 0-based within its session
+    t = chunk.offset.astype(np.float64)                     # seconds since login
+
+    X = np.empty((n, len(ml_detector.FEATURE_NAMES)))
+    X[:, ml_detector.TOTAL] = position + 1
+    X[:, ml_detector.DURATION] = t / 60
+    first = t[starts[:-1][session]]
+    X[:, ml_detector.AVG_GAP] = np.where(
+        position > 0, (t - first) / np.maximum(position, 1), 0.0)
+
+    # Requests in the trailing window: sessions laid end to end on one
+    # axis (gap wider than the window), so a single searchsorted finds
+    # each window's first request without crossing sessions
+    span = (t.max() if n else 0.0) + 2 * REQUEST_WINDOW_SECONDS
+    key = session * span + t
+    window_start = np.searchsorted(key, key - REQUEST_WINDOW_SECONDS, side='right')
+    X[:, ml_detector.RPM] = np.minimum(np.arange(n) - window_start + 1, TELEMETRY_RING_SIZE)
+
+    # Distinct endpoints so far: flag each (session, endpoint) first
+    # occurrence and count flags within the session
+    pair = session.astype(np.int64) * (int(chunk.endpoint.max(initial=0)) + 1) + chunk.endpoint
+    first_seen = np.zeros(n, dtype=np.int64)
+    first_seen[np.unique(pair, return_index=True)[1]] = 1
+    seen = np.cumsum(first_seen)
+    before = np.concatenate(([0], seen))[starts[:-1]][session]
+    X[:, ml_detector.FEATURE_NAMES.index('unique_endpoints')] = np.minimum(
+        seen - before, MAX_TRACKED_ENDPOINTS)
+    return X, session
+
+
+def _empty_counts():
+    return {
+        'requests': np.zeros(len(TIERS), dtype=np.int64),
+        'sessions': np.zeros(len(TIERS), dtype=np.int64),
+        'by_label': np.zeros((len(LABEL_NAMES), len(TIERS)), dtype=np.int64),
+        'from_recorded': np.zeros((len(RECORDED_NAMES), len(TIERS)), dtype=np.int64),
+        'idle_sessions': np.zeros(1, dtype=np.int64),
+    }
+
+
+def score_chunk(chunk, configs, counts):
+    """
+    Score a chunk under every config and add its tallies to `counts`
+    (one _empty_counts() dict per config)
+    """
+    X, session = chunk_features(chunk)
+    ml_risk = ml_detector.get_ml_risk_batch(X)
+    initial = chunk.initial_risk.astype(np.float64)[session]
+
+    starts = chunk.request_start
+    active = np.diff(starts) > 0                 # sessions with any request
+    first_rows = starts[:-1][active]
+    last_rows = starts[1:][active] - 1
+    labels = chunk.label[active].astype(np.int64) + 1
+    recorded = chunk.recorded_tier[active].astype(np.int64) + 1
+
+    for config, tally in zip(configs, counts):
+        final = (initial * config.initial_weight + ml_risk * config.ml_weight).astype(np.int64)
+        tier = (final >= config.randomized_at).astype(np.int8) + (final >= config.honey_at)
+        if config.sticky_honey:
+            # Once a session is served honey it stays honey
+            honey = np.cumsum(tier == 2)
+            before = np.concatenate(([0], honey))[starts[:-1]][session]
+            tier[honey - before > 0] = 2
+
+        tally['requests'] += np.bincount(tier, minlength=len(TIERS))
+        tally['idle_sessions'] += len(chunk) - int(active.sum())
+        if not len(first_rows):
+            continue
+        highest = np.maximum.reduceat(tier, first_rows)
+        tally['sessions'] += np.bincount(highest, minlength=len(TIERS))
+        np.add.at(tally['by_label'], (labels, highest), 1)
+        np.add.at(tally['from_recorded'], (recorded, tier[last_rows]), 1)
+
+
+def replay_file(path, configs, lo=0, hi=None, chunk_requests=REPLAY_CHUNK_REQUESTS):
+    """
+    Replay sessions [lo, hi) of one trace file
+
+    Returns:
+        list of counts dicts, one per config
+    """
+    trace = TraceFile(path)
+    counts = [_empty_counts() for _ in configs]
+    for chunk in trace.chunks(chunk_requests, lo, hi):
+        score_chunk(chunk, configs, counts)
+    return counts
+
+
+def _replay_task(task):
+    path, lo, hi, configs, chunk_requests = task
+    return replay_file(path, configs, lo, hi, chunk_requests)
+
+
+def _init_worker(model_path):
+    if model_path:
+        ml_detector.load_model(model_path)
+
+
+def replay(paths, configs, workers=1, model_path=None,
+           chunk_requests=REPLAY_CHUNK_REQUESTS, task_sessions=REPLAY_TASK_SESSIONS):
+    """
+    Replay trace files under each config
+
+    Args:
+        paths: trace files
+        configs: list of ReplayConfig
+        workers: processes (1 = run in this process)
+        model_path: model file for ml_detector (default: the rules, or
+            whatever HONEYGUARD_MODEL loads)
+
+    Returns:
+        list of counts dicts, one per config
+    """
+    tasks = []
+    for path in paths:
+        n_sessions = len(TraceFile(path))
+        for lo in range(0, n_sessions, task_sessions):
+            tasks.append((path, lo, min(n_sessions, lo + task_sessions), configs, chunk_requests))
+
+    totals = [_empty_counts() for _ in configs]
+    if workers <= 1:
+        _init_worker(model_path)
+        results = map(_replay_task, tasks)
+    else:
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model_path,))
+        results = pool.map(_replay_task, tasks)
+    try:
+        for counts in results:
+            for total, part in zip(totals, counts):
+                for key, value in part.items():
+                    total[key] += value
+    finally:
+        if workers > 1:
+            pool.shutdown()
+    return totals
+
+
+# -------------------------------------------------------------------
+# Reports
+# -------------------------------------------------------------------
+
+def _distribution(counts):
+    total = int(counts.sum())
+    return {tier: {'count': int(n), 'share': round(n / total, 4) if total else 0.0}
+            for tier, n in zip(TIERS, counts)}
+
+
+def _rate(part, whole):
+    return round(part / whole, 4) if whole else None
+
+
+def report(configs, totals):
+    """
+    Per-config summary of replay counts
+
+    Returns:
+        list of dict (JSON-serializable)
+    """
+    results = []
+    for config, counts in zip(configs, totals):
+        by_label = counts['by_label']
+        benign = by_label[LABEL_NAMES.index('benign')]
+        attacker = by_label[LABEL_NAMES.index('attacker')]
+        results.append({
+            'config': asdict(config),
+            'requests': _distribution(counts['requests']),
+            'sessions': _distribution(counts['sessions']),
+            'sessions_without_requests': int(counts['idle_sessions'][0]),
+            'false_positives': {
+                'benign_sessions': int(benign.sum()),
+                'randomized': int(benign[1]),
+                'honey': int(benign[2]),
+                'rate': _rate(benign[1:].sum(), benign.sum()),
+                'honey_rate': _rate(benign[2], benign.sum()),
+            },
+            'detection': {
+                'attacker_sessions': int(attacker.sum()),
+                'honey': int(attacker[2]),
+                'rate': _rate(attacker[1:].sum(), attacker.sum()),
+                'honey_rate': _rate(attacker[2], attacker.sum()),
+            },
+            'final_tier_from_recorded': {
+                f'{source}->{tier}': int(n)
+                for source, row in zip(RECORDED_NAMES, counts['from_recorded'])
+                for tier, n in zip(TIERS, row) if n
+            },
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rescore session traces offline')
+    parser.add_argument('traces', nargs='+', help='trace files (.hgt) or directories of them')
+    parser.add_argument('--config', action='append', dest='configs', default=[],
+                        help="'name[:key=value,...]' (repeatable; default: current)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--model', help='model file for ml_detector (default: rules)')
+    parser.add_argument('--chunk-requests', type=int, default=REPLAY_CHUNK_REQUESTS)
+    parser.add_argument('--output', help='write the report here instead of stdout')
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.traces:
+        if os.path.isdir(path):
+            paths.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.endswith('.hgt')))
+        else:
+            paths.append(path)
+    configs = [ReplayConfig.parse(text) for text in args.configs or ['current']]
+
+    start = time.perf_counter()
+    totals = replay(paths, configs, args.workers, args.model, args.chunk_requests)
+    elapsed = time.perf_counter() - start
+
+    document = {
+        'traces': len(paths),
+        'sessions': sum(len(TraceFile(path)) for path in paths),
+        'requests': int(totals[0]['requests'].sum()) if totals else 0,
+        'seconds': round(elapsed, 2),
+        'results': report(configs, totals),
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+            f.write('\n')
+    else:
+        json.dump(document, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Reputation
+IP reputation signals for calculate_initial_risk
+
+    CidrIndex         longest-prefix match of an IP against block/allow
+                      CIDR lists (binary radix tree, one walk per lookup)
+    LoginRateTracker  per-IP login counts over a sliding window, for
+                      spotting credential stuffing
+
+The CIDR lists themselves are loaded and hot-reloaded with the other
+blocklists (see heuristics.py).
+"""
+
+import ipaddress
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Logins from one IP within LOGIN_WINDOW seconds above LOGIN_BURST
+# look like credential stuffing. Accepted trade-off: the count is per
+# IP, not per account (stuffing is many accounts from one address), so
+# users sharing an address - office NAT, corporate proxy, carrier-grade
+# NAT - are penalized together once they log in that often. List such
+# networks in heuristics/ip_allowlist.txt, which exempts them.
+LOGIN_WINDOW = float(os.environ.get('HONEYGUARD_LOGIN_WINDOW', 60))
+LOGIN_BURST = int(os.environ.get('HONEYGUARD_LOGIN_BURST', 10))
+# IPs tracked at once (least recently seen are dropped)
+MAX_TRACKED_IPS = int(os.environ.get('HONEYGUARD_MAX_TRACKED_IPS', 100_000))
+
+_ZERO, _ONE, _VALUE = 0, 1, 2
+
+
+class CidrIndex:
+    """
+    Binary radix tree over IPv4/IPv6 prefixes
+
+    Each node is [zero_child, one_child, value]. A lookup walks the
+    address bits from the top and keeps the value of the deepest prefix
+    it passes, so it costs at most 32 (IPv4) / 128 (IPv6) steps however
+    many networks are indexed, and a more specific entry overrides a
+    broader one (an allowed /24 inside a blocked /8).
+    """
+
+    def __init__(self):
+        self._roots = {4: [None, None, None], 6: [None, None, None]}
+        self.size = 0
+
+    @classmethod
+    def from_lists(cls, **lists):
+        """
+        Index from {value: iterable of CIDR strings}, e.g.
+        CidrIndex.from_lists(block=[...], allow=[...]). Later lists win
+        on identical prefixes.
+        """
+        index = cls()
+        for value, networks in lists.items():
+            for network in networks:
+                index.insert(network, value)
+        return index
+
+    def __len__(self):
+        return self.size
+
+    def insert(self, network, value):
+        network = ipaddress.ip_network(network, strict=False)
+        node = self._roots[network.version]
+        bits = int(network.network_address)
+        width = network.max_prefixlen
+        for i in range(network.prefixlen):
+            bit = (bits >> (width - 1 - i)) & 1
+            child = node[bit]
+            if child is None:
+                child = node[bit] = [None, None, None]
+            node = child
+        if node[_VALUE] is None:
+            self.size += 1
+        node[_VALUE] = value
+
+    def lookup(self, ip):
+        """
+        Value of the longest prefix containing `ip`
+
+        Args:
+            ip: str or ipaddress address
+
+        Returns:
+            the inserted value, or None (also for unparseable input)
+        """
+        if self.size == 0:
+            return None
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        node = self._roots[address.version]
+        best = node[_VALUE]
+        bits = int(address)
+        for shift in range(address.max_prefixlen - 1, -1, -1):
+            node = node[(bits >> shift) & 1]
+            if node is None:
+                break
+            if node[_VALUE] is not None:
+                best = node[_VALUE]
+        return best
+
+
+class LoginRateTracker:
+    """
+    Approximate per-IP login count over the last `window` seconds
+
+    Two fixed buckets per IP (this window and the previous one); the
+    previous bucket is weighted by how much of it still overlaps the
+    sliding window. O(1) time and memory per IP, bounded to `max_ips`
+    IPs by LRU.
+    """
+
+    def __init__(self, window=LOGIN_WINDOW, max_ips=MAX_TRACKED_IPS):
+        self.window = window
+        self.max_ips = max_ips
+        self._ips = OrderedDict()     # ip -> [bucket index, current, previous]
+        self._lock = threading.Lock()
+
+    def hit(self, ip, now=None):
+        """
+        Count a login from `ip`
+
+        Returns:
+            float - estimated logins from `ip` in the last window,
+            including this one
+        """
+        now = time.time() if now is None else now
+        bucket, offset = divmod(now, self.window)
+        with self._lock:
+            entry = self._ips.get(ip)
+            if entry is None:
+                entry = self._ips[ip] = [bucket, 0, 0]
+                if len(self._ips) > self.max_ips:
+                    self._ips.popitem(last=False)
+            else:
+                self._ips.move_to_end(ip)
+                if entry[0] != bucket:
+                    entry[2] = entry[1] if bucket - entry[0] == 1 else 0
+                    entry[1] = 0
+                    entry[0] = bucket
+            entry[1] += 1
+            return entry[1] + entry[2] * (1 - offset / self.window)
+
+    def stats(self):
+        return {'tracked_ips': len(self._ips)}
+
+
+login_rate = LoginRateTracker()
@@ -3,6 +3,8 @@ Risk Calculator
 Combines different risk signals into final risk score
 """
 
+import heuristics
+import reputation
 from session_manager import extract_behavioral_features
 
 
@@ -18,17 +20,14 @@ def calculate_initial_risk(user_data, request_metadata):
         int - risk score 0-100
     """
     risk = 0
+    # Blocklists (heuristics/*.txt), compiled once and hot-reloaded
+    rules = heuristics.engine.current()
 
     # 1. Email Analysis (0-30 points)
     email = user_data.get('email', '').lower()
+    domain = email.rpartition('@')[2]
 
-    suspicious_domains = [
-        'tempmail.com', 'guerrillamail.com', '10minutemail.com',
-        'throwaway.email', 'mailinator.com', 'trashmail.com',
-        'fakeinbox.com', 'yopmail.com'
-    ]
-
-    if any(domain in email for domain in suspicious_domains):
+    if rules.disposable_domains.matches(domain):
         risk += 30
 
     # Check for random-looking email
@@ -40,22 +39,23 @@ def calculate_initial_risk(user_data, request_metadata):
     # 2. Name Analysis (0-15 points)
     name = user_data.get('name', '').lower()
 
-    suspicious_words = ['test', 'admin',
-                        'hacker', 'bot', 'script', 'auto', 'fake']
-    if any(word in name for word in suspicious_words):
+    if rules.suspicious_names.search(name):
         risk += 15
 
-    # 3. User Agent Analysis (0-25 points)
-    user_agent = request_metadata.get('user_agent', '').lower()
-
-    automated_tools = ['python', 'curl', 'wget',
-                       'postman', 'httpie', 'bot', 'scrapy']
-    if any(tool in user_agent for tool in automated_tools):
+    # 3. User Agent Analysis (0-25 points, verdicts cached per UA)
+    risk += rules.user_agent_risk(request_metadata.get('user_agent', ''))
+
+    # 4. IP reputation (0-60 points)
+    ip = request_metadata.get('ip')
+    ip_verdict = rules.ip_reputation.lookup(ip)
+    if ip_verdict == 'block':
+        risk += 35
+    if ip_verdict != 'allow' and reputation.login_rate.hit(ip) > reputation.LOGIN_BURST:
+        # Many logins from one address: credential stuffing (shared NAT
+        # addresses belong on the allowlist, see reputation.LOGIN_BURST)
         risk += 25
-    elif len(user_agent) < 10:
-        risk += 20
 
-    # 4. Account age check (if available)
+    # 5. Account age check (if available)
     account_age_days = user_data.get('account_age_days', 999)
     if account_age_days < 7:
         risk += 10
@@ -80,9 +80,20 @@ def calculate_final_risk(session_id, ml_risk_score):
     if not session:
         return 50  # Default if session not found
 
-    initial_risk = session.get('initial_risk', 0)
+    return combine_risk(session.get('initial_risk', 0), ml_risk_score)
+
+
+def combine_risk(initial_risk, ml_risk_score):
+    """
+    Weighted combination of initial and behavioral risk
+
+    Args:
+        initial_risk: int (0-100) from calculate_initial_risk
+        ml_risk_score: int (0-100) from the ML model
 
-    # Weighted combination
+    Returns:
+        int - final risk score 0-100
+    """
     # 60% initial risk, 40% behavioral (ML) risk
     final_risk = (initial_risk * 0.6) + (ml_risk_score * 0.4)
 
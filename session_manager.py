@@ -3,12 +3,45 @@ Session Manager
 Tracks user sessions and behavioral data
 """
 
+import os
 import time
 import uuid
-from datetime import datetime
 
-# In-memory session storage (for demo)
-sessions = {}
+from executors import run_io
+from session_store import MemorySessionStore, SQLiteSessionStore
+from session_telemetry import SessionTelemetry
+
+# Session lifetime and memory limits
+SESSION_IDLE_TTL = float(os.environ.get('HONEYGUARD_SESSION_IDLE_TTL', 30 * 60))
+SESSION_MAX_LIFETIME = float(os.environ.get('HONEYGUARD_SESSION_MAX_LIFETIME', 8 * 3600))
+MAX_SESSIONS = int(os.environ.get('HONEYGUARD_MAX_SESSIONS', 100_000))
+MAX_SESSION_BYTES = int(os.environ.get('HONEYGUARD_MAX_SESSION_BYTES', 256 * 1024 * 1024))
+
+# 'memory' (single process) or 'sqlite' (shared by uvicorn --workers N)
+SESSION_BACKEND = os.environ.get('HONEYGUARD_SESSION_BACKEND', 'memory')
+SESSION_DB_PATH = os.environ.get('HONEYGUARD_SESSION_DB', 'honeyguard_sessions.db')
+
+
+def _build_store():
+    if SESSION_BACKEND == 'sqlite':
+        return SQLiteSessionStore(
+            SESSION_DB_PATH,
+            idle_ttl=SESSION_IDLE_TTL,
+            max_lifetime=SESSION_MAX_LIFETIME,
+            max_sessions=MAX_SESSIONS
+        )
+    if SESSION_BACKEND != 'memory':
+        raise ValueError(f"Unknown session backend: {SESSION_BACKEND!r}")
+    return MemorySessionStore(
+        idle_ttl=SESSION_IDLE_TTL,
+        max_lifetime=SESSION_MAX_LIFETIME,
+        max_sessions=MAX_SESSIONS,
+        max_bytes=MAX_SESSION_BYTES
+    )
+
+
+# Session storage (SessionStore) - in-memory with expiry/LRU by default
+sessions = _build_store()
 
 
 def create_session(user_id):
@@ -22,15 +55,16 @@ def create_session(user_id):
         session_id: str - Unique session token
     """
     session_id = str(uuid.uuid4())
+    now = time.time()
 
-    sessions[session_id] = {
+    sessions.create(session_id, {
         'user_id': user_id,
-        'created_at': time.time(),
-        'requests': [],
-        'endpoints_accessed': [],
+        'created_at': now,
+        'last_seen': now,
+        'telemetry': SessionTelemetry(),
         'failed_attempts': 0,
         'initial_risk': 0
-    }
+    })
 
     return session_id
 
@@ -48,17 +82,31 @@ def get_session(session_id):
     return sessions.get(session_id)
 
 
-def record_request(session_id, endpoint):
+def update_session(session_id, **fields):
+    """
+    Store fields on a session (works for every backend)
+
+    Args:
+        session_id: str
+        **fields: values to set, e.g. initial_risk=40
+
+    Returns:
+        bool - False if the session does not exist
+    """
+    return sessions.update(session_id, **fields)
+
+
+def record_request(session_id, endpoint, session=None):
     """
     Record that a request was made
 
     Args:
         session_id: str
         endpoint: str - Which endpoint was accessed
+        session: dict - session already fetched for this request (optional,
+            avoids a second lookup)
     """
-    if session_id in sessions:
-        sessions[session_id]['requests'].append(time.time())
-        sessions[session_id]['endpoints_accessed'].append(endpoint)
+    sessions.record_request(session_id, time.time(), endpoint, session)
 
 
 def get_request_frequency(session_id):
@@ -71,19 +119,7 @@ def get_request_frequency(session_id):
     Returns:
         float - requests per minute
     """
-    if session_id not in sessions:
-        return 0
-
-    current_time = time.time()
-    session = sessions[session_id]
-
-    # Count requests in last 60 seconds
-    recent_requests = [
-        req for req in session['requests']
-        if current_time - req < 60
-    ]
-
-    return len(recent_requests)
+    return _session_feature(session_id, 'requests_per_minute')
 
 
 def get_session_age(session_id):
@@ -96,41 +132,101 @@ def get_session_age(session_id):
     Returns:
         float - age in minutes
     """
-    if session_id not in sessions:
-        return 0
+    return _session_feature(session_id, 'session_duration')
+
 
-    created_at = sessions[session_id]['created_at']
-    age_seconds = time.time() - created_at
-    return age_seconds / 60
+def _session_feature(session_id, name):
+    session = get_session(session_id)
+    return 0 if session is None else features_from_session(session)[name]
 
 
 def extract_behavioral_features(session_id):
     """
     Extract features for ML model
 
+    Constant time and memory regardless of session length.
+
     Args:
         session_id: str
 
     Returns:
         dict with behavioral features
     """
-    if session_id not in sessions:
+    session = sessions.get(session_id)
+    if session is None:
         return None
 
-    session = sessions[session_id]
+    return features_from_session(session)
+
+
+def features_from_session(session, now=None):
+    """
+    Behavioral features from an already-fetched session dict
+
+    Args:
+        session: dict from get_session()
+        now: float - Reference time (defaults to time.time())
 
-    # Calculate time gaps between requests
-    requests = session['requests']
-    if len(requests) > 1:
-        gaps = [requests[i] - requests[i-1] for i in range(1, len(requests))]
-        avg_gap = sum(gaps) / len(gaps) if gaps else 0
-    else:
-        avg_gap = 0
+    Returns:
+        dict with behavioral features
+    """
+    telemetry = session['telemetry']
+    if now is None:
+        now = time.time()
 
     return {
-        'requests_per_minute': get_request_frequency(session_id),
-        'avg_time_gap': avg_gap,
-        'session_duration': get_session_age(session_id),
-        'unique_endpoints': len(set(session['endpoints_accessed'])),
-        'total_requests': len(requests)
+        'requests_per_minute': telemetry.requests_per_minute(now),
+        'avg_time_gap': telemetry.avg_time_gap(),
+        'session_duration': (now - session['created_at']) / 60,
+        'unique_endpoints': telemetry.unique_endpoints,
+        'total_requests': telemetry.total_requests
     }
+
+
+def get_session_stats():
+    """
+    Session store size and eviction counters (for monitoring)
+
+    Returns:
+        dict
+    """
+    return sessions.stats()
+
+
+def start_session_sweeper(interval=5.0):
+    """
+    Start the background thread that expires idle/old sessions
+    """
+    sessions.start_sweeper(interval)
+
+
+def stop_session_sweeper():
+    sessions.stop_sweeper()
+
+
+# -------------------------------------------------------------------
+# Async API - offloads to the I/O pool only for blocking backends
+# -------------------------------------------------------------------
+
+async def _call(fn, *args):
+    if sessions.blocking:
+        return await run_io(fn, *args)
+    return fn(*args)
+
+
+async def create_session_async(user_id):
+    return await _call(create_session, user_id)
+
+
+async def get_session_async(session_id):
+    return await _call(get_session, session_id)
+
+
+async def update_session_async(session_id, **fields):
+    if sessions.blocking:
+        return await run_io(lambda: update_session(session_id, **fields))
+    return update_session(session_id, **fields)
+
+
+async def record_request_async(session_id, endpoint, session=None):
+    return await _call(record_request, session_id, endpoint, session)
@@ -0,0 +1,599 @@
+"""
+Session Store
+Session storage backends: bounded in-memory (default) and SQLite
+(shared across uvicorn worker processes)
+"""
+
+import heapq
+import json
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from session_telemetry import SessionTelemetry
+
+
+class SessionStore:
+    """
+    Interface every session backend implements
+
+    Sessions are plain dicts with at least 'created_at', 'last_seen' and
+    'telemetry' (a SessionTelemetry). Backends decide where they live.
+    """
+
+    # True when calls may block on I/O (async callers should offload)
+    blocking = False
+
+    def create(self, session_id, session):
+        raise NotImplementedError
+
+    def get(self, session_id, default=None):
+        raise NotImplementedError
+
+    def update(self, session_id, **fields):
+        raise NotImplementedError
+
+    def record_request(self, session_id, timestamp, endpoint, session=None):
+        """
+        Add a request to the session's telemetry
+
+        Args:
+            session_id: str
+            timestamp: float
+            endpoint: str
+            session: the dict from a get() in this request, if the caller
+                already has it - updated in place, saving a lookup
+        """
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
+    def start_sweeper(self, interval=5.0):
+        pass
+
+    def stop_sweeper(self):
+        pass
+
+    def __contains__(self, session_id):
+        return self.get(session_id) is not None
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Process-local session store
+
+    Sessions expire after `idle_ttl` seconds without a lookup or after
+    `max_lifetime` seconds in total. When the store grows past
+    `max_sessions` entries or `max_bytes` (approximate) the least
+    recently used sessions are evicted.
+
+    Expiry uses a min-heap of deadlines: idle sessions are refreshed
+    lazily when their heap entry comes up, so a sweep only ever touches
+    sessions that are actually due.
+    """
+
+    def __init__(self, idle_ttl=1800, max_lifetime=8 * 3600,
+                 max_sessions=100_000, max_bytes=None):
+        self.idle_ttl = idle_ttl
+        self.max_lifetime = max_lifetime
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+
+        self._sessions = OrderedDict()   # session_id -> session, LRU first
+        self._sizes = {}                 # session_id -> approx bytes
+        self._deadlines = []             # heap of (deadline, session_id)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.evictions = {'idle': 0, 'lifetime': 0, 'capacity': 0}
+
+        self._sweeper = None
+        self._stop = threading.Event()
+
+    # ---------------------------------------------------------------
+    # Mapping-style access (what session_manager uses)
+    # ---------------------------------------------------------------
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __getitem__(self, session_id):
+        session = self.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        return session
+
+    def __setitem__(self, session_id, session):
+        self.put(session_id, session)
+
+    def __delitem__(self, session_id):
+        with self._lock:
+            self._remove(session_id)
+
+    def get(self, session_id, default=None):
+        """
+        Look up a live session and mark it as recently used
+
+        Args:
+            session_id: str
+            default: returned when the session is missing or expired
+
+        Returns:
+            session data dict or default
+        """
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return default
+            reason = self._expired(session, now)
+            if reason:
+                self._remove(session_id)
+                self.evictions[reason] += 1
+                return default
+            session['last_seen'] = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def create(self, session_id, session):
+        self.put(session_id, session)
+
+    def update(self, session_id, **fields):
+        """
+        Set fields on a live session
+
+        The session is re-measured, so fields that grow it count against
+        `max_bytes` like they would on put().
+
+        Returns:
+            bool - False if the session does not exist
+        """
+        session = self.get(session_id)
+        if session is None:
+            return False
+        with self._lock:
+            session.update(fields)
+            if self._sessions.get(session_id) is session:
+                size = _approx_size(session_id, session)
+                self._bytes += size - self._sizes[session_id]
+                self._sizes[session_id] = size
+                self._evict_over_capacity()
+        return True
+
+    def record_request(self, session_id, timestamp, endpoint, session=None):
+        if session is None:
+            session = self.get(session_id)
+        if session is not None:
+            session['telemetry'].record(timestamp, endpoint)
+
+    def put(self, session_id, session):
+        """
+        Insert a session, evicting old ones if over capacity
+
+        Args:
+            session_id: str
+            session: dict - must contain 'created_at'
+        """
+        now = time.time()
+        session.setdefault('last_seen', now)
+        size = _approx_size(session_id, session)
+
+        with self._lock:
+            self._remove(session_id)
+            self._sessions[session_id] = session
+            self._sizes[session_id] = size
+            self._bytes += size
+            heapq.heappush(self._deadlines, (self._deadline(session), session_id))
+
+            self._sweep(now, limit=8)
+            self._evict_over_capacity()
+
+            # Evicted/deleted sessions leave stale heap entries behind;
+            # rebuild once they outnumber the live ones
+            if len(self._deadlines) > 2 * len(self._sessions) + 1024:
+                self._deadlines = [(self._deadline(s), sid)
+                                   for sid, s in self._sessions.items()]
+                heapq.heapify(self._deadlines)
+
+    # ---------------------------------------------------------------
+    # Expiry
+    # ---------------------------------------------------------------
+
+    def sweep(self, now=None):
+        """
+        Drop every session whose deadline has passed
+
+        Returns:
+            int - number of sessions removed
+        """
+        with self._lock:
+            return self._sweep(time.time() if now is None else now)
+
+    def start_sweeper(self, interval=5.0):
+        """
+        Run sweep() every `interval` seconds on a daemon thread
+        """
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop.clear()
+
+        def _run():
+            while not self._stop.wait(interval):
+                self.sweep()
+
+        self._sweeper = threading.Thread(
+            target=_run, name='session-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=1.0)
+            self._sweeper = None
+
+    def stats(self):
+        """
+        Store size and eviction counters for monitoring
+
+        Returns:
+            dict
+        """
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'approx_bytes': self._bytes,
+                'evicted_idle': self.evictions['idle'],
+                'evicted_lifetime': self.evictions['lifetime'],
+                'evicted_capacity': self.evictions['capacity'],
+            }
+
+    # ---------------------------------------------------------------
+    # Internals (caller holds the lock)
+    # ---------------------------------------------------------------
+
+    def _deadline(self, session):
+        return min(session['last_seen'] + self.idle_ttl,
+                   session['created_at'] + self.max_lifetime)
+
+    def _expired(self, session, now):
+        if now >= session['created_at'] + self.max_lifetime:
+            return 'lifetime'
+        if now >= session['last_seen'] + self.idle_ttl:
+            return 'idle'
+        return None
+
+    def _over_capacity(self):
+        if self.max_sessions is not None and len(self._sessions) > self.max_sessions:
+            return True
+        return self.max_bytes is not None and self._bytes > self.max_bytes
+
+    def _evict_over_capacity(self):
+        while self._sessions and self._over_capacity():
+            victim, _ = self._sessions.popitem(last=False)
+            self._bytes -= self._sizes.pop(victim)
+            self.evictions['capacity'] += 1
+
+    def _remove(self, session_id):
+        if self._sessions.pop(session_id, None) is not None:
+            self._bytes -= self._sizes.pop(session_id)
+
+    def _sweep(self, now, limit=None):
+        removed = 0
+        heap = self._deadlines
+        while heap and heap[0][0] <= now:
+            if limit is not None and removed >= limit:
+                break
+            _, session_id = heapq.heappop(heap)
+            session = self._sessions.get(session_id)
+            if session is None:
+                continue  # already evicted; stale heap entry
+            reason = self._expired(session, now)
+            if reason:
+                self._remove(session_id)
+                self.evictions[reason] += 1
+                removed += 1
+            else:
+                # Touched since it was queued - requeue at its new deadline
+                heapq.heappush(heap, (self._deadline(session), session_id))
+        return removed
+
+
+def _approx_size(session_id, session):
+    size = sys.getsizeof(session_id) + sys.getsizeof(session)
+    for value in session.values():
+        nbytes = getattr(value, 'nbytes', None)
+        size += nbytes() if callable(nbytes) else sys.getsizeof(value)
+    return size
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store in a WAL-mode SQLite file shared by all workers
+
+    Creation and field updates are written through so a session is
+    visible to every worker as soon as /login returns. Request telemetry
+    and lookups (which refresh last_seen, as in MemorySessionStore) are
+    buffered per process and flushed in one transaction every
+    `batch_size` requests or `flush_interval` seconds; a worker's own
+    unflushed requests and lookups are applied on top of the stored row
+    when it reads a session, and stay buffered until their flush commits.
+
+    Expiry is an indexed range delete on `expires_at`; capacity is
+    enforced by dropping the least recently seen rows.
+    """
+
+    blocking = True
+
+    def __init__(self, path, idle_ttl=1800, max_lifetime=8 * 3600,
+                 max_sessions=100_000, batch_size=64, flush_interval=0.05):
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.max_lifetime = max_lifetime
+        self.max_sessions = max_sessions
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._local = threading.local()
+        self._pending = {}            # session_id -> [(timestamp, endpoint)]
+        self._pending_count = 0
+        self._touched = {}            # session_id -> last get() time
+        self._flushes = 0             # committed flushes, see get()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self.evictions = {'expired': 0, 'capacity': 0}
+
+        self._sweeper = None
+        self._stop = threading.Event()
+
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                last_seen  REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                data       TEXT NOT NULL,
+                telemetry  BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at);
+            CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen);
+        """)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _expires_at(self, created_at, last_seen):
+        return min(last_seen + self.idle_ttl, created_at + self.max_lifetime)
+
+    # ---------------------------------------------------------------
+    # SessionStore API
+    # ---------------------------------------------------------------
+
+    def create(self, session_id, session):
+        created_at = session['created_at']
+        last_seen = session.setdefault('last_seen', created_at)
+        self._conn().execute(
+            'INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?)',
+            (session_id, created_at, last_seen,
+             self._expires_at(created_at, last_seen),
+             json.dumps(_plain_fields(session)),
+             session['telemetry'].to_bytes()))
+
+    def get(self, session_id, default=None):
+        """
+        Look up a live session and mark it as recently used (the new
+        last_seen is written with the next flush)
+        """
+        conn = self._conn()
+        while True:
+            with self._lock:
+                flushes = self._flushes
+                pending = list(self._pending.get(session_id, ()))
+                touched = self._touched.get(session_id, 0.0)
+            row = conn.execute(
+                'SELECT created_at, last_seen, expires_at, data, telemetry '
+                'FROM sessions WHERE session_id = ?', (session_id,)).fetchone()
+            with self._lock:
+                # A flush committed in between: the row may already hold
+                # what was read as pending
+                if self._flushes != flushes:
+                    continue
+                if row is None:
+                    return default
+                created_at, last_seen, expires_at, data, blob = row
+                if pending or touched > last_seen:
+                    last_seen = max(last_seen, touched, pending[-1][0] if pending else 0.0)
+                    expires_at = self._expires_at(created_at, last_seen)
+                now = time.time()
+                if expires_at <= now:
+                    return default
+                self._touched[session_id] = now
+                break
+
+        telemetry = SessionTelemetry.from_bytes(blob)
+        for timestamp, endpoint in pending:
+            telemetry.record(timestamp, endpoint)
+
+        session = json.loads(data)
+        session['created_at'] = created_at
+        session['last_seen'] = now
+        session['telemetry'] = telemetry
+        return session
+
+    def update(self, session_id, **fields):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT data FROM sessions WHERE session_id = ?',
+                               (session_id,)).fetchone()
+            if row is not None:
+                data = json.loads(row[0])
+                data.update(fields)
+                conn.execute('UPDATE sessions SET data = ? WHERE session_id = ?',
+                             (json.dumps(data), session_id))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return row is not None
+
+    def record_request(self, session_id, timestamp, endpoint, session=None):
+        if session is not None:
+            # Keep the caller's copy consistent with what will be flushed
+            session['telemetry'].record(timestamp, endpoint)
+            session['last_seen'] = max(session['last_seen'], timestamp)
+        with self._lock:
+            self._pending.setdefault(session_id, []).append((timestamp, endpoint))
+            self._pending_count += 1
+            due = (self._pending_count >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush(wait=False)
+
+    def flush(self, wait=True):
+        """
+        Write buffered request telemetry and lookups in a single
+        transaction
+
+        Entries stay buffered (and visible to get()) until the commit
+        succeeds; they are dropped in the same step, under the lock, so a
+        reader sees each request exactly once.
+
+        Args:
+            wait: bool - if another thread is flushing, wait for it and
+                flush again (False: leave the buffer to that flush)
+        """
+        if not self._flush_lock.acquire(blocking=wait):
+            return
+        try:
+            with self._lock:
+                pending = {session_id: list(events)
+                           for session_id, events in self._pending.items()}
+                touched = dict(self._touched)
+                self._last_flush = time.monotonic()
+            if not pending and not touched:
+                return
+
+            conn = self._conn()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for session_id in pending.keys() | touched.keys():
+                    row = conn.execute(
+                        'SELECT created_at, last_seen, telemetry FROM sessions '
+                        'WHERE session_id = ?', (session_id,)).fetchone()
+                    if row is None:
+                        continue
+                    created_at, last_seen, blob = row
+                    events = pending.get(session_id)
+                    last_seen = max(last_seen, touched.get(session_id, 0.0),
+                                    events[-1][0] if events else 0.0)
+                    if events:
+                        telemetry = SessionTelemetry.from_bytes(blob)
+                        for timestamp, endpoint in events:
+                            telemetry.record(timestamp, endpoint)
+                        blob = telemetry.to_bytes()
+                    conn.execute(
+                        'UPDATE sessions SET last_seen = ?, expires_at = ?, telemetry = ? '
+                        'WHERE session_id = ?',
+                        (last_seen, self._expires_at(created_at, last_seen),
+                         blob, session_id))
+                with self._lock:
+                    conn.execute('COMMIT')
+                    self._forget(pending, touched)
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise
+        finally:
+            self._flush_lock.release()
+
+    def _forget(self, pending, touched):
+        # Drop flushed entries, keeping whatever arrived during the flush
+        # (caller holds the lock)
+        for session_id, events in pending.items():
+            remaining = self._pending.get(session_id, [])[len(events):]
+            if remaining:
+                self._pending[session_id] = remaining
+            else:
+                self._pending.pop(session_id, None)
+            self._pending_count -= len(events)
+        for session_id, timestamp in touched.items():
+            if self._touched.get(session_id) == timestamp:
+                del self._touched[session_id]
+        self._flushes += 1
+
+    def sweep(self, now=None):
+        """
+        Delete expired sessions and trim the store to max_sessions
+
+        Returns:
+            int - number of sessions removed
+        """
+        now = time.time() if now is None else now
+        conn = self._conn()
+        expired = conn.execute('DELETE FROM sessions WHERE expires_at <= ?',
+                               (now,)).rowcount
+        over = 0
+        if self.max_sessions is not None:
+            count = conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+            if count > self.max_sessions:
+                over = conn.execute(
+                    'DELETE FROM sessions WHERE session_id IN ('
+                    'SELECT session_id FROM sessions ORDER BY last_seen LIMIT ?)',
+                    (count - self.max_sessions,)).rowcount
+        self.evictions['expired'] += expired
+        self.evictions['capacity'] += over
+        return expired + over
+
+    def start_sweeper(self, interval=5.0):
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop.clear()
+
+        def _run():
+            # Flush on a short tick so idle workers don't sit on telemetry
+            ticks = max(1, int(interval / self.flush_interval))
+            tick = 0
+            while not self._stop.wait(self.flush_interval):
+                self.flush()
+                tick += 1
+                if tick % ticks == 0:
+                    self.sweep()
+
+        self._sweeper = threading.Thread(
+            target=_run, name='session-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=1.0)
+            self._sweeper = None
+        self.flush()
+
+    def stats(self):
+        conn = self._conn()
+        count = conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        return {
+            'sessions': count,
+            'approx_bytes': page_count * page_size,
+            'evicted_expired': self.evictions['expired'],
+            'evicted_capacity': self.evictions['capacity'],
+            'pending_requests': self._pending_count,
+        }
+
+
+def _plain_fields(session):
+    return {key: value for key, value in session.items()
+            if key not in ('created_at', 'last_seen', 'telemetry')}
@@ -0,0 +1,150 @@
+"""
+Session Telemetry
+Fixed-size per-session request history used for behavioral features
+"""
+
+import struct
+import sys
+import time
+from array import array
+
+# Telemetry limits - every session costs the same no matter how long it lives
+TELEMETRY_RING_SIZE = 256       # most recent request timestamps kept
+REQUEST_WINDOW_SECONDS = 60     # window used for requests_per_minute
+MAX_TRACKED_ENDPOINTS = 64      # distinct endpoints remembered per session
+
+# total_requests, first_request, last_request, head, size, window
+_HEADER = struct.Struct('<qddiii')
+
+
+class SessionTelemetry:
+    """
+    Compact, fixed-size request telemetry for one session
+
+    Timestamps live in an array-backed ring buffer; everything the ML
+    features need (mean gap, unique endpoints, requests in the last
+    minute) is maintained incrementally so reads are O(1).
+
+    requests_per_minute saturates at TELEMETRY_RING_SIZE, far above any
+    threshold used by the risk model.
+    """
+
+    __slots__ = (
+        'total_requests', 'first_request', 'last_request',
+        '_timestamps', '_head', '_size', '_window', '_endpoints'
+    )
+
+    def __init__(self):
+        self.total_requests = 0
+        self.first_request = 0.0
+        self.last_request = 0.0
+        self._timestamps = array('d', bytes(8 * TELEMETRY_RING_SIZE))
+        self._head = 0      # next slot to write
+        self._size = 0      # filled slots
+        self._window = 0    # newest slots inside the request window
+        self._endpoints = set()
+
+    def record(self, timestamp, endpoint):
+        """
+        Add one request to the telemetry
+
+        Args:
+            timestamp: float - time.time() of the request
+            endpoint: str - Which endpoint was accessed
+        """
+        if self.total_requests == 0:
+            self.first_request = timestamp
+        self.total_requests += 1
+        self.last_request = timestamp
+
+        self._timestamps[self._head] = timestamp
+        self._head = (self._head + 1) % TELEMETRY_RING_SIZE
+        if self._size < TELEMETRY_RING_SIZE:
+            self._size += 1
+        if self._window < self._size:
+            self._window += 1
+        self._expire(timestamp)
+
+        if (len(self._endpoints) < MAX_TRACKED_ENDPOINTS
+                and endpoint not in self._endpoints):
+            self._endpoints.add(endpoint)
+
+    def _expire(self, now):
+        # Oldest in-window slot sits `_window` places behind the head;
+        # slots only ever leave the window, so this is amortized O(1)
+        cutoff = now - REQUEST_WINDOW_SECONDS
+        while self._window:
+            oldest = self._timestamps[(self._head - self._window) % TELEMETRY_RING_SIZE]
+            if oldest > cutoff:
+                break
+            self._window -= 1
+
+    def requests_per_minute(self, now=None):
+        """
+        Number of requests in the last REQUEST_WINDOW_SECONDS
+
+        Args:
+            now: float - Reference time (defaults to time.time())
+
+        Returns:
+            int - requests in the window
+        """
+        self._expire(time.time() if now is None else now)
+        return self._window
+
+    def avg_time_gap(self):
+        """
+        Mean gap between consecutive requests, in seconds
+
+        The gaps telescope, so their sum is just last - first.
+        """
+        if self.total_requests < 2:
+            return 0
+        return (self.last_request - self.first_request) / (self.total_requests - 1)
+
+    def nbytes(self):
+        """
+        Approximate memory footprint in bytes (constant per session)
+        """
+        return (sys.getsizeof(self) + sys.getsizeof(self._timestamps)
+                + sys.getsizeof(self._endpoints))
+
+    @property
+    def unique_endpoints(self):
+        return len(self._endpoints)
+
+    def to_bytes(self):
+        """
+        Pack the telemetry into a compact blob (for shared backends)
+
+        Returns:
+            bytes
+        """
+        header = _HEADER.pack(
+            self.total_requests, self.first_request, self.last_request,
+            self._head, self._size, self._window)
+        endpoints = '\n'.join(sorted(self._endpoints)).encode('utf-8')
+        return header + self._timestamps.tobytes() + endpoints
+
+    @classmethod
+    def from_bytes(cls, blob):
+        """
+        Rebuild telemetry packed by to_bytes()
+
+        Args:
+            blob: bytes
+
+        Returns:
+            SessionTelemetry
+        """
+        telemetry = cls()
+        (telemetry.total_requests, telemetry.first_request,
+         telemetry.last_request, telemetry._head, telemetry._size,
+         telemetry._window) = _HEADER.unpack_from(blob)
+        ring_end = _HEADER.size + 8 * TELEMETRY_RING_SIZE
+        telemetry._timestamps = array('d')
+        telemetry._timestamps.frombytes(blob[_HEADER.size:ring_end])
+        endpoints = blob[ring_end:].decode('utf-8')
+        if endpoints:
+            telemetry._endpoints = set(endpoints.split('\n'))
+        return telemetry
@@ -0,0 +1,300 @@
+"""
+Session Traces
+Compact columnar record of sessions for offline replay (see replay.py)
+
+A trace file holds one row per session and one per request, column by
+column, in the same flat 64-byte-aligned layout as mapped models
+(isolation_forest.save_mapped):
+
+    sessions   created_at      float64   login time (epoch seconds)
+               customer_id     int32
+               initial_risk    uint8     calculate_initial_risk at login
+               user_agent      uint32    index into the user agent table
+               recorded_tier   int8      tier last served live (-1 unknown)
+               label           int8      ground truth: -1 unknown,
+                                         0 benign, 1 attacker
+               request_start   int64     first request row of each session
+                                         (n_sessions + 1 entries)
+    requests   offset          float32   seconds since created_at
+               endpoint        uint16    index into the endpoint table
+
+Requests are grouped by session and sorted by time within it, so a
+range of sessions maps to one contiguous range of request rows. The
+endpoint and user agent tables follow the arrays as JSON. Readers map
+the file read-only and take views, so chunks cost no copies.
+
+Traces are built from the audit log (`decision` and `login` records,
+audit_log.py), which is where live requests are already recorded:
+
+    python session_traces.py logs/decisions-*.jsonl* --out traces/ --shards 8
+"""
+
+import argparse
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+TRACE_MAGIC = b'HGTR'
+TRACE_VERSION = 1
+TRACE_ALIGN = 64
+# magic, version, n_sessions, n_requests, table bytes
+_TRACE_HEADER = struct.Struct('<4sIQQQ')
+# (name, dtype, length key) in file order
+_TRACE_ARRAYS = (
+    ('created_at', np.float64, 'sessions'),
+    ('customer_id', np.int32, 'sessions'),
+    ('initial_risk', np.uint8, 'sessions'),
+    ('user_agent', np.uint32, 'sessions'),
+    ('recorded_tier', np.int8, 'sessions'),
+    ('label', np.int8, 'sessions'),
+    ('request_start', np.int64, 'starts'),
+    ('offset', np.float32, 'requests'),
+    ('endpoint', np.uint16, 'requests'),
+)
+SESSION_COLUMNS = ('created_at', 'customer_id', 'initial_risk', 'user_agent',
+                   'recorded_tier', 'label')
+
+TIERS = ('real', 'randomized', 'honey')
+LABELS = {'benign': 0, 'attacker': 1}
+
+
+def write_trace(path, columns, endpoints, user_agents=('',)):
+    """
+    Write one trace file, atomically
+
+    Args:
+        path: str
+        columns: dict of array-likes named as in _TRACE_ARRAYS;
+            requests must already be grouped by session and sorted by
+            offset within each
+        endpoints: sequence of str - values of the endpoint column
+        user_agents: sequence of str - values of the user_agent column
+    """
+    n_sessions = len(columns['created_at'])
+    n_requests = len(columns['offset'])
+    starts = np.asarray(columns['request_start'])
+    if len(starts) != n_sessions + 1 or starts[-1] != n_requests:
+        raise ValueError('request_start must have n_sessions + 1 entries ending at n_requests')
+    tables = json.dumps({'endpoints': list(endpoints),
+                         'user_agents': list(user_agents)}).encode('utf-8')
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(_TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, n_sessions, n_requests,
+                                   len(tables)))
+        for name, dtype, _ in _TRACE_ARRAYS:
+            f.write(b'\0' * (-f.tell() % TRACE_ALIGN))
+            f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+        f.write(tables)
+    os.replace(tmp_path, path)
+
+
+class TraceChunk:
+    """
+    A contiguous range of sessions and their requests (array views)
+
+    request_start is rebased so it indexes this chunk's request arrays.
+    """
+
+    __slots__ = SESSION_COLUMNS + ('request_start', 'offset', 'endpoint')
+
+    def __init__(self, trace, lo, hi):
+        for name in SESSION_COLUMNS:
+            setattr(self, name, getattr(trace, name)[lo:hi])
+        starts = trace.request_start[lo:hi + 1]
+        self.request_start = starts - starts[0]
+        self.offset = trace.offset[starts[0]:starts[-1]]
+        self.endpoint = trace.endpoint[starts[0]:starts[-1]]
+
+    def __len__(self):
+        return len(self.created_at)
+
+
+class TraceFile:
+    """
+    A trace file mapped read-only; columns are np.memmap views
+    """
+
+    def __init__(self, path):
+        self.path = path
+        buf = np.memmap(path, dtype=np.uint8, mode='r')
+        magic, version, n_sessions, n_requests, table_bytes = _TRACE_HEADER.unpack_from(buf)
+        if magic != TRACE_MAGIC or version != TRACE_VERSION:
+            raise ValueError(f"{path} is not a version {TRACE_VERSION} trace file")
+
+        lengths = {'sessions': n_sessions, 'starts': n_sessions + 1, 'requests': n_requests}
+        offset = _TRACE_HEADER.size
+        for name, dtype, length in _TRACE_ARRAYS:
+            offset += -offset % TRACE_ALIGN
+            nbytes = lengths[length] * np.dtype(dtype).itemsize
+            setattr(self, name, buf[offset:offset + nbytes].view(dtype))
+            offset += nbytes
+        tables = json.loads(bytes(buf[offset:offset + table_bytes]).decode('utf-8'))
+        self.endpoints = tables['endpoints']
+        self.user_agents = tables['user_agents']
+        self.n_sessions = n_sessions
+        self.n_requests = n_requests
+
+    def __len__(self):
+        return self.n_sessions
+
+    def chunks(self, max_requests, lo=0, hi=None):
+        """
+        Split sessions [lo, hi) into chunks of at most `max_requests`
+        request rows (a longer single session gets a chunk of its own)
+
+        Yields:
+            TraceChunk
+        """
+        hi = self.n_sessions if hi is None else hi
+        starts = self.request_start
+        while lo < hi:
+            end = int(np.searchsorted(starts, starts[lo] + max_requests, side='right')) - 1
+            end = min(hi, max(end, lo + 1))
+            yield TraceChunk(self, lo, end)
+            lo = end
+
+
+# -------------------------------------------------------------------
+# Building traces from the audit log
+# -------------------------------------------------------------------
+
+class _Session:
+    __slots__ = ('created_at', 'customer_id', 'initial_risk', 'user_agent',
+                 'recorded_tier', 'requests')
+
+    def __init__(self):
+        self.created_at = None
+        self.customer_id = 0
+        self.initial_risk = 0
+        self.user_agent = ''
+        self.recorded_tier = -1
+        self.requests = []      # (ts, endpoint)
+
+
+def read_audit_sessions(paths):
+    """
+    Sessions from audit log files (any order, e.g. rotated backups)
+
+    Returns:
+        dict - session_id -> _Session
+    """
+    sessions = {}
+    tier_codes = {tier: code for code, tier in enumerate(TIERS)}
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                event = record.get('event')
+                if event not in ('login', 'decision'):
+                    continue
+                session = sessions.get(record['session_id'])
+                if session is None:
+                    session = sessions[record['session_id']] = _Session()
+                session.customer_id = record.get('customer_id') or session.customer_id
+                session.initial_risk = record.get('initial_risk', session.initial_risk)
+                if event == 'login':
+                    session.created_at = record['ts']
+                    session.user_agent = record.get('user_agent', '')
+                else:
+                    session.requests.append((record['ts'], record['endpoint']))
+                    session.recorded_tier = tier_codes.get(record.get('data_source'), -1)
+    return sessions
+
+
+def read_labels(path):
+    """
+    Ground truth from a CSV of session_id,label (label 'benign'/'attacker'
+    or 0/1; a header row is skipped)
+
+    Returns:
+        dict - session_id -> 0 or 1
+    """
+    labels = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            session_id, _, label = line.strip().partition(',')
+            label = label.strip().lower()
+            if label in LABELS:
+                labels[session_id] = LABELS[label]
+            elif label in ('0', '1'):
+                labels[session_id] = int(label)
+    return labels
+
+
+def write_sessions(path, sessions, labels=None):
+    """
+    Write (session_id, _Session) pairs as one trace file
+    """
+    labels = labels or {}
+    endpoints = {}
+    user_agents = {'': 0}
+    columns = {name: [] for name in SESSION_COLUMNS}
+    request_start = [0]
+    offsets = []
+    endpoint_codes = []
+    for session_id, session in sessions:
+        requests = sorted(session.requests)
+        created_at = session.created_at
+        if created_at is None:
+            created_at = requests[0][0] if requests else 0.0
+        columns['created_at'].append(created_at)
+        columns['customer_id'].append(session.customer_id)
+        columns['initial_risk'].append(min(max(int(session.initial_risk), 0), 100))
+        columns['user_agent'].append(user_agents.setdefault(session.user_agent, len(user_agents)))
+        columns['recorded_tier'].append(session.recorded_tier)
+        columns['label'].append(labels.get(session_id, -1))
+        for ts, endpoint in requests:
+            offsets.append(max(0.0, ts - created_at))
+            endpoint_codes.append(endpoints.setdefault(endpoint, len(endpoints)))
+        request_start.append(len(offsets))
+    if len(endpoints) > np.iinfo(np.uint16).max:
+        raise ValueError('too many distinct endpoints for one trace file')
+
+    columns.update(request_start=request_start, offset=offsets, endpoint=endpoint_codes)
+    write_trace(path, columns, list(endpoints), list(user_agents))
+
+
+def convert_audit_log(paths, out_dir, shards=1, labels=None):
+    """
+    Build sharded trace files from audit logs
+
+    Sessions are assigned to shards by a hash of their id, so every
+    shard is a similar, independent slice for replay workers.
+
+    Returns:
+        list of str - trace files written
+    """
+    sessions = read_audit_sessions(paths)
+    by_shard = [[] for _ in range(shards)]
+    for session_id, session in sessions.items():
+        by_shard[zlib.crc32(session_id.encode('utf-8')) % shards].append((session_id, session))
+
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for shard, shard_sessions in enumerate(by_shard):
+        path = os.path.join(out_dir, f'shard-{shard:04d}.hgt')
+        write_sessions(path, shard_sessions, labels)
+        written.append(path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build session trace files from audit logs')
+    parser.add_argument('audit_logs', nargs='+', help='decisions-<pid>.jsonl files (with backups)')
+    parser.add_argument('--out', required=True, help='directory for shard-NNNN.hgt files')
+    parser.add_argument('--shards', type=int, default=1)
+    parser.add_argument('--labels', help='CSV of session_id,label (benign/attacker)')
+    args = parser.parse_args()
+
+    labels = read_labels(args.labels) if args.labels else None
+    for path in convert_audit_log(args.audit_logs, args.out, args.shards, labels):
+        trace = TraceFile(path)
+        print(f"{path}: {trace.n_sessions} sessions, {trace.n_requests} requests")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Streaming Responses
+Incremental JSON encoders for result sets too large to build in memory
+
+Rows are pulled from a generator and encoded in fixed-size chunks, so
+memory stays flat and the first bytes go out as soon as the first
+chunk is ready. The encoders are plain (sync) generators: Starlette's
+StreamingResponse iterates them on its threadpool, keeping row
+synthesis and encoding off the event loop.
+"""
+
+import os
+
+from encoding import dumps
+
+
+# Rows encoded per chunk written to the socket
+STREAM_CHUNK_ROWS = int(os.environ.get('HONEYGUARD_STREAM_CHUNK_ROWS', 500))
+
+# Upper bound on rows per streamed request
+MAX_STREAM_ROWS = int(os.environ.get('HONEYGUARD_MAX_STREAM_ROWS', 100_000))
+
+# ?stream=<format> -> media type
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json'
+}
+
+
+def _chunks(rows, chunk_rows):
+    # Encoded rows, grouped into lists of at most chunk_rows
+    batch = []
+    for row in rows:
+        batch.append(dumps(row))
+        if len(batch) >= chunk_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def encode_ndjson(rows, trailer, chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    Encode rows as newline-delimited JSON, one object per line
+
+    Args:
+        rows: iterable of dicts
+        trailer: callable(count) -> dict, written as the last line
+            (count, cursor, risk envelope)
+        chunk_rows: int - Rows per yielded chunk
+
+    Yields:
+        bytes
+    """
+    count = 0
+    for batch in _chunks(rows, chunk_rows):
+        count += len(batch)
+        batch.append(b'')
+        yield b'\n'.join(batch)
+    yield dumps(trailer(count)) + b'\n'
+
+
+def encode_json(rows, key, trailer, chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    Encode rows as one JSON object, `{key: [rows...], **trailer(count)}`,
+    written incrementally - the same document a non-streaming response
+    would return
+
+    Args:
+        rows: iterable of dicts
+        key: str - Name of the array field
+        trailer: callable(count) -> dict, fields after the array
+        chunk_rows: int - Rows per yielded chunk
+
+    Yields:
+        bytes
+    """
+    count = 0
+    yield b'{' + dumps(key) + b':['
+    for batch in _chunks(rows, chunk_rows):
+        prefix = b',' if count else b''
+        count += len(batch)
+        yield prefix + b','.join(batch)
+
+    tail = dumps(trailer(count))
+    # Splice the trailer's fields in after the array
+    yield b']' + (b',' + tail[1:] if tail != b'{}' else b'}')
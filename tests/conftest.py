@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# Settings are read at import time, so point state away from the
+# working tree before any app module is imported
+_tmp = tempfile.mkdtemp(prefix='honeyguard-tests-')
+os.environ.setdefault('HONEYGUARD_AUDIT_LEVEL', 'off')
+os.environ.setdefault('HONEYGUARD_DATA_DB', os.path.join(_tmp, 'data.db'))
+os.environ.setdefault('HONEYGUARD_SESSION_DB', os.path.join(_tmp, 'sessions.db'))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,23 @@
+import os
+
+import audit_log
+
+
+def test_audit_path_is_per_process(monkeypatch):
+    monkeypatch.setattr(audit_log, 'AUDIT_PATH', 'logs/decisions-{pid}.jsonl')
+    assert audit_log.audit_path() == f'logs/decisions-{os.getpid()}.jsonl'
+    assert audit_log.audit_path(pid=7) != audit_log.audit_path(pid=8)
+
+
+def test_rotation_counts_encoded_bytes(tmp_path):
+    path = str(tmp_path / 'decisions.jsonl')
+    writer = audit_log._RotatingWriter(path, max_bytes=100, backups=2)
+    line = ('{"customer": "%s"}\n' % ('é' * 20)).encode('utf-8')    # 20 chars, 40 bytes
+    try:
+        for _ in range(4):
+            writer.write(line)
+    finally:
+        writer.close()
+    assert os.path.getsize(path) <= 100
+    assert os.path.getsize(path + '.1') <= 100
+    assert os.path.exists(path + '.2')
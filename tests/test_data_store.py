@@ -0,0 +1,36 @@
+import pytest
+
+from data_store import DataStore, _coerce
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('1001', 1001),
+    ('-42', -42),
+    ('125000.50', 125000.5),
+    ('0', 0),
+    ('true', True),
+    ('0101', '0101'),
+    ('94102-0001', '94102-0001'),
+    ('+15550101', '+15550101'),
+    ('1e5', '1e5'),
+    ('nan', 'nan'),
+    (' 7', ' 7'),
+    ('', ''),
+])
+def test_coerce_only_round_trips(value, expected):
+    assert _coerce(value) == expected
+    assert type(_coerce(value)) is type(expected)
+
+
+def test_reload_by_another_process_reaches_cache(tmp_path):
+    path = str(tmp_path / 'data.db')
+    loader = DataStore(path)
+    loader.load_customers([{'customer_id': 1001, 'name': 'Before'}])
+
+    worker = DataStore(path, check_interval=0)
+    assert worker.get_customer(1001)['name'] == 'Before'
+    assert worker.is_cached(1001)
+
+    loader.load_customers([{'customer_id': 1001, 'name': 'After'}])
+    assert not worker.is_cached(1001)
+    assert worker.get_customer(1001)['name'] == 'After'
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+import decision_engine
+import ml_batcher
+import rate_limiter
+import session_manager
+from decision_engine import DecisionCache, _CachedScore
+
+FEATURES = {'requests_per_minute': 4, 'avg_time_gap': 2.0, 'session_duration': 1.0,
+            'unique_endpoints': 2, 'total_requests': 10}
+
+
+def _score(features, now):
+    return _CachedScore(dict(features), 10, 20, 'real', now)
+
+
+def test_cache_hit_while_features_stay_close():
+    cache = DecisionCache()
+    cache.store('s', _score(FEATURES, 100.0))
+    close = dict(FEATURES, requests_per_minute=5, avg_time_gap=2.2, total_requests=14)
+    assert cache.lookup('s', close, 101.0) is not None
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+@pytest.mark.parametrize('name', sorted(decision_engine.RESCORE_THRESHOLDS))
+def test_cache_miss_when_a_feature_moves(name):
+    cache = DecisionCache()
+    cache.store('s', _score(FEATURES, 100.0))
+    moved = dict(FEATURES)
+    moved[name] += decision_engine.RESCORE_THRESHOLDS[name]
+    assert cache.lookup('s', moved, 101.0) is None
+    assert cache.misses == 1
+
+
+def test_cache_entries_expire():
+    cache = DecisionCache()
+    cache.store('s', _score(FEATURES, 100.0))
+    assert cache.lookup('s', FEATURES, 100.0 + decision_engine.DECISION_MAX_AGE) is None
+    # ... but a throttled honey session may still reuse it
+    assert cache.peek('s') is not None
+    assert cache.lookup('unknown', FEATURES, 100.0) is None
+
+
+def test_cache_evicts_least_recently_used():
+    cache = DecisionCache(max_size=2)
+    cache.store('a', _score(FEATURES, 100.0))
+    cache.store('b', _score(FEATURES, 100.0))
+    assert cache.lookup('a', FEATURES, 100.0) is not None    # 'b' is now oldest
+    cache.store('c', _score(FEATURES, 100.0))
+    assert cache.peek('b') is None
+    assert cache.peek('a') is not None and cache.peek('c') is not None
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """
+    decide() with a fresh cache, no rate limiting and a controllable ML
+    score; yields a dict whose 'risk' is the next ML score, counting calls
+    """
+    monkeypatch.setattr(decision_engine, 'decision_cache', DecisionCache())
+    monkeypatch.setattr(rate_limiter, 'RATE_LIMIT_ENABLED', False)
+    model = {'risk': 0, 'calls': 0}
+
+    async def score(features):
+        model['calls'] += 1
+        return model['risk']
+
+    monkeypatch.setattr(ml_batcher, 'score', score)
+    return model
+
+
+def _session(initial_risk):
+    session_id = session_manager.create_session('1001')
+    session_manager.update_session(session_id, initial_risk=initial_risk, customer_id=1001)
+    return session_id
+
+
+def _decide(session_id):
+    return asyncio.run(decision_engine.decide(session_id, '/account'))
+
+
+def test_decide_reuses_cached_score(engine):
+    session_id = _session(0)
+    first = _decide(session_id)
+    second = _decide(session_id)
+    assert first.rescored and not second.rescored
+    assert engine['calls'] == 1
+    assert second.final_risk == first.final_risk
+
+
+def test_honey_stays_honey(engine, monkeypatch):
+    monkeypatch.setattr(decision_engine, 'STICKY_HONEY', True)
+    session_id = _session(100)
+    engine['risk'] = 100
+    assert _decide(session_id).data_source == 'honey'
+    assert session_manager.get_session(session_id)['sticky_honey']
+
+    # Behaviour looks clean now and the cache is gone: still honey, unscored
+    engine['risk'] = 0
+    decision_engine.decision_cache = DecisionCache()
+    for _ in range(3):
+        decision = _decide(session_id)
+        assert decision.data_source == 'honey' and not decision.rescored
+    assert engine['calls'] == 1
+
+
+def test_without_sticky_honey_sessions_are_rescored(engine, monkeypatch):
+    monkeypatch.setattr(decision_engine, 'STICKY_HONEY', False)
+    session_id = _session(100)
+    engine['risk'] = 100
+    assert _decide(session_id).data_source == 'honey'
+    engine['risk'] = 0
+    decision_engine.decision_cache = DecisionCache()
+    assert _decide(session_id).data_source == 'randomized'
+    assert engine['calls'] == 2
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+import heuristics
+from heuristics import DomainSet, KeywordMatcher
+
+# Regex metacharacters mixed in with letters, short enough that keywords
+# share prefixes and overlap in the texts
+ALPHABET = 'abc.*+?()[]{}|^$\\-# '
+
+
+def _words(rng, n, low, high, alphabet=ALPHABET):
+    return [''.join(rng.choices(alphabet, k=rng.randint(low, high))) for _ in range(n)]
+
+
+def _check(matcher, keywords, texts):
+    for text in texts:
+        found = matcher.search(text)
+        assert (found is not None) == any(keyword in text for keyword in keywords), text
+        if found is not None:
+            assert found in keywords and found in text
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_keywords_match_naive_search(seed):
+    rng = random.Random(seed)
+    keywords = _words(rng, 60, 1, 5)
+    texts = _words(rng, 500, 0, 12) + keywords + [k + k for k in keywords]
+    _check(KeywordMatcher(keywords), keywords, texts)
+
+
+def test_overlapping_prefixes():
+    keywords = ['bot', 'bots', 'botnet', 'b.t', 'b', 'xb(']
+    matcher = KeywordMatcher(keywords[:4])
+    _check(matcher, keywords[:4], ['bo', 'bot', 'robots', 'b.t', 'bxt', 'botne', 'abc'])
+    # 'b' alone makes the longer 'b...' keywords redundant
+    _check(KeywordMatcher(keywords), keywords, ['a', 'b', 'xb(', 'xb', 'cab'])
+
+
+def test_metacharacters_are_literal():
+    keywords = ['a.c', '(x)', '[y]', 'z+', '\\d', '^s', 'e$', 'p|q']
+    matcher = KeywordMatcher(keywords)
+    _check(matcher, keywords, ['abc', 'a.c', 'x', '(x)', 'y', '[y]', 'zz', 'z+', '5',
+                               '\\d', 's', '^s', 'e', 'e$', 'p', 'p|q'])
+
+
+def test_sharded_patterns(monkeypatch):
+    monkeypatch.setattr(heuristics, 'KEYWORDS_PER_PATTERN', 7)
+    rng = random.Random(9)
+    keywords = _words(rng, 100, 2, 6)
+    matcher = KeywordMatcher(keywords)
+    assert len(matcher._regexes) == len(set(keywords)) // 7 + bool(len(set(keywords)) % 7)
+    _check(matcher, keywords, _words(rng, 500, 0, 12) + keywords)
+
+
+def test_full_size_shards():
+    rng = random.Random(4)
+    keywords = _words(rng, heuristics.KEYWORDS_PER_PATTERN + 500, 8, 12,
+                      'abcdefghijklmnopqrstuvwxyz')
+    matcher = KeywordMatcher(keywords)
+    assert len(matcher._regexes) == 2
+    texts = _words(rng, 200, 10, 30, 'abcdefghijklmnopqrstuvwxyz') + \
+        [f'x{keyword}y' for keyword in rng.sample(keywords, 200)]
+    _check(matcher, keywords, texts)
+
+
+def test_empty_matcher():
+    assert KeywordMatcher([]).search('anything') is None
+
+
+def _domain_reference(domains, domain):
+    return any(domain == d or domain.endswith('.' + d) for d in domains)
+
+
+def test_domains_match_on_label_boundaries():
+    domains = ['tempmail.com', 'mail.io', 'co.uk.example', 'x.y']
+    listed = DomainSet(domains)
+    for domain in ['tempmail.com', 'a.tempmail.com', 'a.b.tempmail.com', 'nottempmail.com',
+                   'tempmail.com.evil', 'mail.io', 'gmail.io', 'tempmail.io', 'com',
+                   'co.uk.example', 'y', 'x.y', 'w.x.y', 'wx.y', '']:
+        assert listed.matches(domain) == _domain_reference(domains, domain), domain
+
+
+def test_domains_strip_dots():
+    assert DomainSet(['.tempmail.com.']).matches('a.tempmail.com')
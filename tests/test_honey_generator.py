@@ -0,0 +1,17 @@
+import logging
+
+import honey_generator
+
+
+def test_dev_secret_warns(monkeypatch, caplog):
+    monkeypatch.setattr(honey_generator, 'HONEY_SECRET', b'honeyguard-dev-secret')
+    with caplog.at_level(logging.WARNING, logger='honey_generator'):
+        assert honey_generator.check_honey_secret() is False
+    assert 'HONEYGUARD_HONEY_SECRET' in caplog.text
+
+
+def test_configured_secret_is_quiet(monkeypatch, caplog):
+    monkeypatch.setattr(honey_generator, 'HONEY_SECRET', b'3f9c0d4e')
+    with caplog.at_level(logging.WARNING, logger='honey_generator'):
+        assert honey_generator.check_honey_secret() is True
+    assert caplog.text == ''
@@ -0,0 +1,118 @@
+import os
+
+import numpy as np
+import pytest
+
+import ml_detector
+from isolation_forest import MAPPED_ALIGN, SCORE_CHUNK_ROWS, IsolationForest, load_model_file
+
+
+def _sessions(rng, n):
+    # Human-like: few requests per minute, gaps of seconds, long sessions
+    return np.column_stack([
+        rng.uniform(0, 6, n),           # requests_per_minute
+        rng.uniform(5, 30, n),          # avg_time_gap
+        rng.uniform(1, 60, n),          # session_duration
+        rng.integers(1, 4, n),          # unique_endpoints
+        rng.integers(1, 40, n),         # total_requests
+    ])
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(11)
+    train = _sessions(rng, 2000)
+    inliers = _sessions(rng, 200)
+    anomalies = np.column_stack([
+        rng.uniform(60, 200, 50), rng.uniform(0, 0.5, 50), rng.uniform(0, 1, 50),
+        rng.integers(3, 10, 50), rng.integers(200, 2000, 50),
+    ])
+    model = IsolationForest.fit(train, n_trees=50, sample_size=128, seed=3)
+    return model, inliers, anomalies
+
+
+def _path_length_reference(model, x):
+    # One row, one tree at a time, following left/right until a leaf
+    lengths = []
+    for root in model.roots:
+        node = root
+        while model.feature[node] >= 0:
+            go_left = x[model.feature[node]] < model.threshold[node]
+            node = model.left[node] if go_left else model.right[node]
+        lengths.append(model.value[node])
+    return np.mean(lengths)
+
+
+def test_anomalies_score_above_inliers(data):
+    model, inliers, anomalies = data
+    assert model.score(anomalies).min() > np.median(model.score(inliers))
+    assert model.risk(anomalies).min() > np.percentile(model.risk(inliers), 90)
+
+
+def test_fit_is_deterministic_for_a_seed(data):
+    model, inliers, _ = data
+    rng = np.random.default_rng(11)
+    again = IsolationForest.fit(_sessions(rng, 2000), n_trees=50, sample_size=128, seed=3)
+    np.testing.assert_array_equal(again.score(inliers), model.score(inliers))
+
+
+def test_vectorized_walk_matches_reference(data):
+    model, inliers, anomalies = data
+    X = np.vstack([inliers[:20], anomalies[:20]])
+    expected = [_path_length_reference(model, x) for x in X]
+    np.testing.assert_allclose(model.path_lengths(X), expected)
+
+
+def test_scoring_spans_chunks(data):
+    model, inliers, _ = data
+    X = np.resize(inliers, (SCORE_CHUNK_ROWS + 37, inliers.shape[1]))
+    scores = model.score(X)
+    np.testing.assert_array_equal(scores[SCORE_CHUNK_ROWS:], model.score(X[SCORE_CHUNK_ROWS:]))
+
+
+def test_npz_round_trip_scores_identically(data, tmp_path):
+    model, inliers, anomalies = data
+    path = str(tmp_path / 'model.npz')
+    model.save(path)
+    loaded = load_model_file(path)
+    X = np.vstack([inliers, anomalies])
+    np.testing.assert_array_equal(loaded.score(X), model.score(X))
+    np.testing.assert_array_equal(loaded.risk(X), model.risk(X))
+
+
+def test_mapped_round_trip_is_aligned_and_identical(data, tmp_path):
+    model, inliers, anomalies = data
+    path = str(tmp_path / 'model.ifm')
+    model.save_mapped(path)
+    loaded = load_model_file(path)
+    for name in ('feature', 'threshold', 'left', 'right', 'value', 'roots'):
+        array = getattr(loaded, name)
+        assert isinstance(array.base, np.memmap) or isinstance(array, np.memmap)
+        assert array.ctypes.data % MAPPED_ALIGN == 0
+        np.testing.assert_array_equal(array, getattr(model, name))
+    X = np.vstack([inliers, anomalies])
+    np.testing.assert_array_equal(loaded.score(X), model.score(X))
+    assert not list(tmp_path.glob('*.tmp-*'))
+
+
+def test_ml_detector_picks_up_replaced_model(data, tmp_path, monkeypatch):
+    model, inliers, anomalies = data
+    X = np.vstack([inliers, anomalies])
+    path = str(tmp_path / 'model.ifm')
+    model.save_mapped(path)
+    monkeypatch.setattr(ml_detector, 'MODEL_CHECK_INTERVAL', 0.0)
+    ml_detector.load_model(path)
+    try:
+        np.testing.assert_array_equal(ml_detector.get_ml_risk_batch(X), model.risk(X))
+
+        # Retrain elsewhere and rename it over the live file
+        rng = np.random.default_rng(12)
+        retrained = IsolationForest.fit(_sessions(rng, 500), n_trees=20, sample_size=64, seed=9)
+        staged = str(tmp_path / 'staged.ifm')
+        retrained.save_mapped(staged)
+        os.replace(staged, path)
+
+        np.testing.assert_array_equal(ml_detector.get_ml_risk_batch(X), retrained.risk(X))
+        assert ml_detector._model.n_trees == retrained.n_trees
+    finally:
+        ml_detector.unload_model()
@@ -0,0 +1,97 @@
+import time
+
+from session_store import MemorySessionStore, _approx_size
+from session_telemetry import SessionTelemetry
+
+
+def _create(store, session_id, created_at=None):
+    store.create(session_id, {'created_at': time.time() if created_at is None else created_at,
+                              'customer_id': 1001, 'telemetry': SessionTelemetry()})
+
+
+def _session_size():
+    store = MemorySessionStore()
+    _create(store, 'a')
+    return store.stats()['approx_bytes']
+
+
+def test_idle_sessions_expire():
+    store = MemorySessionStore(idle_ttl=60)
+    _create(store, 'a')
+    _create(store, 'b')
+    store.get('a')['last_seen'] -= 61
+
+    assert store.get('a') is None
+    assert store.get('b') is not None
+    assert store.stats()['evicted_idle'] == 1
+
+
+def test_lifetime_expiry_ignores_activity():
+    store = MemorySessionStore(idle_ttl=60, max_lifetime=3600)
+    _create(store, 'a', created_at=time.time() - 3601)
+
+    assert store.get('a') is None
+    assert store.stats()['evicted_lifetime'] == 1
+
+
+def test_sweep_removes_due_sessions_only():
+    store = MemorySessionStore(idle_ttl=60)
+    _create(store, 'a')
+    _create(store, 'b')
+    now = time.time()
+    store.get('b')                     # refreshed; its old heap entry is requeued
+
+    assert store.sweep(now + 30) == 0
+    assert store.sweep(now + 3600) == 2
+    assert len(store) == 0
+    assert store.stats()['approx_bytes'] == 0
+
+
+def test_capacity_evicts_least_recently_used():
+    store = MemorySessionStore(max_sessions=2)
+    _create(store, 'a')
+    _create(store, 'b')
+    store.get('a')
+    _create(store, 'c')
+
+    assert store.get('b') is None
+    assert store.get('a') is not None and store.get('c') is not None
+    assert store.stats()['evicted_capacity'] == 1
+
+
+def test_byte_cap_evicts_least_recently_used():
+    size = _session_size()
+    store = MemorySessionStore(max_bytes=int(size * 2.5))
+    for session_id in 'abc':
+        _create(store, session_id)
+
+    assert len(store) == 2
+    assert store.get('a') is None
+    assert store.stats()['approx_bytes'] <= store.max_bytes
+
+
+def test_update_remeasures_session():
+    store = MemorySessionStore()
+    _create(store, 'a')
+    before = store.stats()['approx_bytes']
+
+    assert store.update('a', notes='x' * 10_000)
+    after = store.stats()['approx_bytes']
+    assert after >= before + 10_000
+    assert after == _approx_size('a', store.get('a'))
+    assert store.update('missing', notes='') is False
+
+    del store['a']
+    assert store.stats()['approx_bytes'] == 0
+
+
+def test_update_growth_triggers_byte_eviction():
+    size = _session_size()
+    store = MemorySessionStore(max_bytes=size * 3)
+    for session_id in 'abc':
+        _create(store, session_id)
+
+    store.update('c', notes='x' * size)
+    assert store.get('a') is None
+    assert store.get('c')['notes']
+    assert store.stats()['approx_bytes'] <= store.max_bytes
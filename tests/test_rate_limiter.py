@@ -0,0 +1,60 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+import rate_limiter
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = rate_limiter.RateLimiter(rate_limiter.RATE_LIMITS, rate_limiter.TIER_ACTIONS,
+                                       rate_limiter.MAX_TARPIT)
+    monkeypatch.setattr(rate_limiter, 'limiter', limiter)
+    return limiter
+
+
+def _login(client, email, user_agent):
+    response = client.post('/login', json={
+        'customer_id': 1001, 'email': email, 'password': 'x'
+    }, headers={'User-Agent': user_agent})
+    assert response.status_code == 200
+    return {'X-Session-ID': response.json()['session_id'], 'User-Agent': user_agent}
+
+
+def test_honey_traffic_does_not_drain_real_customer_budget(limiter):
+    burst = int(rate_limiter.RATE_LIMITS['customer'][1])
+    with TestClient(app.app, client=('6.6.6.6', 40000)) as attacker, \
+            TestClient(app.app, client=('10.0.0.5', 40000)) as owner:
+        headers = _login(attacker, 'x12345678@tempmail.com', 'python-requests/2.31.0')
+        for _ in range(burst * 3):
+            response = attacker.get('/account', headers=headers)
+            assert response.status_code == 200
+        assert response.json()['_data_source'] == 'honey'
+
+        headers = _login(owner, 'jane@example.com',
+                         'Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0')
+        response = owner.get('/balance', headers=headers)
+        assert response.status_code == 200
+        assert response.json()['_data_source'] == 'real'
+        assert 'Retry-After' not in response.headers
+
+
+def test_buckets_are_per_tier_for_shared_keys(limiter):
+    rate, burst = rate_limiter.RATE_LIMITS['customer']
+    keys = {'customer': 1001}
+    for _ in range(int(burst) + 5):
+        limiter.check(keys, 'honey', now=0.0)
+    assert limiter.check(keys, 'honey', now=0.0)[0] == 'cached'
+    assert limiter.check(keys, 'real', now=0.0) == (None, 0.0)
+
+
+def test_tier_actions_override_defaults():
+    assert rate_limiter.parse_tier_actions('') == rate_limiter.DEFAULT_TIER_ACTIONS
+    assert rate_limiter.parse_tier_actions('honey=reject') == {
+        'real': 'tarpit', 'randomized': 'tarpit', 'honey': 'reject'}
+
+
+@pytest.mark.parametrize('text', ['honey=drop', 'honey', 'bots=reject', 'real=tarpit,=cached'])
+def test_tier_actions_rejects_bad_settings(text):
+    with pytest.raises(ValueError, match='HONEYGUARD_THROTTLE_ACTIONS'):
+        rate_limiter.parse_tier_actions(text)
@@ -0,0 +1,98 @@
+import ipaddress
+import random
+
+import pytest
+
+from reputation import CidrIndex, LoginRateTracker
+
+
+def _reference(networks, ip):
+    # Longest matching prefix, later entries winning on identical ones
+    address = ipaddress.ip_address(ip)
+    best = None
+    for network, value in networks:
+        network = ipaddress.ip_network(network, strict=False)
+        if address.version == network.version and address in network:
+            if best is None or network.prefixlen >= best[0]:
+                best = (network.prefixlen, value)
+    return best and best[1]
+
+
+def test_longest_prefix_wins():
+    index = CidrIndex.from_lists(block=['10.0.0.0/8', '10.1.2.0/24', '2001:db8::/32'],
+                                 allow=['10.1.0.0/16', '10.1.2.3', '2001:db8:1::/48'])
+    assert index.lookup('10.9.9.9') == 'block'
+    assert index.lookup('10.1.9.9') == 'allow'
+    assert index.lookup('10.1.2.9') == 'block'
+    assert index.lookup('10.1.2.3') == 'allow'
+    assert index.lookup('11.0.0.1') is None
+    assert index.lookup('2001:db8:2::1') == 'block'
+    assert index.lookup('2001:db8:1::1') == 'allow'
+    assert index.lookup('::ffff:10.9.9.9') is None     # IPv6 tree only
+    assert index.lookup('not an ip') is None
+    assert index.lookup(None) is None
+
+
+def test_allow_beats_block_on_identical_prefix():
+    index = CidrIndex.from_lists(block=['192.0.2.0/24'], allow=['192.0.2.0/24'])
+    assert index.lookup('192.0.2.10') == 'allow'
+    assert len(index) == 1
+
+
+def test_default_route_and_host_prefixes():
+    index = CidrIndex.from_lists(block=['0.0.0.0/0'], allow=['198.51.100.7/32'])
+    assert index.lookup('8.8.8.8') == 'block'
+    assert index.lookup('198.51.100.7') == 'allow'
+    assert index.lookup('198.51.100.8') == 'block'
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_matches_reference_on_random_networks(seed):
+    rng = random.Random(seed)
+    networks = []
+    for _ in range(300):
+        prefix = rng.randint(4, 32)
+        address = ipaddress.IPv4Address(rng.getrandbits(32) & (0xFFFFFFFF << (32 - prefix)))
+        networks.append((f'{address}/{prefix}', rng.choice(('block', 'allow'))))
+    index = CidrIndex()
+    for network, value in networks:
+        index.insert(network, value)
+    # Probe inside listed networks as well as at random
+    probes = [str(ipaddress.ip_network(network).network_address + rng.randrange(16))
+              for network, _ in networks if int(network.rsplit('/', 1)[1]) <= 28]
+    probes += [str(ipaddress.IPv4Address(rng.getrandbits(32))) for _ in range(500)]
+    for ip in probes:
+        assert index.lookup(ip) == _reference(networks, ip), ip
+
+
+def test_login_rate_counts_within_window():
+    tracker = LoginRateTracker(window=60)
+    assert [tracker.hit('1.2.3.4', now=600 + i) for i in range(3)] == [1, 2, 3]
+    assert tracker.hit('5.6.7.8', now=603) == 1
+
+
+def test_login_rate_weights_previous_bucket():
+    tracker = LoginRateTracker(window=60)
+    for i in range(10):
+        tracker.hit('1.2.3.4', now=600 + i)          # bucket 10
+    # A quarter into the next bucket, three quarters of the last still count
+    assert tracker.hit('1.2.3.4', now=675) == pytest.approx(1 + 10 * 0.75)
+    assert tracker.hit('1.2.3.4', now=719) == pytest.approx(2 + 10 * (1 / 60))
+
+
+def test_login_rate_forgets_after_two_windows():
+    tracker = LoginRateTracker(window=60)
+    for i in range(10):
+        tracker.hit('1.2.3.4', now=600 + i)
+    assert tracker.hit('1.2.3.4', now=600 + 121) == 1
+
+
+def test_login_rate_tracks_bounded_ips():
+    tracker = LoginRateTracker(window=60, max_ips=2)
+    tracker.hit('a', now=0)
+    tracker.hit('b', now=0)
+    tracker.hit('a', now=1)          # 'b' is now least recently seen
+    tracker.hit('c', now=2)
+    assert tracker.stats() == {'tracked_ips': 2}
+    assert tracker.hit('a', now=3) == 3
+    assert tracker.hit('b', now=3) == 1
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from session_store import SQLiteSessionStore
+from session_telemetry import SessionTelemetry
+
+
+def _store(tmp_path, **kwargs):
+    # Flushes only when asked
+    kwargs.setdefault('batch_size', 10_000)
+    kwargs.setdefault('flush_interval', 3600)
+    return SQLiteSessionStore(str(tmp_path / 'sessions.db'), **kwargs)
+
+
+def _create(store, session_id, created_at):
+    store.create(session_id, {'created_at': created_at, 'customer_id': 1001,
+                              'telemetry': SessionTelemetry()})
+
+
+def test_get_refreshes_last_seen(tmp_path):
+    store = _store(tmp_path, idle_ttl=60)
+    _create(store, 'a', time.time() - 50)
+
+    session = store.get('a')
+    assert session['last_seen'] >= time.time() - 1
+    store.flush()
+    # 50s after the refresh the session would have idled out without it
+    row = store._conn().execute(
+        "SELECT last_seen, expires_at FROM sessions WHERE session_id = 'a'").fetchone()
+    assert row[0] == session['last_seen']
+    assert row[1] == session['last_seen'] + 60
+
+
+def test_pending_requests_counted_once_across_flushes(tmp_path):
+    store = _store(tmp_path)
+    _create(store, 'a', time.time())
+    total = 2000
+    seen = []
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set():
+            seen.append(store.get('a')['telemetry'].total_requests)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for i in range(total):
+            store.record_request('a', time.time(), '/account')
+            if i % 50 == 0:
+                store.flush()
+    finally:
+        done.set()
+        thread.join()
+    store.flush()
+
+    assert seen == sorted(seen)
+    assert max(seen) <= total
+    assert store.get('a')['telemetry'].total_requests == total
+    assert store._pending == {}
+
+
+def test_session_manager_feature_helpers():
+    import session_manager
+
+    session_id = session_manager.create_session('1001')
+    for endpoint in ('/a', '/b', '/a'):
+        session_manager.record_request(session_id, endpoint)
+
+    features = session_manager.extract_behavioral_features(session_id)
+    assert session_manager.get_request_frequency(session_id) == features['requests_per_minute'] == 3
+    assert 0 <= session_manager.get_session_age(session_id) - features['session_duration'] < 1
+    assert session_manager.get_request_frequency('missing') == 0
+    assert session_manager.get_session_age('missing') == 0
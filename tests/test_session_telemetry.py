@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from session_telemetry import (
+    MAX_TRACKED_ENDPOINTS,
+    REQUEST_WINDOW_SECONDS,
+    TELEMETRY_RING_SIZE,
+    SessionTelemetry,
+)
+
+
+def _naive(requests, now):
+    # The baseline feature math over the full request history
+    timestamps = [ts for ts, _ in requests]
+    gaps = [b - a for a, b in zip(timestamps, timestamps[1:])]
+    recent = sum(1 for ts in timestamps if now - ts < REQUEST_WINDOW_SECONDS)
+    return {
+        'requests_per_minute': min(recent, TELEMETRY_RING_SIZE),
+        'avg_time_gap': sum(gaps) / len(gaps) if gaps else 0,
+        'unique_endpoints': min(len({endpoint for _, endpoint in requests}),
+                                MAX_TRACKED_ENDPOINTS),
+        'total_requests': len(timestamps),
+    }
+
+
+def _features(telemetry, now):
+    return {
+        'requests_per_minute': telemetry.requests_per_minute(now),
+        'avg_time_gap': telemetry.avg_time_gap(),
+        'unique_endpoints': telemetry.unique_endpoints,
+        'total_requests': telemetry.total_requests,
+    }
+
+
+@pytest.mark.parametrize('mean_gap', [0.05, 1.0, 20.0])
+def test_matches_naive_features_past_ring_wrap(mean_gap):
+    rng = random.Random(mean_gap)
+    telemetry = SessionTelemetry()
+    requests = []
+    ts = 1.7e9
+    now = ts
+    for _ in range(3 * TELEMETRY_RING_SIZE + 7):
+        # Time only moves forward: the next request comes after the last read
+        ts = max(ts, now) + rng.expovariate(1 / mean_gap)
+        endpoint = f'/endpoint/{rng.randrange(100)}'
+        telemetry.record(ts, endpoint)
+        requests.append((ts, endpoint))
+
+        now = ts + rng.uniform(0, 30)
+        expected = _naive(requests, now)
+        actual = _features(telemetry, now)
+        assert actual.pop('avg_time_gap') == pytest.approx(expected.pop('avg_time_gap'))
+        assert actual == expected
+
+
+def test_window_saturates_at_ring_size():
+    telemetry = SessionTelemetry()
+    for i in range(TELEMETRY_RING_SIZE + 50):
+        telemetry.record(1000.0 + i * 0.001, '/account')
+    assert telemetry.requests_per_minute(1001.0) == TELEMETRY_RING_SIZE
+    assert telemetry.requests_per_minute(1000.0 + REQUEST_WINDOW_SECONDS + 1) == 0
+
+
+def test_endpoint_cap():
+    telemetry = SessionTelemetry()
+    for i in range(MAX_TRACKED_ENDPOINTS * 2):
+        telemetry.record(1000.0 + i, f'/e{i}')
+    assert telemetry.unique_endpoints == MAX_TRACKED_ENDPOINTS
+    assert telemetry.total_requests == MAX_TRACKED_ENDPOINTS * 2
+
+
+def test_round_trip_through_bytes():
+    rng = random.Random(5)
+    telemetry = SessionTelemetry()
+    ts = 1.7e9
+    for _ in range(TELEMETRY_RING_SIZE + 100):
+        ts += rng.uniform(0, 2)
+        telemetry.record(ts, f'/e{rng.randrange(80)}')
+
+    copy = SessionTelemetry.from_bytes(telemetry.to_bytes())
+    assert copy.to_bytes() == telemetry.to_bytes()
+    for now in (ts, ts + 10, ts + 59):
+        assert _features(copy, now) == _features(telemetry, now)
+
+    # Both keep evolving identically after the round trip
+    for telemetry_ in (telemetry, copy):
+        telemetry_.record(ts + 1, '/new')
+    assert _features(copy, ts + 1) == _features(telemetry, ts + 1)
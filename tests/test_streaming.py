@@ -0,0 +1,75 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import app
+import rate_limiter
+from honey_generator import MAX_TRANSACTIONS_LIMIT
+
+
+def _honey_session(client):
+    user_agent = 'python-requests/2.31.0'
+    response = client.post('/login', json={
+        'customer_id': 1002, 'email': 'x87654321@tempmail.com', 'password': 'x'
+    }, headers={'User-Agent': user_agent})
+    headers = {'X-Session-ID': response.json()['session_id'], 'User-Agent': user_agent}
+    while client.get('/account', headers=headers).json()['_data_source'] != 'honey':
+        pass
+    return headers
+
+
+def _stream(client, headers, limit):
+    response = client.get(f'/transactions?stream=ndjson&limit={limit}', headers=headers)
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    return lines[:-1], lines[-1]
+
+
+def test_honey_stream_is_capped_like_a_page():
+    with TestClient(app.app, client=('6.6.6.7', 40000)) as client:
+        headers = _honey_session(client)
+        rows, trailer = _stream(client, headers, 50_000)
+        assert len(rows) <= MAX_TRANSACTIONS_LIMIT
+        assert trailer['_data_source'] == 'honey'
+
+
+def test_throttled_honey_stream_replays_cached_page(monkeypatch):
+    with TestClient(app.app, client=('6.6.6.8', 40000)) as client:
+        headers = _honey_session(client)
+        # One more request is allowed, every one after it is over the limit
+        monkeypatch.setitem(rate_limiter.limiter.buckets, 'session',
+                            rate_limiter.BucketSet(0.001, 1))
+        client.get('/balance', headers=headers)
+        cached = rate_limiter.limiter.counts['cached']
+        first, _ = _stream(client, headers, 50_000)
+        second, trailer = _stream(client, headers, 50_000)
+        assert rate_limiter.limiter.counts['cached'] >= cached + 2
+        assert trailer['_data_source'] == 'honey'
+        assert 0 < len(first) <= MAX_TRANSACTIONS_LIMIT
+        assert second == first
+
+
+def test_throttled_honey_paging_moves_on(monkeypatch):
+    with TestClient(app.app, client=('6.6.6.9', 40000)) as client:
+        headers = _honey_session(client)
+        monkeypatch.setitem(rate_limiter.limiter.buckets, 'session',
+                            rate_limiter.BucketSet(0.001, 1))
+        client.get('/balance', headers=headers)
+        cached = rate_limiter.limiter.counts['cached']
+
+        pages = []
+        cursor = 0
+        for _ in range(3):
+            page = client.get(f'/transactions?limit=10&cursor={cursor}', headers=headers).json()
+            assert page['_data_source'] == 'honey'
+            pages.append([row['transaction_id'] for row in page['transactions']])
+            cursor = page['next_cursor']
+        assert rate_limiter.limiter.counts['cached'] >= cached + 3
+        ids = [txn for page in pages for txn in page]
+        assert len(ids) == 30 and len(set(ids)) == 30
+
+        # Asking again replays the same page; a bigger page is full size
+        again = client.get('/transactions?limit=10&cursor=10', headers=headers).json()
+        assert [row['transaction_id'] for row in again['transactions']] == pages[1]
+        bigger = client.get('/transactions?limit=20&cursor=0', headers=headers).json()
+        assert len(bigger['transactions']) == 20